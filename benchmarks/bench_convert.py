@@ -0,0 +1,18 @@
+import asyncio
+
+import ferien.async_ as async_dut
+import ferien.sync_ as sync_dut
+
+
+def test_convert_json_sync(benchmark, payload):
+    res = benchmark(sync_dut._convert_json, payload)
+    assert len(res) == len(payload)
+
+
+def test_convert_json_async(benchmark, payload):
+    loop = asyncio.new_event_loop()
+    try:
+        res = benchmark(lambda: loop.run_until_complete(async_dut._convert_json(payload)))
+    finally:
+        loop.close()
+    assert len(res) == len(payload)
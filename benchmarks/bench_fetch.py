@@ -0,0 +1,27 @@
+import asyncio
+
+from ferien.async_ import AsyncFerienClient
+from ferien.sync_ import FerienClient
+
+YEARS = [2019, 2020]
+
+
+def test_fetch_states_sync(benchmark, server):
+    with FerienClient(base_url=server.base_url) as client:
+        res = benchmark(client.fetch_states, years=YEARS, max_workers=8)
+    assert res.ok and len(res.vacations) == 32
+
+
+def test_fetch_states_async(benchmark, server):
+    loop = asyncio.new_event_loop()
+    client = AsyncFerienClient(base_url=server.base_url)
+
+    async def _fetch():
+        return await client.fetch_states(years=YEARS, concurrency=8)
+
+    try:
+        res = benchmark(lambda: loop.run_until_complete(_fetch()))
+    finally:
+        loop.run_until_complete(client.close())
+        loop.close()
+    assert res.ok and len(res.vacations) == 32
@@ -0,0 +1,55 @@
+from datetime import datetime
+
+import pytest
+
+from ferien.fake_server import synthetic_payload
+from ferien.index import VacationCalendar
+from ferien.model import Vacation
+from ferien.util import find_current, find_next, make_tz_aware_timestamp
+
+DT = datetime(2019, 7, 20, 12)
+
+
+def _vacations(scale):
+    return [Vacation.from_dict(item) for item in synthetic_payload(states=['HH'], scale=scale)]
+
+
+@pytest.fixture(scope='module', params=[1, 10, 100])
+def vacs(request):
+    return _vacations(request.param)
+
+
+def test_find_current(benchmark, vacs):
+    assert benchmark(find_current, vacs, DT) is not None
+
+
+def test_find_next(benchmark, vacs):
+    assert benchmark(find_next, vacs, DT) is not None
+
+
+def test_find_next_sorted(benchmark, vacs):
+    ordered = sorted(vacs, key=lambda vac: vac.start)
+    assert benchmark(find_next, ordered, DT, sorted_by_start=True) is not None
+
+
+def test_calendar_find_current(benchmark, vacs):
+    cal = VacationCalendar(vacs)
+    assert benchmark(cal.find_current, DT) is not None
+
+
+def test_calendar_find_next(benchmark, vacs):
+    cal = VacationCalendar(vacs)
+    assert benchmark(cal.find_next, DT) is not None
+
+
+WEEK = (datetime(2019, 7, 15), datetime(2019, 7, 21, 23, 59, 59))
+
+
+def test_overlapping_scan(benchmark, vacs):
+    start, end = (make_tz_aware_timestamp(dt) for dt in WEEK)
+    assert benchmark(lambda: [vac for vac in vacs if vac.start <= end and vac.end >= start])
+
+
+def test_calendar_overlapping(benchmark, vacs):
+    cal = VacationCalendar(vacs)
+    assert benchmark(cal.overlapping, *WEEK)
@@ -0,0 +1,18 @@
+import pytest
+
+from ferien.fake_server import FakeFerienServer, synthetic_payload
+
+# Realistic: all states for five years (the size of the /holidays
+# response). Large: 100 times that.
+SIZES = {'realistic': 1, 'large': 100}
+
+
+@pytest.fixture(scope='session', params=sorted(SIZES))
+def payload(request):
+    return synthetic_payload(scale=SIZES[request.param])
+
+
+@pytest.fixture(scope='session')
+def server():
+    with FakeFerienServer(latency=0.005) as srv:
+        yield srv
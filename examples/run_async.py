@@ -17,10 +17,13 @@ async def main():
     print("Valid state codes:", ferien.state_codes())
 
     # Get current vacation (None if there is no vacation)
-    print("Current vacation in HH:", ferien.current_vacation(vacs=await ferien.state_vacations_async('HH')))
+    print("Current vacation in HH:", await ferien.current_vacation_async('HH'))
 
     # Get next vacation (None if there is no next vacation)
-    print("Next vacation in HH:", ferien.next_vacation(vacs=await ferien.state_vacations_async('HH')))
+    print("Next vacation in HH:", await ferien.next_vacation_async('HH'))
+
+    # Get the current vacations of several states at once (None if there is no vacation)
+    print("Current vacations:", await ferien.current_vacations_async(['HH', 'SH', 'BE']))
 
 
 if __name__ == '__main__':
@@ -3,19 +3,18 @@ import asyncio
 import ferien
 
 
-async def print_wrapper(state_code):
-    print("Fetching {}".format(state_code))
-    res = await ferien.state_vacations_async(state_code, 2019)
-    print("Fetched {}".format(state_code))
-    return res
+async def main():
+    # Fetches the given states / years concurrently using a shared connection pool.
+    # At most 4 requests are made at once.
+    res = await ferien.fetch_states_async(['HH', 'SH', 'BE', 'BB'], [2019], concurrency=4)
+    for (state_code, year), vacs in res.vacations.items():
+        print("Fetched {} in {}: {} vacations".format(state_code, year, len(vacs)))
+
+    # Failed requests do not abort the others, but are collected
+    for (state_code, year), error in res.errors.items():
+        print("Failed {} in {}: {}".format(state_code, year, error))
 
 
 if __name__ == '__main__':
     loop = asyncio.get_event_loop()
-    coros = [
-        print_wrapper('HH'),
-        print_wrapper('SH'),
-        print_wrapper('BE'),
-        print_wrapper('BB')
-    ]
-    loop.run_until_complete(asyncio.gather(*coros))
+    loop.run_until_complete(main())
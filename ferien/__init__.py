@@ -1,25 +1,105 @@
-"""ferien-api public members."""
+"""ferien-api public members.
 
-from .sync_ import (
-    state_codes,
-    all_vacations,
-    state_vacations,
-    current_vacation,
-    next_vacation
-)
-
-from .async_ import (
-    all_vacations_async,
-    state_vacations_async
-)
+The members are imported on first access, so `import ferien` stays cheap
+and e.g. `ferien.state_codes()` does not pull in the http clients.
+"""
+import importlib
+import sys
+from typing import TYPE_CHECKING, Any, List
 
+_MEMBERS = {
+    # sync
+    'FerienClient': '.sync_',
+    'fetch_states': '.sync_',
+    'iter_all_vacations': '.sync_',
+    'all_vacations': '.sync_',
+    'state_vacations': '.sync_',
+    'current_vacation': '.sync_',
+    'next_vacation': '.sync_',
+    # async
+    'AsyncFerienClient': '.async_',
+    'aiter_all_vacations': '.async_',
+    'all_vacations_async': '.async_',
+    'fetch_states_async': '.async_',
+    'state_vacations_async': '.async_',
+    'current_vacation_async': '.async_',
+    'next_vacation_async': '.async_',
+    'current_vacations_async': '.async_',
+    'next_vacations_async': '.async_',
+    # others
+    'state_codes': '.const',
+    'BulkResult': '.base',
+    'VacationCalendar': '.index',
+    'HolidayBitmap': '.index'
+}
 
 __all__ = [
+    'AsyncFerienClient',
+    'BulkResult',
+    'FerienClient',
+    'HolidayBitmap',
+    'VacationCalendar',
     'state_codes',
+    'aiter_all_vacations',
     'all_vacations',
     'all_vacations_async',
     'current_vacation',
+    'current_vacation_async',
+    'current_vacations_async',
+    'fetch_states',
+    'fetch_states_async',
+    'iter_all_vacations',
     'next_vacation',
+    'next_vacation_async',
+    'next_vacations_async',
     'state_vacations',
     'state_vacations_async'
 ]
+
+
+def _load(name: str) -> Any:
+    module = importlib.import_module(_MEMBERS[name], __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .sync_ import (
+        FerienClient,
+        fetch_states,
+        iter_all_vacations,
+        all_vacations,
+        state_vacations,
+        current_vacation,
+        next_vacation
+    )
+    from .async_ import (
+        AsyncFerienClient,
+        aiter_all_vacations,
+        all_vacations_async,
+        fetch_states_async,
+        state_vacations_async,
+        current_vacation_async,
+        next_vacation_async,
+        current_vacations_async,
+        next_vacations_async
+    )
+    from .base import BulkResult
+    from .const import state_codes
+    from .index import HolidayBitmap, VacationCalendar
+elif sys.version_info >= (3, 7):
+    def __getattr__(name: str) -> Any:
+        if name not in _MEMBERS:
+            # pylint: disable=consider-using-f-string
+            raise AttributeError("module {!r} has no attribute {!r}".format(
+                __name__, name
+            ))
+        return _load(name)
+
+    def __dir__() -> List[str]:
+        return sorted(set(globals()) | set(_MEMBERS))
+else:  # pragma: no cover
+    # No module level __getattr__ (PEP 562) before python 3.7
+    for _name in _MEMBERS:
+        _load(_name)
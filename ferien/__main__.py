@@ -0,0 +1,29 @@
+"""Command line entry point:
+
+    python -m ferien serve --port 8080
+
+See `ferien.proxy` for the caching proxy.
+"""
+import argparse
+from typing import List, Optional
+
+from . import proxy
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    """Parses the command line and runs the given command."""
+    parser = argparse.ArgumentParser(prog='python -m ferien')
+    commands = parser.add_subparsers(dest='command')
+    serve = commands.add_parser(
+        'serve', help="Run a caching proxy in front of ferien-api.de"
+    )
+    proxy.add_arguments(serve)
+    opts = parser.parse_args(args)
+    if opts.command == 'serve':
+        proxy.serve(opts)
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
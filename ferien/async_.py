@@ -1,63 +1,582 @@
 """Asynchronous implementation using aiohttp"""
 import asyncio
-from typing import List, Optional, cast
+from collections import deque
+from datetime import datetime
+from typing import (
+    Any, Awaitable, Callable, Deque, Dict, Iterable, List, Mapping, Optional,
+    Set, Tuple, cast
+)
 
-from .const import (API_ALL_URL, API_STATE_URL,
-                    API_STATE_YEAR_URL)
+from .base import (
+    BaseClient, BulkResult, api_error, DATASET_KEY, HTTP_OK
+)
+from .const import (
+    API_ALL_URL, API_BULK_CONCURRENCY, API_CONNECT_TIMEOUT,
+    API_CONVERT_CHUNK_SIZE, API_POOL_SIZE, API_STREAM_CHUNK_SIZE,
+    API_TOTAL_TIMEOUT
+)
+from .cache import Cache, CacheEntry
+from .dataset import Dataset, VacationIndex
+from .errors import CircuitOpenError
 from .model import Vacation
-from .types import APIUrl, APIResponse, StateCode
-from .util import parse_state_code, parse_year
-
-
-async def _make_api_request(api_url: APIUrl) -> APIResponse:
-    # pylint: disable=import-outside-toplevel
-    import aiohttp
-    import certifi  # type: ignore
-    import ssl  # type: ignore
-    sslcontext = ssl.create_default_context(cafile=certifi.where())
-    async with aiohttp.ClientSession() as session:
-        async with session.get(api_url, ssl=sslcontext) as resp:
-            if resp.status != 200:
-                # pylint: disable=consider-using-f-string
-                raise RuntimeError(
-                    "ferien-api.de failed with http code = '{}'\n"
-                    "Error: {}".format(
-                        resp.status,
-                        await resp.text()
-                    ))
-            res = await resp.json()
-            return cast(APIResponse, res)
-
-
-async def _convert_json(resp: APIResponse) -> List[Vacation]:
-    res = []
-    for entry in resp:
-        res.append(Vacation.from_dict(entry))
-        # Give back control to the event loop after each converted element
-        await asyncio.sleep(0.0)
+from .resilience import CircuitBreaker, RetryPolicy
+from .singleflight import AsyncSingleFlight
+from .stream import JsonArrayDecoder
+from .transport import AiohttpTransport, AsyncTransport, StreamedResponse
+from .types import APIUrl, APIResponse, StateCode, StateYear
+from .util import (
+    find_current, find_next, make_tz_aware_timestamp, state_url,
+    state_year_pairs
+)
+
+
+TaskSet = Set['asyncio.Future[None]']
+
+VacationQueue = Deque[Vacation]
+
+OptionalStreamedResponse = Optional[StreamedResponse]
+
+StateVacations = Dict[StateCode, Optional[Vacation]]
+
+
+class AsyncFerienClient(BaseClient):
+    """
+    Asynchronous ferien-api.de client.
+
+    By default the client uses an `AiohttpTransport`, which owns one
+    long-lived `aiohttp.ClientSession`, so all requests share the
+    connection pool and the ssl context. Concurrent requests of the same
+    url are collapsed into a single download. Stale cache entries are
+    revalidated in a background task if `stale_while_revalidate` is set.
+    Returned `Vacation` objects may be the same instances returned by
+    earlier calls (memoized conversions, the dataset), so treat them as
+    read-only and copy them (e.g. `Vacation.freeze`) before changing them.
+    Use it as an async context manager or call `close()` when done:
+
+        async with AsyncFerienClient() as client:
+            await client.state_vacations('HH')
+
+    Args:
+        limit: Maximum number of simultaneous connections.
+        cache: Optional response cache (see `ferien.cache`).
+        stale_while_revalidate: Serve expired cache entries while
+            revalidating them in the background.
+        convert_chunk_size: Number of items converted to `Vacation`
+            objects before control is given back to the event loop.
+        executor_threshold: Responses with at least that many items are
+            converted in the default executor instead of the event loop.
+            None disables the executor.
+        dataset: Optional local dataset (e.g. a loaded snapshot) to serve
+            all requests from.
+        transport: Optional transport to use instead of an
+            `AiohttpTransport` (limit and the timeouts are ignored then).
+        base_url: Url of the holidays endpoint to use instead of
+            `const.API_ALL_URL`.
+        dataset_ttl: Download all vacations at once and serve all requests
+            from them. They are downloaded again after that many seconds.
+        timeout: Total timeout of a request in seconds (None disables it).
+        connect_timeout: Timeout of establishing a connection in seconds.
+        retry: Optional retry policy of rate limited (429) and failed
+            (5xx) requests (see `ferien.resilience`).
+        circuit_breaker: Optional circuit breaker failing fast while
+            ferien-api.de is unavailable.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, limit: int = API_POOL_SIZE,
+                 cache: Optional[Cache] = None,
+                 stale_while_revalidate: bool = False,
+                 convert_chunk_size: int = API_CONVERT_CHUNK_SIZE,
+                 executor_threshold: Optional[int] = None,
+                 dataset: Optional[Dataset] = None,
+                 transport: Optional[AsyncTransport] = None,
+                 base_url: APIUrl = API_ALL_URL,
+                 dataset_ttl: Optional[float] = None,
+                 timeout: Optional[float] = API_TOTAL_TIMEOUT,
+                 connect_timeout: Optional[float] = API_CONNECT_TIMEOUT,
+                 retry: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None) -> None:
+        super().__init__(cache, stale_while_revalidate, dataset, base_url,
+                         dataset_ttl, retry, circuit_breaker)
+        if transport is None:
+            transport = AiohttpTransport(limit, timeout, connect_timeout)
+        self.transport = transport
+        self.convert_chunk_size = convert_chunk_size
+        self.executor_threshold = executor_threshold
+        self._tasks = set()  # type: TaskSet
+        self._flights = AsyncSingleFlight()
+
+    async def __aenter__(self) -> 'AsyncFerienClient':
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    @property
+    def session(self) -> Any:
+        """Returns the underlying `aiohttp.ClientSession` of the default
+        transport. It has to be accessed from within a running event
+        loop."""
+        return cast(AiohttpTransport, self.transport).session
+
+    async def close(self) -> None:
+        """Cancels pending background revalidations and closes all pooled
+        connections."""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.transport.close()
+
+    async def _make_api_request(
+            self, api_url: APIUrl, headers: Dict[str, str]
+    ) -> Tuple[int, Mapping[str, str], Optional[APIResponse]]:
+        # Mirrors FerienClient._make_api_request
+        # pylint: disable=duplicate-code
+        attempt = 0
+        while True:
+            self._before_request()
+            started, resp = self._clock(), None
+            try:
+                resp = await self.transport.request(api_url, headers)
+                res = self._unpack_response(resp)
+            except BaseException as ex:
+                self._request_done(api_url, attempt, started, resp, ex)
+                retry_in = self._retry_in(api_url, attempt, ex)
+                if retry_in is None:
+                    raise
+            else:
+                self._request_done(api_url, attempt, started, resp, None)
+                return res
+            attempt += 1
+            await asyncio.sleep(retry_in)
+
+    async def _revalidate(self, api_url: APIUrl,
+                          entry: Optional[CacheEntry]) -> CacheEntry:
+        try:
+            res = await self._make_api_request(
+                api_url, self._request_headers(entry)
+            )
+        except CircuitOpenError as ex:
+            return self._fallback(api_url, entry, ex)
+        return self._store(api_url, entry, *res)
+
+    async def _convert(self, api_url: APIUrl,
+                       entry: CacheEntry) -> List[Vacation]:
+        vacs = self._get_converted(api_url, entry)
+        if vacs is None:
+            started = self._clock()
+            vacs = self._set_converted(api_url, entry, await _convert_json(
+                entry.payload, self.convert_chunk_size,
+                self.executor_threshold
+            ))
+            self._convert_done(api_url, started, vacs)
+        return vacs
+
+    def _revalidate_in_background(self, api_url: APIUrl,
+                                  entry: CacheEntry) -> None:
+        if api_url in self._revalidating:
+            return
+        self._revalidating.add(api_url)
+        task = asyncio.ensure_future(
+            self._background_revalidation(api_url, entry)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _background_revalidation(self, api_url: APIUrl,
+                                       entry: CacheEntry) -> None:
+        try:
+            entry = await self._revalidate(api_url, entry)
+            await self._convert(api_url, entry)
+        except Exception:  # pylint: disable=broad-except
+            self._log_revalidation_error(api_url)
+        finally:
+            self._revalidating.discard(api_url)
+
+    async def _download(self, api_url: APIUrl,
+                        entry: Optional[CacheEntry]) -> List[Vacation]:
+        entry = await self._revalidate(api_url, entry)
+        return await self._convert(api_url, entry)
+
+    async def _fetch(self, api_url: APIUrl) -> List[Vacation]:
+        entry, usable = self._lookup(api_url)
+        if entry is not None and usable:
+            return await self._convert(api_url, entry)
+        # Concurrent coroutines requesting the same url share one download
+        return list(await self._flights.do(
+            api_url, lambda: self._download(api_url, entry)
+        ))
+
+    async def load_dataset(self) -> VacationIndex:
+        """Downloads all vacations at once and answers all further requests
+        from them (until dataset_ttl expires)."""
+        vacs = await self._fetch(self.rebase_url(API_ALL_URL))
+        return self._set_dataset(vacs)
+
+    async def _ensure_dataset(self) -> None:
+        if not self._dataset_expired():
+            return
+        try:
+            await self._flights.do(DATASET_KEY, self.load_dataset)
+        except Exception:
+            if self.dataset is None:
+                raise
+            self._dataset_failed()
+
+    async def all_vacations(self) -> List[Vacation]:
+        """Makes an async request to the ferien-api.de retrieving all
+        vacations for all states at once"""
+        await self._ensure_dataset()
+        vacs = self._from_dataset()
+        if vacs is None:
+            vacs = await self._fetch(self.rebase_url(API_ALL_URL))
+        return vacs
+
+    async def state_vacations(self, state_code: StateCode,
+                              year: Optional[int] = None) -> List[Vacation]:
+        """Makes an async request to the ferien-api.de using the given
+        state_code and - optionally - the specified year."""
+        await self._ensure_dataset()
+        vacs = self._from_dataset(state_code, year)
+        if vacs is None:
+            vacs = await self._fetch(
+                self.rebase_url(state_url(state_code, year))
+            )
+        return vacs
+
+    async def current_vacation(
+            self, state_code: StateCode,
+            dt: Optional[datetime] = None) -> Optional[Vacation]:
+        """Returns the current vacation of the given state based on the
+        given dt (default: now). Returns None if no vacation surrounds
+        (start, end) the given dt."""
+        await self._ensure_dataset()
+        cal = self._calendar(state_code)
+        if cal is not None:
+            return cal.find_current(dt)
+        return find_current(await self.state_vacations(state_code), dt)
+
+    async def next_vacation(
+            self, state_code: StateCode,
+            dt: Optional[datetime] = None) -> Optional[Vacation]:
+        """Returns the next vacation of the given state based on the given
+        dt (default: now). Returns None if no vacation is left."""
+        await self._ensure_dataset()
+        cal = self._calendar(state_code)
+        if cal is not None:
+            return cal.find_next(dt)
+        return find_next(await self.state_vacations(state_code), dt)
+
+    async def current_vacations(
+            self, states: Optional[Iterable[StateCode]] = None,
+            dt: Optional[datetime] = None) -> StateVacations:
+        """Returns the current vacation (or None) of each of the given
+        states (default: all) by state code. The states are resolved
+        concurrently."""
+        return await _by_state(self.current_vacation, states, dt)
+
+    async def next_vacations(
+            self, states: Optional[Iterable[StateCode]] = None,
+            dt: Optional[datetime] = None) -> StateVacations:
+        """Returns the next vacation (or None) of each of the given states
+        (default: all) by state code. The states are resolved
+        concurrently."""
+        return await _by_state(self.next_vacation, states, dt)
+
+    def iter_all_vacations(
+            self, chunk_size: int = API_STREAM_CHUNK_SIZE
+    ) -> 'VacationStream':
+        """Makes an async request to the ferien-api.de retrieving all
+        vacations for all states at once. The response is parsed
+        incrementally and the vacations are yielded as they arrive. The
+        cache is bypassed. The retry policy and the circuit breaker apply
+        to establishing the stream, but not to reading the body.
+
+            async for vac in client.iter_all_vacations():
+                ...
+        """
+        return VacationStream(self, self.rebase_url(API_ALL_URL),
+                              chunk_size)
+
+    async def fetch_states(
+            self, states: Optional[Iterable[StateCode]] = None,
+            years: Optional[Iterable[int]] = None,
+            concurrency: int = API_BULK_CONCURRENCY) -> BulkResult:
+        """Fetches the vacations of all combinations of the given states
+        (default: all) and years (default: all years) with at most
+        concurrency requests at once. Identical combinations are only
+        requested once. Failed requests are collected in the result
+        instead of being raised."""
+        pairs = state_year_pairs(states, years)
+        semaphore = asyncio.Semaphore(concurrency)
+        res = BulkResult()
+
+        async def _fetch_one(pair: StateYear) -> None:
+            async with semaphore:
+                try:
+                    res.vacations[pair] = await self.state_vacations(*pair)
+                except Exception as ex:  # pylint: disable=broad-except
+                    res.errors[pair] = ex
+
+        await asyncio.gather(*(_fetch_one(pair) for pair in pairs))
+        return res
+
+
+class VacationStream:  # pylint: disable=too-many-instance-attributes
+    """
+    Asynchronous iterator over the vacations of a streamed response.
+    The response is released when the iteration is exhausted, fails or
+    `aclose()` is called. The retry policy and the circuit breaker of the
+    client apply to establishing the stream, but not to reading the body.
+
+    Args:
+        client: The client making the request.
+        api_url: The url to request.
+        chunk_size: Number of bytes to read at once.
+        owns_client: Close the client when the stream is closed.
+    """
+
+    def __init__(self, client: AsyncFerienClient, api_url: APIUrl,
+                 chunk_size: int = API_STREAM_CHUNK_SIZE,
+                 owns_client: bool = False) -> None:
+        self._client = client
+        self._api_url = api_url
+        self._chunk_size = chunk_size
+        self._owns_client = owns_client
+        self._decoder = JsonArrayDecoder()
+        self._items = deque()  # type: VacationQueue
+        self._stream = None  # type: Any
+        self._resp = None  # type: OptionalStreamedResponse
+        self._done = False
+
+    def __aiter__(self) -> 'VacationStream':
+        return self
+
+    async def __anext__(self) -> Vacation:
+        try:
+            while not self._items:
+                if self._done:
+                    raise StopAsyncIteration()
+                await self._read()
+        except BaseException:
+            await self.aclose()
+            raise
+        return self._items.popleft()
+
+    async def _read(self) -> None:
+        # pylint: disable=protected-access
+        await self._client._ensure_dataset()
+        if self._client.dataset is not None:
+            self._items.extend(self._client.dataset)
+            self._done = True
+            return
+        if self._resp is None:
+            self._resp = await self._open()
+        chunk = await self._resp.read(self._chunk_size)
+        if chunk:
+            items = self._decoder.feed(chunk)
+        else:
+            items = self._decoder.close()
+            self._done = True
+        self._items.extend(Vacation.from_dict(item) for item in items)
+
+    async def _open(self) -> StreamedResponse:
+        # Like AsyncFerienClient._make_api_request: Only establishing the
+        # stream is guarded by the circuit breaker and retried, errors
+        # while reading the body are raised as is.
+        # pylint: disable=protected-access,duplicate-code
+        client = self._client
+        attempt = 0
+        while True:
+            client._before_request()
+            started, resp = client._clock(), None
+            try:
+                self._stream = client.transport.stream(self._api_url)
+                # pylint: disable=unnecessary-dunder-call
+                resp = cast(StreamedResponse,
+                            await self._stream.__aenter__())
+                if resp.status != HTTP_OK:
+                    raise api_error(resp.status, resp.text)
+            except BaseException as ex:
+                await self._release()
+                client._request_done(self._api_url, attempt, started, resp,
+                                     ex)
+                retry_in = client._retry_in(self._api_url, attempt, ex)
+                if retry_in is None:
+                    raise
+            else:
+                client._request_done(self._api_url, attempt, started, resp,
+                                     None)
+                return resp
+            attempt += 1
+            await asyncio.sleep(retry_in)
+
+    async def _release(self) -> None:
+        if self._stream is not None:
+            stream, self._stream = self._stream, None
+            await stream.__aexit__(None, None, None)
+
+    async def aclose(self) -> None:
+        """Releases the response (and the client if owned)."""
+        self._done = True
+        self._resp = None
+        await self._release()
+        if self._owns_client:
+            self._owns_client = False
+            await self._client.close()
+
+
+def _convert_chunk(resp: APIResponse) -> List[Vacation]:
+    return [Vacation.from_dict(entry) for entry in resp]
+
+
+async def _convert_json(
+        resp: APIResponse, chunk_size: int = API_CONVERT_CHUNK_SIZE,
+        executor_threshold: Optional[int] = None) -> List[Vacation]:
+    if executor_threshold is not None and len(resp) >= executor_threshold:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, _convert_chunk, resp)
+
+    res = []  # type: List[Vacation]
+    for start in range(0, len(resp), chunk_size):
+        if start:
+            # Give back control to the event loop after each chunk
+            await asyncio.sleep(0.0)
+        res.extend(_convert_chunk(resp[start:start + chunk_size]))
     return res
 
 
-async def all_vacations_async() -> List[Vacation]:
+StateLookup = Callable[[StateCode, Optional[datetime]],
+                       Awaitable[Optional[Vacation]]]
+
+
+async def _by_state(lookup: StateLookup,
+                    states: Optional[Iterable[StateCode]],
+                    dt: Optional[datetime]) -> StateVacations:
+    codes = [code for code, _ in state_year_pairs(states)]
+    # All states are looked up at the same point in time
+    dt = make_tz_aware_timestamp(dt)
+    res = await asyncio.gather(*(lookup(code, dt) for code in codes))
+    return dict(zip(codes, res))
+
+
+# Concurrent module level calls without a client share a single request
+_FLIGHTS = AsyncSingleFlight()
+
+
+async def _with_tmp_client(
+        fun: Callable[[AsyncFerienClient], Awaitable[List[Vacation]]]
+) -> List[Vacation]:
+    async with AsyncFerienClient() as tmp_client:
+        return await fun(tmp_client)
+
+
+async def all_vacations_async(
+        client: Optional[AsyncFerienClient] = None) -> List[Vacation]:
     """Makes an async request to the ferien-api.de retrieving all
-    vacations for all states at once"""
-    return await _convert_json(await _make_api_request(API_ALL_URL))
+    vacations for all states at once. Pass a client to reuse its
+    connections, otherwise a short-lived one is used (and shared by all
+    concurrent calls)."""
+    if client is not None:
+        return await client.all_vacations()
+    return list(await _FLIGHTS.do(API_ALL_URL, lambda: _with_tmp_client(
+        lambda tmp_client: tmp_client.all_vacations()
+    )))
 
 
-async def state_vacations_async(state_code: StateCode,
-                                year: Optional[int] = None) -> List[Vacation]:
+async def state_vacations_async(
+        state_code: StateCode, year: Optional[int] = None,
+        client: Optional[AsyncFerienClient] = None) -> List[Vacation]:
     """Makes an async request to the ferien-api.de using the given
-    state_code and - optionally - the specified year."""
-    state_code = parse_state_code(state_code)
-    year = year and parse_year(year)
+    state_code and - optionally - the specified year. Pass a client to
+    reuse its connections, otherwise a short-lived one is used (and shared
+    by all concurrent calls of the same state and year)."""
+    if client is not None:
+        return await client.state_vacations(state_code, year)
+    api_url = state_url(state_code, year)
+    return list(await _FLIGHTS.do(api_url, lambda: _with_tmp_client(
+        lambda tmp_client: tmp_client.state_vacations(state_code, year)
+    )))
 
-    if year is None:
-        resp = await _make_api_request(
-            API_STATE_URL.format(state_code=state_code)
-        )
-    else:
-        resp = await _make_api_request(
-            API_STATE_YEAR_URL.format(state_code=state_code, year=str(year))
-        )
 
-    return await _convert_json(resp)
+async def current_vacation_async(
+        state_code: StateCode, dt: Optional[datetime] = None,
+        client: Optional[AsyncFerienClient] = None) -> Optional[Vacation]:
+    """Returns the current vacation of the given state based on the given
+    dt (default: now) without blocking the event loop. Returns None if no
+    vacation surrounds (start, end) the given dt. See
+    `state_vacations_async` for the client argument."""
+    if client is not None:
+        return await client.current_vacation(state_code, dt)
+    return find_current(await state_vacations_async(state_code), dt)
+
+
+async def next_vacation_async(
+        state_code: StateCode, dt: Optional[datetime] = None,
+        client: Optional[AsyncFerienClient] = None) -> Optional[Vacation]:
+    """Returns the next vacation of the given state based on the given dt
+    (default: now) without blocking the event loop. Returns None if no
+    vacation is left. See `state_vacations_async` for the client
+    argument."""
+    if client is not None:
+        return await client.next_vacation(state_code, dt)
+    return find_next(await state_vacations_async(state_code), dt)
+
+
+async def current_vacations_async(
+        states: Optional[Iterable[StateCode]] = None,
+        dt: Optional[datetime] = None,
+        client: Optional[AsyncFerienClient] = None) -> StateVacations:
+    """Returns the current vacation (or None) of each of the given states
+    (default: all) by state code. The states are resolved concurrently.
+    Pass a client to reuse its connections, otherwise a short-lived one is
+    used."""
+    if client is not None:
+        return await client.current_vacations(states, dt)
+    async with AsyncFerienClient() as tmp_client:
+        return await tmp_client.current_vacations(states, dt)
+
+
+async def next_vacations_async(
+        states: Optional[Iterable[StateCode]] = None,
+        dt: Optional[datetime] = None,
+        client: Optional[AsyncFerienClient] = None) -> StateVacations:
+    """Returns the next vacation (or None) of each of the given states
+    (default: all) by state code. The states are resolved concurrently.
+    Pass a client to reuse its connections, otherwise a short-lived one is
+    used."""
+    if client is not None:
+        return await client.next_vacations(states, dt)
+    async with AsyncFerienClient() as tmp_client:
+        return await tmp_client.next_vacations(states, dt)
+
+
+async def fetch_states_async(
+        states: Optional[Iterable[StateCode]] = None,
+        years: Optional[Iterable[int]] = None,
+        concurrency: int = API_BULK_CONCURRENCY,
+        client: Optional[AsyncFerienClient] = None) -> BulkResult:
+    """Fetches the vacations of all combinations of the given states
+    (default: all) and years (default: all years) concurrently. See
+    `AsyncFerienClient.fetch_states`."""
+    if client is not None:
+        return await client.fetch_states(states, years, concurrency)
+    async with AsyncFerienClient(limit=concurrency) as tmp_client:
+        return await tmp_client.fetch_states(states, years, concurrency)
+
+
+def aiter_all_vacations(
+        client: Optional[AsyncFerienClient] = None) -> VacationStream:
+    """Makes an async request to the ferien-api.de retrieving all
+    vacations for all states at once and yields them while the response
+    is parsed incrementally:
+
+        async for vac in aiter_all_vacations():
+            ...
+    """
+    if client is not None:
+        return client.iter_all_vacations()
+    tmp_client = AsyncFerienClient()
+    return VacationStream(tmp_client, tmp_client.rebase_url(API_ALL_URL),
+                          owns_client=True)
@@ -0,0 +1,355 @@
+"""Contains the logic shared by the synchronous and the asynchronous
+client."""
+import logging
+import time
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple
+
+import attr
+
+from .cache import Cache, CacheEntry
+from .const import API_ALL_URL, API_DATASET_RETRY_INTERVAL
+from .instrument import (
+    CACHE_HIT, CACHE_MISS, CACHE_STALE, CacheEvent, ConvertEvent, Observer,
+    RequestEvent
+)
+from .dataset import Dataset, VacationIndex
+from .errors import ApiError, CircuitOpenError, RateLimitedError, ServerError
+from .index import VacationCalendar
+from .model import Vacation
+from .resilience import (
+    HTTP_TOO_MANY_REQUESTS, CircuitBreaker, RetryPolicy, is_failure,
+    parse_retry_after
+)
+from .types import APIResponse, APIUrl, StateCode, StateYear
+from .util import parse_state_code, parse_year
+
+_LOGGER = logging.getLogger(__name__)
+
+ConvertedMemo = Dict[APIUrl, Tuple[float, List[Vacation]]]
+
+UrlSet = Set[APIUrl]
+
+BulkVacations = Dict[StateYear, List[Vacation]]
+
+BulkErrors = Dict[StateYear, Exception]
+
+Observers = List[Observer]
+
+# Single flight key of the dataset download
+DATASET_KEY = ('dataset',)
+
+HTTP_OK = 200
+HTTP_NOT_MODIFIED = 304
+HTTP_SERVER_ERROR = 500
+
+
+# pylint: disable=too-few-public-methods
+@attr.s
+class BulkResult:
+    """Result of a bulk fetch: The vacations and the errors by
+    (state code, year) - year is None when all years were requested."""
+    vacations = attr.ib(
+        default=attr.Factory(dict)
+    )  # type: BulkVacations
+    errors = attr.ib(
+        default=attr.Factory(dict)
+    )  # type: BulkErrors
+
+    @property
+    def ok(self) -> bool:  # pylint: disable=invalid-name
+        """Checks if all requests succeeded."""
+        return not self.errors
+
+
+def api_error(status: int, text: str,
+              headers: Optional[Mapping[str, str]] = None) -> ApiError:
+    """Returns the error raised when ferien-api.de responds with an
+    unexpected http status code."""
+    retry_after = parse_retry_after((headers or {}).get('Retry-After'))
+    if status == HTTP_TOO_MANY_REQUESTS:
+        return RateLimitedError(status, text, retry_after)
+    if status >= HTTP_SERVER_ERROR:
+        return ServerError(status, text, retry_after)
+    return ApiError(status, text, retry_after)
+
+
+# pylint: disable=too-few-public-methods,too-many-instance-attributes
+class BaseClient:
+    """
+    Base class of `FerienClient` and `AsyncFerienClient`.
+
+    When a cache is configured, expired entries are revalidated by sending
+    `If-None-Match` / `If-Modified-Since` using the stored validators. A
+    '304 Not Modified' response keeps the already converted `Vacation`
+    list. With `stale_while_revalidate` expired entries are served right
+    away while the revalidation runs in the background.
+
+    When a dataset (e.g. a loaded snapshot, see `ferien.snapshot`) is
+    given, all requests are answered from it without touching the network.
+    With dataset_ttl the client downloads all vacations at once (see
+    `load_dataset`), answers all requests from that local dataset and
+    downloads it again once it is older than dataset_ttl seconds. If that
+    download fails, the previous dataset is served and the download is
+    retried after a delay that doubles with every consecutive failure
+    (starting at `const.API_DATASET_RETRY_INTERVAL`, capped at dataset_ttl).
+
+    Failed requests are retried according to the retry policy. While the
+    circuit breaker is open, requests fail fast with a `CircuitOpenError`
+    or are answered from expired cache entries (see `ferien.resilience`).
+
+    Requests, conversions and cache lookups can be observed by registering
+    an observer (see `ferien.instrument`) via `add_observer`.
+
+    Args:
+        cache: Optional response cache (see `ferien.cache`).
+        stale_while_revalidate: Serve expired entries while revalidating
+            them in the background. Requires a cache.
+        dataset: Optional local dataset to serve all requests from.
+        base_url: Url of the holidays endpoint to use instead of
+            `const.API_ALL_URL` (e.g. a local server).
+        dataset_ttl: Serve all requests from a local dataset that is
+            downloaded again after that many seconds.
+        retry: Optional retry policy of failed requests.
+        circuit_breaker: Optional circuit breaker.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, cache: Optional[Cache] = None,
+                 stale_while_revalidate: bool = False,
+                 dataset: Optional[Dataset] = None,
+                 base_url: APIUrl = API_ALL_URL,
+                 dataset_ttl: Optional[float] = None,
+                 retry: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None) -> None:
+        if stale_while_revalidate and cache is None:
+            raise ValueError("Argument stale_while_revalidate requires "
+                             "argument cache to be set")
+        self.cache = cache
+        self.stale_while_revalidate = stale_while_revalidate
+        self.dataset = dataset
+        self.dataset_ttl = dataset_ttl
+        self.base_url = base_url.rstrip('/')
+        self.retry = retry
+        self.circuit_breaker = circuit_breaker
+        self._dataset_expires = 0.0
+        self._dataset_failures = 0
+        if dataset is not None and dataset_ttl is not None:
+            self._dataset_expires = time.time() + dataset_ttl
+        self._converted = {}  # type: ConvertedMemo
+        self._revalidating = set()  # type: UrlSet
+        self._observers = []  # type: Observers
+
+    def add_observer(self, observer: Observer) -> None:
+        """Registers an observer to be notified about requests,
+        conversions and cache lookups."""
+        self._observers = self._observers + [observer]
+
+    def remove_observer(self, observer: Observer) -> None:
+        """Unregisters a previously registered observer."""
+        self._observers = [
+            obs for obs in self._observers if obs is not observer
+        ]
+
+    def _clock(self) -> float:
+        """Returns the current time for instrumentation (0.0 if nobody is
+        observing)."""
+        return time.perf_counter() if self._observers else 0.0
+
+    def _before_request(self) -> None:
+        """Raises a `CircuitOpenError` if the circuit breaker does not let
+        the next request attempt through."""
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.before_request()
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def _request_done(self, api_url: APIUrl, attempt: int, started: float,
+                      resp: Any, error: Optional[BaseException]) -> None:
+        """Records the outcome of a request attempt at the circuit breaker
+        and notifies the observers. resp is the `transport.Response` (or
+        `transport.StreamedResponse`) or None if there was none, error is
+        the raised error (if any)."""
+        breaker = self.circuit_breaker
+        if breaker is not None:
+            if error is not None and is_failure(error):
+                breaker.record_failure()
+            elif error is None or isinstance(error, Exception):
+                breaker.record_success()
+            else:
+                breaker.record_abort()
+        if not self._observers:
+            return
+        # Streamed responses are neither measured nor decoded at once
+        event = RequestEvent(
+            api_url, 0 if resp is None else resp.status,
+            time.perf_counter() - started,
+            decode_time=getattr(resp, 'decode_time', 0.0),
+            size=getattr(resp, 'size', 0),
+            retries=1 if attempt else 0,
+            error=error if resp is None and isinstance(error, Exception)
+            else None,
+            attempt=attempt
+        )
+        for observer in self._observers:
+            observer.on_request(event)
+
+    def _retry_in(self, api_url: APIUrl, attempt: int,
+                  error: BaseException) -> Optional[float]:
+        """Returns the seconds to wait before retrying the given (zero
+        based) attempt that failed with error or None if the error has to
+        be raised (see `RetryPolicy.retry_in`)."""
+        if self.retry is None:
+            return None
+        retry_in = self.retry.retry_in(attempt, error)
+        if retry_in is not None:
+            _LOGGER.debug("Retrying '%s' in %.2fs: %s", api_url, retry_in,
+                          error)
+        return retry_in
+
+    @staticmethod
+    def _fallback(api_url: APIUrl, entry: Optional[CacheEntry],
+                  error: CircuitOpenError) -> CacheEntry:
+        """Returns the expired cache entry to serve while the circuit
+        breaker is open. Raises the error if there is none."""
+        if entry is None:
+            raise error
+        _LOGGER.warning("Serving expired '%s': %s", api_url, error)
+        return entry
+
+    def _convert_done(self, api_url: APIUrl, started: float,
+                      vacs: List[Vacation]) -> None:
+        """Notifies the observers about a finished conversion."""
+        if not self._observers:
+            return
+        event = ConvertEvent(api_url, len(vacs),
+                             time.perf_counter() - started)
+        for observer in self._observers:
+            observer.on_convert(event)
+
+    def _cache_lookup_done(self, api_url: APIUrl, outcome: str) -> None:
+        if not self._observers:
+            return
+        event = CacheEvent(api_url, outcome)
+        for observer in self._observers:
+            observer.on_cache(event)
+
+    def rebase_url(self, api_url: APIUrl) -> APIUrl:
+        """Returns the given api url (see `const`) with `const.API_ALL_URL`
+        replaced by the base url of this client."""
+        return self.base_url + api_url[len(API_ALL_URL):]
+
+    def _dataset_expired(self) -> bool:
+        """Checks if the local dataset has to be downloaded (again)."""
+        return self.dataset_ttl is not None and (
+            self.dataset is None or time.time() >= self._dataset_expires
+        )
+
+    def _set_dataset(self, vacs: List[Vacation]) -> VacationIndex:
+        index = VacationIndex(vacs)
+        self.dataset = index
+        self._dataset_expires = time.time() + (self.dataset_ttl or 0.0)
+        self._dataset_failures = 0
+        return index
+
+    def _dataset_failed(self) -> None:
+        """Keeps serving the previous dataset after a failed download and
+        postpones the next download (exponential backoff)."""
+        delay = min(
+            API_DATASET_RETRY_INTERVAL * 2 ** self._dataset_failures,
+            self.dataset_ttl or 0.0
+        )
+        self._dataset_failures += 1
+        self._dataset_expires = time.time() + delay
+        _LOGGER.exception("Refreshing the local dataset failed. Serving "
+                          "the previous one for %.0fs", delay)
+
+    def _calendar(self,
+                  state_code: StateCode
+                  ) -> Optional[VacationCalendar[Vacation]]:
+        """Returns the calendar of the given state if the dataset is an
+        index, otherwise None."""
+        if not isinstance(self.dataset, VacationIndex):
+            return None
+        return self.dataset.calendar(parse_state_code(state_code))
+
+    def _from_dataset(self, state_code: Optional[StateCode] = None,
+                      year: Optional[int] = None) -> Optional[List[Vacation]]:
+        """Returns the vacations of the given state / year from the local
+        dataset or None if there is no dataset."""
+        if self.dataset is None:
+            return None
+        if state_code is not None:
+            state_code = parse_state_code(state_code)
+        return self.dataset.select(state_code, year and parse_year(year))
+
+    def _revalidate_in_background(self, api_url: APIUrl,
+                                  entry: CacheEntry) -> None:
+        raise NotImplementedError()  # pragma: no cover
+
+    def _lookup(self, api_url: APIUrl) -> Tuple[Optional[CacheEntry], bool]:
+        """Returns the cached entry of the given url (if any) and whether
+        it can be used right away. Schedules a background revalidation
+        when a stale entry is served."""
+        if self.cache is None:
+            return None, False
+        entry = self.cache.lookup(api_url)
+        if entry is None:
+            self._cache_lookup_done(api_url, CACHE_MISS)
+            return None, False
+        if entry.is_fresh():
+            self._cache_lookup_done(api_url, CACHE_HIT)
+            return entry, True
+        if self.stale_while_revalidate:
+            self._cache_lookup_done(api_url, CACHE_STALE)
+            self._revalidate_in_background(api_url, entry)
+            return entry, True
+        self._cache_lookup_done(api_url, CACHE_MISS)
+        return entry, False
+
+    @staticmethod
+    def _unpack_response(resp: Any) -> Tuple[
+            int, Mapping[str, str], Optional[APIResponse]]:
+        """Unpacks a `transport.Response` and raises on unexpected status
+        codes."""
+        if resp.status == HTTP_NOT_MODIFIED:
+            return resp.status, resp.headers, None
+        if resp.status != HTTP_OK:
+            raise api_error(resp.status, resp.text, resp.headers)
+        return resp.status, resp.headers, resp.payload
+
+    @staticmethod
+    def _request_headers(entry: Optional[CacheEntry]) -> Dict[str, str]:
+        return {} if entry is None else entry.conditional_headers()
+
+    def _store(self, api_url: APIUrl, entry: Optional[CacheEntry],
+               status: int, headers: Mapping[str, str],
+               payload: Optional[APIResponse]) -> CacheEntry:
+        if status == HTTP_NOT_MODIFIED and entry is not None:
+            if self.cache is None:
+                return entry
+            return self.cache.refresh(api_url, entry)
+        if payload is None:
+            raise api_error(status, 'Response without payload')
+        if self.cache is None:
+            return CacheEntry(payload, 0.0)
+        return self.cache.set(
+            api_url, payload,
+            etag=headers.get('ETag'),
+            last_modified=headers.get('Last-Modified')
+        )
+
+    def _get_converted(self, api_url: APIUrl,
+                       entry: CacheEntry) -> Optional[List[Vacation]]:
+        memo = self._converted.get(api_url)
+        if memo is None or memo[0] != entry.fetched:
+            return None
+        return list(memo[1])
+
+    def _set_converted(self, api_url: APIUrl, entry: CacheEntry,
+                       vacs: List[Vacation]) -> List[Vacation]:
+        if self.cache is not None:
+            self._converted[api_url] = (entry.fetched, vacs)
+        return list(vacs)
+
+    @staticmethod
+    def _log_revalidation_error(api_url: APIUrl) -> None:
+        _LOGGER.exception("Revalidation of '%s' failed", api_url)
@@ -0,0 +1,182 @@
+"""Vectorized lookups of many timestamps at once.
+
+Requires numpy (`pip install ferien-api[numpy]`).
+
+Timestamps may be given as `datetime` objects (naive ones are treated as
+german local time, see `util.make_tz_aware_timestamp`), as numpy
+`datetime64` values (UTC) or as epoch seconds (UTC). State codes may be
+omitted (all states), a single state code or one state code per timestamp.
+"""
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .const import ALL_STATE_CODES
+from .model import AnyVacation
+from .util import check_vac_list, make_tz_aware_timestamp, parse_state_code
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+_MICROSECOND = timedelta(microseconds=1)
+
+# Every state gets its own range of keys (in microseconds) of that width,
+# so the lookups of all states can be answered by a single searchsorted.
+_SPAN = 2 ** 55
+
+Partitions = Dict[int, List[int]]
+
+
+def _numpy() -> Any:
+    try:
+        import numpy  # pylint: disable=import-outside-toplevel
+    except ImportError as ex:  # pragma: no cover
+        raise ImportError("Batch lookups require numpy. "
+                          "Install it via 'pip install ferien-api[numpy]'"
+                          ) from ex
+    return numpy
+
+
+def _to_micros(dt: datetime) -> int:
+    return (make_tz_aware_timestamp(dt) - _EPOCH) // _MICROSECOND
+
+
+def to_epoch_micros(dts: Any) -> Any:
+    """Converts the given timestamps to an int64 array of microseconds
+    since the epoch."""
+    np = _numpy()
+    arr = np.asarray(dts)
+    if arr.dtype.kind == 'M':
+        return arr.astype('datetime64[us]').astype(np.int64)
+    if arr.dtype.kind in 'iu':
+        return arr.astype(np.int64) * 1000000
+    if arr.dtype.kind == 'f':
+        return np.floor(arr * 1e6).astype(np.int64)
+    return np.fromiter(
+        (_to_micros(dt) for dt in arr.ravel()), dtype=np.int64,
+        count=arr.size
+    ).reshape(arr.shape)
+
+
+class BatchLookup:
+    """
+    Answers `find_current` / `find_next` for many timestamps in one
+    vectorized pass. The results are indices into `vacations` (which
+    keeps the order of the given vacations) or -1 if there is no match.
+    They are identical to the results of `util.find_current` and
+    `util.find_next` applied per timestamp to the vacations of the
+    respective state.
+
+    Args:
+        vacs: The vacations to look up.
+    """
+
+    def __init__(self, vacs: Iterable[AnyVacation]) -> None:
+        self.vacations = tuple(vacs)
+        check_vac_list(self.vacations)
+        self._starts = [_to_micros(vac.start) for vac in self.vacations]
+        self._ends = [_to_micros(vac.end) for vac in self.vacations]
+        self._tables = {}  # type: Dict[bool, Tuple[Any, ...]]
+
+    def _partitions(self, by_state: bool) -> Partitions:
+        res = {}  # type: Partitions
+        for pos, vac in enumerate(self.vacations):
+            slot = ALL_STATE_CODES.index(vac.state_code) if by_state else 0
+            res.setdefault(slot, []).append(pos)
+        return res
+
+    def _current_segments(self, slot: int,
+                          positions: Sequence[int]) -> List[Tuple[int, int]]:
+        # Sweep over all start / end events. In between two events the
+        # result of find_current does not change: It is the vacation that
+        # is active and comes last in the original order.
+        events = sorted(
+            [(self._starts[pos], True, pos) for pos in positions]
+            + [(self._ends[pos] + 1, False, pos) for pos in positions]
+        )
+        active = set()
+        res = []
+        for key, group in groupby(events, key=lambda event: event[0]):
+            for _, is_start, pos in group:
+                if is_start:
+                    active.add(pos)
+                else:
+                    active.discard(pos)
+            res.append((slot * _SPAN + key, max(active, default=-1)))
+        return res
+
+    def _table(self, by_state: bool) -> Tuple[Any, ...]:
+        table = self._tables.get(by_state)
+        if table is not None:
+            return table
+
+        np = _numpy()
+        segments = []  # type: List[Tuple[int, int]]
+        starts = []  # type: List[Tuple[int, int, int]]
+        for slot, positions in sorted(self._partitions(by_state).items()):
+            segments.extend(self._current_segments(slot, positions))
+            starts.extend(
+                (slot * _SPAN + self._starts[pos], pos, slot)
+                for pos in positions
+            )
+        starts.sort()
+        table = (
+            np.array([key for key, _ in segments], dtype=np.int64),
+            np.array([pos for _, pos in segments], dtype=np.int64),
+            np.array([key for key, _, _ in starts], dtype=np.int64),
+            np.array([pos for _, pos, _ in starts], dtype=np.int64),
+            np.array([slot for _, _, slot in starts], dtype=np.int64)
+        )
+        self._tables[by_state] = table
+        return table
+
+    @staticmethod
+    def _slots(state_codes: Any, shape: Tuple[int, ...]) -> Any:
+        np = _numpy()
+        if state_codes is None:
+            return np.zeros(shape, dtype=np.int64)
+        codes = np.asarray(state_codes)
+        uniq, inverse = np.unique(codes, return_inverse=True)
+        lut = np.array(
+            [ALL_STATE_CODES.index(parse_state_code(code)) for code in uniq],
+            dtype=np.int64
+        )
+        return np.broadcast_to(lut[inverse].reshape(codes.shape), shape)
+
+    def _keys(self, dts: Any, state_codes: Any) -> Tuple[Any, Any]:
+        micros = to_epoch_micros(dts)
+        slots = self._slots(state_codes, micros.shape)
+        return slots * _SPAN + micros, slots
+
+    def find_current(self, dts: Any,
+                     state_codes: Optional[Any] = None) -> Any:
+        """Returns the indices of the current vacations for all given
+        timestamps (-1 if there is no current vacation)."""
+        np = _numpy()
+        seg_keys, seg_pos, _, _, _ = self._table(state_codes is not None)
+        keys, _ = self._keys(dts, state_codes)
+        if not len(seg_keys):  # pylint: disable=len-as-condition
+            return np.full(keys.shape, -1, dtype=np.int64)
+        idx = np.searchsorted(seg_keys, keys, side='right') - 1
+        return np.where(idx >= 0, seg_pos[np.maximum(idx, 0)], -1)
+
+    def is_vacation(self, dts: Any, state_codes: Optional[Any] = None) -> Any:
+        """Returns a boolean array telling which of the given timestamps
+        are during vacations."""
+        return self.find_current(dts, state_codes) >= 0
+
+    def find_next(self, dts: Any, state_codes: Optional[Any] = None) -> Any:
+        """Returns the indices of the next vacations for all given
+        timestamps (-1 if there is no vacation left)."""
+        np = _numpy()
+        _, _, start_keys, start_pos, start_slots = self._table(
+            state_codes is not None
+        )
+        keys, slots = self._keys(dts, state_codes)
+        if not len(start_keys):  # pylint: disable=len-as-condition
+            return np.full(keys.shape, -1, dtype=np.int64)
+        idx = np.minimum(
+            np.searchsorted(start_keys, keys, side='left'),
+            len(start_keys) - 1
+        )
+        found = (start_keys[idx] >= keys) & (start_slots[idx] == slots)
+        return np.where(found, start_pos[idx], -1)
@@ -0,0 +1,312 @@
+"""Contains response caches used by sync and async clients.
+
+Holiday data changes at most a few times a year, so api responses are
+cached by their url (see `const.API_ALL_URL`, `const.API_STATE_URL` and
+`const.API_STATE_YEAR_URL`) for a configurable time to live. The least
+recently used entries are evicted when a cache is full.
+
+Expired entries are kept until they are evicted, so their validators
+(ETag / Last-Modified) can be used to revalidate them with a conditional
+request.
+"""
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, cast
+
+import attr
+
+from .const import API_CACHE_SIZE, API_CACHE_TTL
+from .types import APIResponse, APIUrl
+
+
+def _now() -> float:
+    return time.time()
+
+
+# pylint: disable=too-few-public-methods
+@attr.s(eq=False)
+class CacheEntry:
+    """A single cached api response, the point in time (epoch seconds)
+    it expires, the point in time it was downloaded and its validators.
+    Entries loaded from disk keep the raw json and decode it on first
+    access of payload."""
+    _payload = attr.ib()  # type: Optional[APIResponse]
+    expires = attr.ib(type=float)  # type: float
+    fetched = attr.ib(type=float, default=0.0)  # type: float
+    etag = attr.ib(default=None)  # type: Optional[str]
+    last_modified = attr.ib(default=None)  # type: Optional[str]
+    raw = attr.ib(default=None, repr=False, eq=False)  # type: Optional[str]
+
+    @property
+    def payload(self) -> APIResponse:
+        """Returns the cached response."""
+        if self._payload is None and self.raw is not None:
+            self._payload = json.loads(self.raw)
+        return cast(APIResponse, self._payload)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CacheEntry):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def _key(self) -> Tuple[Any, ...]:
+        return (self.payload, self.expires, self.fetched, self.etag,
+                self.last_modified)
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        """Checks if the entry has not expired yet."""
+        return (_now() if now is None else now) < self.expires
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Returns the request headers to revalidate this entry."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+@attr.s
+class CacheStats:
+    """Hit / miss statistics of a cache instance."""
+    hits = attr.ib(type=int, default=0)  # type: int
+    misses = attr.ib(type=int, default=0)  # type: int
+    evictions = attr.ib(type=int, default=0)  # type: int
+
+    @property
+    def hit_ratio(self) -> float:
+        """Returns the ratio of hits to all lookups (0.0 if there was no
+        lookup yet)."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class Cache(ABC):
+    """
+    Base class of all response caches.
+
+    Args:
+        ttl: Time to live of an entry in seconds.
+        max_size: Maximum number of entries. The least recently used
+            entries are evicted first.
+    """
+
+    def __init__(self, ttl: float = API_CACHE_TTL,
+                 max_size: int = API_CACHE_SIZE) -> None:
+        if ttl <= 0:
+            # pylint: disable=consider-using-f-string
+            raise ValueError("Argument ttl is expected to be greater than "
+                             "zero, but is {}".format(ttl))
+        if max_size < 1:
+            # pylint: disable=consider-using-f-string
+            raise ValueError("Argument max_size is expected to be greater "
+                             "than zero, but is {}".format(max_size))
+        self.ttl = ttl
+        self.max_size = max_size
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+    def get(self, key: APIUrl) -> Optional[APIResponse]:
+        """Returns the cached response for the given url or None if there
+        is no fresh entry."""
+        entry = self.lookup(key)
+        if entry is None or not entry.is_fresh():
+            return None
+        return entry.payload
+
+    def lookup(self, key: APIUrl) -> Optional[CacheEntry]:
+        """Returns the entry of the given url - even if it is expired - or
+        None if there is no entry at all. Only fresh entries count as a
+        hit."""
+        with self._lock:
+            entry = self._load(key)
+            if entry is not None and entry.is_fresh():
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+            return entry
+
+    def set(self, key: APIUrl, payload: APIResponse,
+            etag: Optional[str] = None,
+            last_modified: Optional[str] = None) -> CacheEntry:
+        """Stores the response for the given url and its validators."""
+        now = _now()
+        entry = CacheEntry(payload, now + self.ttl, now, etag, last_modified)
+        with self._lock:
+            self._store(key, entry)
+            self.stats.evictions += self._evict()
+        return entry
+
+    def refresh(self, key: APIUrl, entry: CacheEntry) -> CacheEntry:
+        """Marks the given entry as fresh again, e.g. after the api
+        responded with '304 Not Modified'."""
+        entry = attr.evolve(entry, expires=_now() + self.ttl)
+        with self._lock:
+            self._store(key, entry)
+            self.stats.evictions += self._evict()
+        return entry
+
+    def delete(self, key: APIUrl) -> None:
+        """Removes the entry of the given url (if any)."""
+        with self._lock:
+            self._delete(key)
+
+    def clear(self) -> None:
+        """Removes all entries."""
+        with self._lock:
+            self._clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._size()
+
+    @abstractmethod
+    def _load(self, key: APIUrl) -> Optional[CacheEntry]:
+        """Loads the entry and marks it as recently used."""
+
+    @abstractmethod
+    def _store(self, key: APIUrl, entry: CacheEntry) -> None:
+        """Stores the entry and marks it as recently used."""
+
+    @abstractmethod
+    def _delete(self, key: APIUrl) -> None:
+        """Deletes the entry."""
+
+    @abstractmethod
+    def _clear(self) -> None:
+        """Deletes all entries."""
+
+    @abstractmethod
+    def _size(self) -> int:
+        """Returns the number of entries."""
+
+    @abstractmethod
+    def _evict(self) -> int:
+        """Evicts least recently used entries exceeding max_size. Returns
+        the number of evicted entries."""
+
+
+class MemoryCache(Cache):
+    """In-memory cache local to the current process."""
+
+    def __init__(self, ttl: float = API_CACHE_TTL,
+                 max_size: int = API_CACHE_SIZE) -> None:
+        super().__init__(ttl, max_size)
+        self._entries = OrderedDict()  # type: OrderedDict[APIUrl, CacheEntry]
+
+    def _load(self, key: APIUrl) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: APIUrl, entry: CacheEntry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+
+    def _delete(self, key: APIUrl) -> None:
+        self._entries.pop(key, None)
+
+    def _clear(self) -> None:
+        self._entries.clear()
+
+    def _size(self) -> int:
+        return len(self._entries)
+
+    def _evict(self) -> int:
+        evicted = 0
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            evicted += 1
+        return evicted
+
+
+class SQLiteCache(Cache):
+    """
+    On-disk cache backed by a sqlite database. Multiple processes on the
+    same host can share one database file.
+
+    Payloads are decoded only when they are accessed (see `CacheEntry`),
+    so a client serving an already converted response does not parse it
+    again. The last access of an entry - used to evict the least recently
+    used entries - is written at most once per access_resolution seconds.
+
+    Args:
+        path: Path to the database file.
+        ttl: Time to live of an entry in seconds.
+        max_size: Maximum number of entries.
+        access_resolution: Minimum number of seconds between two writes
+            of the last access of an entry.
+    """
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS responses ("
+        "url TEXT PRIMARY KEY, payload TEXT NOT NULL, "
+        "expires REAL NOT NULL, fetched REAL NOT NULL, etag TEXT, "
+        "last_modified TEXT, accessed REAL NOT NULL)"
+    )
+
+    def __init__(self, path: str, ttl: float = API_CACHE_TTL,
+                 max_size: int = API_CACHE_SIZE,
+                 access_resolution: float = 1.0) -> None:
+        super().__init__(ttl, max_size)
+        self.path = path
+        self.access_resolution = access_resolution
+        self._conn = sqlite3.connect(
+            path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute(self._SCHEMA)
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _execute(self, sql: str, *params: Any) -> Any:
+        return self._conn.execute(sql, params)
+
+    def _load(self, key: APIUrl) -> Optional[CacheEntry]:
+        row = self._execute(
+            "SELECT payload, expires, fetched, etag, last_modified, "
+            "accessed FROM responses WHERE url = ?", key
+        ).fetchone()
+        if row is None:
+            return None
+        now = _now()
+        if now - row[5] >= self.access_resolution:
+            self._execute(
+                "UPDATE responses SET accessed = ? WHERE url = ?", now, key
+            )
+        return CacheEntry(None, row[1], row[2], row[3], row[4], raw=row[0])
+
+    def _store(self, key: APIUrl, entry: CacheEntry) -> None:
+        self._execute(
+            "INSERT OR REPLACE INTO responses (url, payload, expires, "
+            "fetched, etag, last_modified, accessed) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            key, entry.raw if entry.raw is not None
+            else json.dumps(entry.payload), entry.expires, entry.fetched,
+            entry.etag, entry.last_modified, _now()
+        )
+
+    def _delete(self, key: APIUrl) -> None:
+        self._execute("DELETE FROM responses WHERE url = ?", key)
+
+    def _clear(self) -> None:
+        self._execute("DELETE FROM responses")
+
+    def _size(self) -> int:
+        return int(self._execute("SELECT COUNT(*) FROM responses")
+                   .fetchone()[0])
+
+    def _evict(self) -> int:
+        cursor = self._execute(
+            "DELETE FROM responses WHERE url IN (SELECT url FROM responses "
+            "ORDER BY accessed DESC LIMIT -1 OFFSET ?)", self.max_size
+        )
+        return int(cursor.rowcount)
@@ -1,6 +1,6 @@
 """Useful constants"""
-
-import pytz
+import sys
+from typing import Any, List
 
 ALL_STATE_CODES = [
     "BW", "BY", "BE", "BB", "HB", "HH",
@@ -17,4 +17,46 @@ API_STATE_YEAR_URL = 'https://ferien-api.de/api/v1/holidays/' \
 
 API_TIMEOUT = 5
 
-TZ_GERMANY = pytz.timezone("Europe/Berlin")
+API_CONNECT_TIMEOUT = API_TIMEOUT
+
+API_TOTAL_TIMEOUT = 30
+
+API_POOL_SIZE = 10
+
+API_CACHE_TTL = 3600
+
+API_CACHE_SIZE = 128
+
+API_BULK_CONCURRENCY = 8
+
+API_CONVERT_CHUNK_SIZE = 256
+
+API_STREAM_CHUNK_SIZE = 16384
+
+API_PROXY_INTERVAL = 3600
+
+API_DATASET_RETRY_INTERVAL = 60
+
+
+def state_codes() -> List[str]:
+    """Returns all known and valid state codes."""
+    return list(ALL_STATE_CODES)
+
+
+def _tz_germany() -> Any:
+    import pytz  # pylint: disable=import-outside-toplevel
+    return pytz.timezone("Europe/Berlin")
+
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name: str) -> Any:
+        # TZ_GERMANY (a pytz timezone) is created on first access, so
+        # pytz is not imported along with the package (see `ferien.tz`)
+        if name == 'TZ_GERMANY':
+            return _tz_germany()
+        # pylint: disable=consider-using-f-string
+        raise AttributeError("module {!r} has no attribute {!r}".format(
+            __name__, name
+        ))
+else:  # pragma: no cover
+    TZ_GERMANY = _tz_germany()
@@ -0,0 +1,78 @@
+"""Contains the local dataset the clients can serve all requests from.
+
+A single download of `const.API_ALL_URL` contains the vacations of all
+states and years. `VacationIndex` partitions them by state and year once,
+so `state_vacations` and the current / next lookups are answered locally
+instead of requesting every state and year separately.
+"""
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .index import HolidayBitmap, VacationCalendar
+from .model import Vacation, VacationTable
+from .types import StateCode
+
+Partitions = Dict[Tuple[Optional[StateCode], Optional[int]], List[Vacation]]
+
+OptionalCalendar = Optional[VacationCalendar[Vacation]]
+
+OptionalBitmap = Optional[HolidayBitmap]
+
+
+class VacationIndex:
+    """
+    Immutable index over all vacations partitioned by state and year.
+    `select` keeps the original order of the vacations.
+
+    Args:
+        vacs: The vacations to index, e.g. the result of `all_vacations`
+            or a loaded snapshot (see `ferien.snapshot`).
+    """
+
+    __slots__ = ('_vacs', '_partitions', '_calendar', '_bitmap')
+
+    def __init__(self, vacs: Iterable[Vacation]) -> None:
+        self._vacs = list(vacs)
+        partitions = {(None, None): self._vacs}  # type: Partitions
+        for vac in self._vacs:
+            for key in ((vac.state_code, None), (None, vac.year),
+                        (vac.state_code, vac.year)):
+                partitions.setdefault(key, []).append(vac)
+        self._partitions = partitions
+        self._calendar = None  # type: OptionalCalendar
+        self._bitmap = None  # type: OptionalBitmap
+
+    def __len__(self) -> int:
+        return len(self._vacs)
+
+    def __iter__(self) -> Iterator[Vacation]:
+        return iter(self._vacs)
+
+    def __repr__(self) -> str:
+        # pylint: disable=consider-using-f-string
+        return "VacationIndex(<{} vacations>)".format(len(self))
+
+    def select(self, state_code: Optional[StateCode] = None,
+               year: Optional[int] = None) -> List[Vacation]:
+        """Returns the vacations of the given state and / or year."""
+        return list(self._partitions.get((state_code, year), ()))
+
+    def calendar(self,
+                 state_code: Optional[StateCode] = None
+                 ) -> VacationCalendar[Vacation]:
+        """Returns the calendar of the given state (or of all states) for
+        fast current / next lookups."""
+        if self._calendar is None:
+            self._calendar = VacationCalendar(self._vacs)
+        if state_code is None:
+            return self._calendar
+        return self._calendar.for_state(state_code)
+
+    def bitmap(self) -> HolidayBitmap:
+        """Returns the per-day bitmap of all states for constant time
+        "is holiday" checks."""
+        if self._bitmap is None:
+            self._bitmap = HolidayBitmap(self._vacs)
+        return self._bitmap
+
+
+Dataset = Union[VacationTable, VacationIndex]
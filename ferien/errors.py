@@ -0,0 +1,60 @@
+"""Contains the exceptions raised by the sync and async clients.
+
+All of them derive from `FerienError`. Unexpected http status codes raise
+an `ApiError` (a `RuntimeError` like before), which is specialized for
+rate limiting (429) and server errors (5xx).
+"""
+from typing import Optional
+
+
+class FerienError(Exception):
+    """Base class of all ferien-api errors."""
+
+
+class ApiError(FerienError, RuntimeError):
+    """
+    ferien-api.de responded with an unexpected http status code.
+
+    Args:
+        status: The http status code.
+        text: The response text.
+        retry_after: Seconds to wait before the next request as requested
+            by the `Retry-After` header (if any).
+    """
+
+    def __init__(self, status: int, text: str,
+                 retry_after: Optional[float] = None) -> None:
+        # pylint: disable=consider-using-f-string
+        super().__init__("ferien-api.de failed with http code = '{}'\n"
+                         "Error: {}".format(status, text))
+        self.status = status
+        self.text = text
+        self.retry_after = retry_after
+
+
+class RateLimitedError(ApiError):
+    """ferien-api.de responded with '429 Too Many Requests'."""
+
+
+class ServerError(ApiError):
+    """ferien-api.de responded with a 5xx status code."""
+
+
+class RequestTimeoutError(FerienError, TimeoutError):
+    """The request did not finish in time."""
+
+
+class CircuitOpenError(FerienError):
+    """
+    The request was not made, because the circuit breaker is open after
+    too many failures (see `ferien.resilience.CircuitBreaker`).
+
+    Args:
+        retry_in: Seconds until the next request is let through.
+    """
+
+    def __init__(self, retry_in: float) -> None:
+        # pylint: disable=consider-using-f-string
+        super().__init__("ferien-api.de is unavailable. The circuit breaker "
+                         "is open for another {:.1f}s".format(retry_in))
+        self.retry_in = retry_in
@@ -0,0 +1,174 @@
+"""A local stand-in for ferien-api.de to benchmark and test against.
+
+The server answers the url shapes of `const.API_ALL_URL`,
+`const.API_STATE_URL` and `const.API_STATE_YEAR_URL` with synthetic
+vacations. The payload size and the latency of every response are
+configurable:
+
+    with FakeFerienServer(scale=100, latency=0.05) as server:
+        client = FerienClient(base_url=server.base_url)
+        client.state_vacations('HH', 2019)
+
+It can be run standalone as well:
+
+    python -m ferien.fake_server --port 8080 --scale 100
+"""
+import argparse
+import json
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from .const import ALL_STATE_CODES
+from .server import API_PATH, ApiRequestHandler, LocalServer
+from .types import APIResponse, StateCode
+
+# Name, month, day and duration in days of the synthetic vacations
+_VACATIONS = (
+    ('winterferien', 2, 1, 7),
+    ('osterferien', 4, 1, 14),
+    ('pfingstferien', 5, 20, 5),
+    ('sommerferien', 7, 1, 42),
+    ('herbstferien', 10, 10, 14),
+    ('weihnachtsferien', 12, 22, 14)
+)
+
+BodyCache = Dict[str, bytes]
+
+
+def synthetic_payload(states: Optional[Iterable[StateCode]] = None,
+                      years: Iterable[int] = range(2017, 2022),
+                      scale: int = 1) -> APIResponse:
+    """Returns a payload in the format of ferien-api.de. There are six
+    vacations per state and year, scale multiplies that number (the
+    copies are shifted by a day and get distinct slugs)."""
+    # pylint: disable=consider-using-f-string
+    res = []  # type: APIResponse
+    states = list(ALL_STATE_CODES if states is None else states)
+    for year in years:
+        for state_code in states:
+            offset = ALL_STATE_CODES.index(state_code)
+            for copy in range(scale):
+                for name, month, day, days in _VACATIONS:
+                    start = date(year, month, day) + timedelta(
+                        days=offset + copy % 7
+                    )
+                    suffix = '-{}'.format(copy) if copy else ''
+                    res.append({
+                        'start': start.isoformat(),
+                        'end': (start + timedelta(days=days)).isoformat(),
+                        'year': year,
+                        'stateCode': state_code,
+                        'name': name,
+                        'slug': '{}-{}-{}{}'.format(
+                            name, year, state_code, suffix
+                        )
+                    })
+    return res
+
+
+class _Handler(ApiRequestHandler):
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Answers a single api request."""
+        fake = self.server.owner
+        fake.count_request()
+        if fake.latency:
+            time.sleep(fake.latency)
+        body = fake.body(self.path)
+        if body is None:
+            self._send(404, b'Not found', 'text/plain')
+        else:
+            self._send(200, body, 'application/json')
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeFerienServer(LocalServer):
+    """
+    Serves synthetic vacations in a background thread. The response
+    bodies are serialized once per url.
+
+    Args:
+        payload: The vacations to serve. Defaults to `synthetic_payload`
+            with the given scale.
+        scale: Size multiplier of the synthetic payload.
+        latency: Delay (seconds) of every response.
+        host: The interface to bind.
+        port: The port to bind. 0 picks a free port.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, payload: Optional[APIResponse] = None,
+                 scale: int = 1, latency: float = 0.0,
+                 host: str = '127.0.0.1', port: int = 0) -> None:
+        super().__init__(_Handler, host, port)
+        self.payload = synthetic_payload(scale=scale) \
+            if payload is None else payload
+        self.latency = latency
+        self.request_count = 0
+        self._bodies = {}  # type: BodyCache
+        self._lock = threading.Lock()
+
+    def count_request(self) -> None:
+        """Counts a received request."""
+        with self._lock:
+            self.request_count += 1
+
+    def body(self, path: str) -> Optional[bytes]:
+        """Returns the serialized response of the given path or None if
+        the path is unknown."""
+        with self._lock:
+            body = self._bodies.get(path)
+        if body is None:
+            items = self._select(path)
+            if items is None:
+                return None
+            body = json.dumps(items).encode('utf-8')
+            with self._lock:
+                self._bodies[path] = body
+        return body
+
+    def _select(self, path: str) -> Optional[List[Any]]:
+        if path.rstrip('/') == API_PATH:
+            return self.payload
+        if not path.startswith(API_PATH + '/'):
+            return None
+        parts = path[len(API_PATH) + 1:].strip('/').split('/')
+        if len(parts) > 2 or parts[0] not in ALL_STATE_CODES:
+            return None
+        if len(parts) == 2 and not parts[1].isdigit():
+            return None
+        return [
+            item for item in self.payload
+            if item['stateCode'] == parts[0]
+            and (len(parts) == 1 or item['year'] == int(parts[1]))
+        ]
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    """Runs the fake server until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0.0)
+    opts = parser.parse_args(args)
+
+    server = FakeFerienServer(scale=opts.scale, latency=opts.latency,
+                              host=opts.host, port=opts.port)
+    # pylint: disable=consider-using-f-string
+    print("Serving {} vacations on {}".format(
+        len(server.payload), server.base_url
+    ))
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
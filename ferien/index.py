@@ -0,0 +1,329 @@
+"""Contains prebuilt lookup structures over a list of vacations."""
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from typing import (
+    Callable, Dict, Generic, Iterable, Iterator, List, Optional, Tuple, Union
+)
+
+from .const import ALL_STATE_CODES
+from .model import AnyVacation, VacationT
+from .tz import germany
+from .types import StateCode
+from .util import (
+    check_datetime, check_vac_list, make_tz_aware_timestamp, parse_state_code
+)
+
+StateCalendars = Dict[StateCode, 'VacationCalendar[VacationT]']
+
+DateRange = Tuple[datetime, datetime]
+
+EndFilter = Callable[[float], bool]
+
+Day = Union[date, datetime]
+
+# Safety margin (in seconds) for floating point inaccuracies of timestamps
+_EPSILON = 1.0
+
+
+class VacationCalendar(Generic[VacationT]):
+    """
+    Immutable index over a list of vacations.
+
+    The vacations are sorted by their start once, so `find_current` and
+    `find_next` are answered by binary search instead of a full scan. The
+    results are identical to `util.find_current` and `util.find_next`
+    applied to the original list. Use `for_state` to get the calendar
+    of a single state.
+
+    Range queries (`overlapping`, `covering`, `within` and
+    `states_on_holiday`) use the same sorted starts: Only vacations
+    starting at most the longest vacation duration before the range can
+    reach into it, so just that slice is inspected. All ranges are closed
+    intervals [start, end]. Naive datetimes are assumed to be german time.
+
+    Args:
+        vacs: The vacations to index.
+    """
+
+    __slots__ = (
+        '_vacs', '_order', '_starts', '_ends', '_max_duration', '_states'
+    )
+
+    def __init__(self, vacs: Iterable[VacationT]) -> None:
+        vacs = tuple(vacs)
+        check_vac_list(vacs)
+        # sorted is stable: Vacations starting at the same time keep
+        # their original order, just like util.find_next expects it.
+        order = sorted(range(len(vacs)), key=lambda i: vacs[i].start)
+        self._vacs = vacs  # type: Tuple[VacationT, ...]
+        self._order = tuple(order)
+        self._starts = [vacs[i].start.timestamp() for i in order]
+        self._ends = [vacs[i].end.timestamp() for i in order]
+        self._max_duration = max(
+            (end - start for start, end in zip(self._starts, self._ends)),
+            default=0.0
+        )
+        self._states = {}  # type: StateCalendars[VacationT]
+
+    def __len__(self) -> int:
+        return len(self._vacs)
+
+    def __iter__(self) -> Iterator[VacationT]:
+        return iter(self._vacs)
+
+    def __repr__(self) -> str:
+        # pylint: disable=consider-using-f-string
+        return "VacationCalendar(<{} vacations>)".format(len(self))
+
+    @property
+    def states(self) -> List[StateCode]:
+        """Returns the sorted state codes of all indexed vacations."""
+        return sorted({vac.state_code for vac in self._vacs})
+
+    def for_state(self,
+                  state_code: StateCode) -> 'VacationCalendar[VacationT]':
+        """Returns the calendar of all vacations of the given state."""
+        state_code = parse_state_code(state_code)
+        cal = self._states.get(state_code)
+        if cal is None:
+            cal = VacationCalendar(
+                vac for vac in self._vacs if vac.state_code == state_code
+            )
+            self._states[state_code] = cal
+        return cal
+
+    def find_current(self,
+                     dt: Optional[datetime] = None) -> Optional[VacationT]:
+        """Returns the current vacation based on the given dt.
+        Returns None if no vacation surrounds (start, end) the
+        given dt."""
+        check_datetime(dt)
+        ts = make_tz_aware_timestamp(dt).timestamp()
+        # Only vacations starting in [ts - max_duration, ts] can surround ts
+        lo = bisect_left(self._starts, ts - self._max_duration - _EPSILON)
+        hi = bisect_right(self._starts, ts)
+        best = -1
+        for i in range(lo, hi):
+            if self._ends[i] >= ts and self._order[i] > best:
+                best = self._order[i]
+        return None if best < 0 else self._vacs[best]
+
+    def find_next(self,
+                  dt: Optional[datetime] = None) -> Optional[VacationT]:
+        """Returns the next vacation based on the given dt.
+        Returns None if no vacation is left."""
+        check_datetime(dt)
+        ts = make_tz_aware_timestamp(dt).timestamp()
+        i = bisect_left(self._starts, ts)
+        if i == len(self._starts):
+            return None
+        return self._vacs[self._order[i]]
+
+    def overlapping(self, start: datetime, end: datetime,
+                    states: Optional[Iterable[StateCode]] = None
+                    ) -> List[VacationT]:
+        """Returns the vacations overlapping the range (of the given states)
+        sorted by their start."""
+        ts_start, ts_end = _timestamps(start, end)
+        return self._query(states, lambda cal: cal.select(
+            ts_start - cal.max_duration - _EPSILON, ts_end,
+            lambda ts: ts >= ts_start
+        ))
+
+    def covering(self, start: datetime, end: datetime,
+                 states: Optional[Iterable[StateCode]] = None
+                 ) -> List[VacationT]:
+        """Returns the vacations containing the whole range (of the given
+        states) sorted by their start."""
+        ts_start, ts_end = _timestamps(start, end)
+        return self._query(states, lambda cal: cal.select(
+            ts_end - cal.max_duration - _EPSILON, ts_start,
+            lambda ts: ts >= ts_end
+        ))
+
+    def within(self, start: datetime, end: datetime,
+               states: Optional[Iterable[StateCode]] = None
+               ) -> List[VacationT]:
+        """Returns the vacations lying completely inside the range (of the
+        given states) sorted by their start."""
+        ts_start, ts_end = _timestamps(start, end)
+        return self._query(states, lambda cal: cal.select(
+            ts_start, ts_end, lambda ts: ts <= ts_end
+        ))
+
+    def overlapping_many(self, ranges: Iterable[DateRange],
+                         states: Optional[Iterable[StateCode]] = None
+                         ) -> List[List[VacationT]]:
+        """Returns the result of `overlapping` for each (start, end) range
+        in the given order."""
+        states = None if states is None else list(states)
+        return [self.overlapping(start, end, states) for start, end in ranges]
+
+    def states_on_holiday(self, start: datetime,
+                          end: Optional[datetime] = None) -> List[StateCode]:
+        """Returns the sorted codes of all states having a vacation that
+        overlaps the range (or the point in time start if end is
+        omitted)."""
+        ts_start, ts_end = _timestamps(start, start if end is None else end)
+        res = []  # type: List[StateCode]
+        for code in self.states:
+            cal = self.for_state(code)
+            if cal.select(ts_start - cal.max_duration - _EPSILON, ts_end,
+                          lambda ts: ts >= ts_start, limit=1):
+                res.append(code)
+        return res
+
+    @property
+    def max_duration(self) -> float:
+        """Returns the duration (in seconds) of the longest vacation."""
+        return self._max_duration
+
+    def select(self, min_start: float, max_start: float,
+               end_filter: EndFilter,
+               limit: Optional[int] = None) -> List[VacationT]:
+        """Returns the vacations starting in [min_start, max_start]
+        (timestamps) whose end timestamp passes the end_filter sorted by
+        their start. Building block of the range queries."""
+        lo = bisect_left(self._starts, min_start)
+        hi = bisect_right(self._starts, max_start)
+        res = []  # type: List[VacationT]
+        for i in range(lo, hi):
+            if end_filter(self._ends[i]):
+                res.append(self._vacs[self._order[i]])
+                if limit is not None and len(res) >= limit:
+                    break
+        return res
+
+    def _query(self, states: Optional[Iterable[StateCode]],
+               query: Callable[['VacationCalendar[VacationT]'],
+                               List[VacationT]]
+               ) -> List[VacationT]:
+        if states is None:
+            return query(self)
+        res = []  # type: List[VacationT]
+        for code in dict.fromkeys(parse_state_code(code) for code in states):
+            res.extend(query(self.for_state(code)))
+        return sorted(res, key=lambda vac: vac.start)
+
+
+def _timestamps(start: datetime, end: datetime) -> Tuple[float, float]:
+    check_datetime(start)
+    check_datetime(end)
+    ts_start = make_tz_aware_timestamp(start).timestamp()
+    ts_end = make_tz_aware_timestamp(end).timestamp()
+    if ts_start > ts_end:
+        raise ValueError("Argument start is expected to be before or equal "
+                         "to argument end")
+    return ts_start, ts_end
+
+
+class HolidayBitmap:
+    """
+    Dense per-day bitmap of a list of vacations.
+
+    Every calendar day between the first start and the last end holds a
+    16 bit mask with one bit per entry of `const.ALL_STATE_CODES` (bit i
+    is set if state ALL_STATE_CODES[i] has a vacation on that day), so
+    `is_holiday`, `mask` and `states_on` are a single array lookup. A
+    decade takes about 7 KB. Days are german calendar days: Dates are
+    used as is, naive datetimes are assumed to be german time and aware
+    ones are converted to it.
+
+    Args:
+        vacs: The vacations to index.
+    """
+
+    __slots__ = ('_first', '_masks')
+
+    def __init__(self, vacs: Iterable[AnyVacation]) -> None:
+        vacs = tuple(vacs)
+        check_vac_list(vacs)
+        spans = []
+        for vac in vacs:
+            if vac.state_code not in ALL_STATE_CODES:
+                # pylint: disable=consider-using-f-string
+                raise ValueError("Vacation '{}' has an unknown state code "
+                                 "'{}'".format(vac.slug, vac.state_code))
+            spans.append((_ordinal(vac.start), _ordinal(vac.end),
+                          1 << ALL_STATE_CODES.index(vac.state_code)))
+        self._first = min((start for start, _, _ in spans), default=0)
+        last = max((end for _, end, _ in spans), default=self._first - 1)
+        self._masks = array('H', [0]) * (last - self._first + 1)
+        for start, end, bit in spans:
+            for day in range(start - self._first, end - self._first + 1):
+                self._masks[day] |= bit
+
+    def __len__(self) -> int:
+        return len(self._masks)
+
+    def __repr__(self) -> str:
+        # pylint: disable=consider-using-f-string
+        if not self._masks:
+            return "HolidayBitmap(<empty>)"
+        return "HolidayBitmap(<{} to {}>)".format(
+            self.first_day, self.last_day
+        )
+
+    @property
+    def first_day(self) -> Optional[date]:
+        """Returns the first day of the bitmap (None if it is empty)."""
+        return date.fromordinal(self._first) if self._masks else None
+
+    @property
+    def last_day(self) -> Optional[date]:
+        """Returns the last day of the bitmap (None if it is empty)."""
+        if not self._masks:
+            return None
+        return date.fromordinal(self._first + len(self._masks) - 1)
+
+    @property
+    def masks(self) -> memoryview:
+        """Returns a read-only view of all masks, one per day starting at
+        `first_day` (e.g. for numpy.frombuffer(..., dtype='uint16'))."""
+        # A view of a bytes copy is read-only on every python version
+        # (memoryview.toreadonly requires 3.8)
+        return memoryview(self._masks.tobytes()).cast('H')
+
+    def mask(self, day: Day) -> int:
+        """Returns the state mask of the given day (0 outside the
+        bitmap)."""
+        i = _ordinal(day) - self._first
+        return self._masks[i] if 0 <= i < len(self._masks) else 0
+
+    def is_holiday(self, day: Day, state_code: StateCode) -> bool:
+        """Checks if the given state has a vacation on the given day."""
+        bit = 1 << ALL_STATE_CODES.index(parse_state_code(state_code))
+        return bool(self.mask(day) & bit)
+
+    def states_on(self, day: Day) -> List[StateCode]:
+        """Returns the codes of all states having a vacation on the given
+        day (in the order of `const.ALL_STATE_CODES`)."""
+        mask = self.mask(day)
+        return [
+            code for i, code in enumerate(ALL_STATE_CODES) if mask >> i & 1
+        ]
+
+    def counts(self, start: Day, end: Day) -> List[int]:
+        """Returns the number of states on holiday for every day from start
+        to end (inclusive)."""
+        first, last = _ordinal(start), _ordinal(end)
+        if first > last:
+            raise ValueError("Argument start is expected to be before or "
+                             "equal to argument end")
+        res = [0] * (last - first + 1)
+        lo = max(first, self._first)
+        hi = min(last, self._first + len(self._masks) - 1)
+        for day in range(lo, hi + 1):
+            res[day - first] = bin(self._masks[day - self._first]).count('1')
+        return res
+
+
+def _ordinal(day: Day) -> int:
+    if isinstance(day, datetime):
+        return make_tz_aware_timestamp(day).astimezone(germany()).toordinal()
+    if isinstance(day, date):
+        return day.toordinal()
+    # pylint: disable=consider-using-f-string
+    raise TypeError("Argument 'day' is expected to be of type 'date' or "
+                    "'datetime', but is {}".format(type(day)))
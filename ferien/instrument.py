@@ -0,0 +1,203 @@
+"""Contains the instrumentation hooks of the sync and async clients.
+
+Register an `Observer` via `client.add_observer(...)` to get notified
+about every api request, every conversion of a response to `Vacation`
+objects and every cache lookup. Nothing is measured as long as no
+observer is registered.
+
+    metrics = MetricsCollector()
+    client.add_observer(metrics)
+    ...
+    print(metrics.to_prometheus())
+"""
+import threading
+from typing import Callable, Dict, List, Optional
+
+import attr
+
+from .types import APIUrl
+
+CACHE_HIT = 'hit'
+CACHE_STALE = 'stale'
+CACHE_MISS = 'miss'
+
+Counters = Dict[str, float]
+
+Sender = Callable[[str], None]
+
+OptionalError = Optional[Exception]
+
+
+# pylint: disable=too-few-public-methods,too-many-instance-attributes
+@attr.s(slots=True, frozen=True)
+class RequestEvent:
+    """A finished api request. The duration (seconds) includes the time
+    spent decoding the json response (decode_time), the size is the
+    number of bytes received (0 if unknown). Status is 0 and error is set
+    if the request failed without a response. Every attempt of a retried
+    request is an event of its own: attempt counts from 0 and retries is
+    1 for every attempt but the first, so summing it counts the retries."""
+    url = attr.ib(type=APIUrl)  # type: APIUrl
+    status = attr.ib()  # type: int
+    duration = attr.ib()  # type: float
+    decode_time = attr.ib(default=0.0)  # type: float
+    size = attr.ib(default=0)  # type: int
+    retries = attr.ib(default=0)  # type: int
+    error = attr.ib(default=None)  # type: OptionalError
+    attempt = attr.ib(default=0)  # type: int
+
+    @property
+    def network_time(self) -> float:
+        """Returns the duration without the json decoding."""
+        return max(self.duration - self.decode_time, 0.0)
+
+
+@attr.s(slots=True, frozen=True)
+class ConvertEvent:
+    """A response converted to (items) `Vacation` objects in duration
+    seconds."""
+    url = attr.ib(type=APIUrl)  # type: APIUrl
+    items = attr.ib()  # type: int
+    duration = attr.ib()  # type: float
+
+
+@attr.s(slots=True, frozen=True)
+class CacheEvent:
+    """A cache lookup: The outcome is one of `CACHE_HIT`, `CACHE_STALE`
+    (served while revalidating) or `CACHE_MISS`."""
+    url = attr.ib(type=APIUrl)  # type: APIUrl
+    outcome = attr.ib()  # type: str
+
+
+class Observer:
+    """Base class of all observers. Every method is a no-op, so
+    subclasses only override what they are interested in."""
+
+    def on_request(self, event: RequestEvent) -> None:
+        """Called after every api request."""
+
+    def on_convert(self, event: ConvertEvent) -> None:
+        """Called after a response was converted to `Vacation` objects."""
+
+    def on_cache(self, event: CacheEvent) -> None:
+        """Called after every cache lookup."""
+
+
+class MetricsCollector(Observer):
+    """
+    Aggregates all events into counters and sums, which can be rendered
+    in the Prometheus text exposition format or as StatsD lines.
+
+    Args:
+        prefix: Prefix of all metric names.
+    """
+
+    def __init__(self, prefix: str = 'ferien') -> None:
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters = {}  # type: Counters
+
+    def _add(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def on_request(self, event: RequestEvent) -> None:
+        # pylint: disable=consider-using-f-string
+        self._add('requests_total{{status="{}"}}'.format(event.status))
+        self._add('request_seconds_sum', event.duration)
+        self._add('request_decode_seconds_sum', event.decode_time)
+        self._add('request_bytes_total', event.size)
+        self._add('request_retries_total', event.retries)
+        if event.error is not None:
+            self._add('request_errors_total')
+
+    def on_convert(self, event: ConvertEvent) -> None:
+        self._add('converts_total')
+        self._add('convert_seconds_sum', event.duration)
+        self._add('converted_items_total', event.items)
+
+    def on_cache(self, event: CacheEvent) -> None:
+        # pylint: disable=consider-using-f-string
+        self._add('cache_lookups_total{{outcome="{}"}}'.format(event.outcome))
+
+    def snapshot(self) -> Counters:
+        """Returns a copy of all metrics by name."""
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self) -> None:
+        """Resets all metrics."""
+        with self._lock:
+            self._counters.clear()
+
+    def to_prometheus(self) -> str:
+        """Renders all metrics in the Prometheus text exposition format."""
+        # pylint: disable=consider-using-f-string
+        return ''.join(
+            '{}_{} {}\n'.format(self.prefix, name, _number(value))
+            for name, value in sorted(self.snapshot().items())
+        )
+
+    def to_statsd(self) -> List[str]:
+        """Renders all metrics as StatsD gauges (labels are appended to
+        the metric name)."""
+        # pylint: disable=consider-using-f-string
+        return [
+            '{}.{}:{}|g'.format(self.prefix, _statsd_name(name),
+                                _number(value))
+            for name, value in sorted(self.snapshot().items())
+        ]
+
+
+class StatsdObserver(Observer):
+    """
+    Pushes every event as StatsD lines (counters and timers in
+    milliseconds) to the given sender, e.g. a function writing to an udp
+    socket.
+
+    Args:
+        send: Called with every StatsD line.
+        prefix: Prefix of all metric names.
+    """
+
+    def __init__(self, send: Sender, prefix: str = 'ferien') -> None:
+        self.send = send
+        self.prefix = prefix
+
+    def _emit(self, name: str, value: float, kind: str) -> None:
+        # pylint: disable=consider-using-f-string
+        self.send('{}.{}:{}|{}'.format(self.prefix, name, _number(value),
+                                       kind))
+
+    def on_request(self, event: RequestEvent) -> None:
+        # pylint: disable=consider-using-f-string
+        self._emit('requests.{}'.format(event.status), 1, 'c')
+        self._emit('request.time', event.duration * 1000, 'ms')
+        self._emit('request.decode_time', event.decode_time * 1000, 'ms')
+        self._emit('request.bytes', event.size, 'c')
+        if event.retries:
+            self._emit('request.retries', 1, 'c')
+        if event.error is not None:
+            self._emit('request.errors', 1, 'c')
+
+    def on_convert(self, event: ConvertEvent) -> None:
+        self._emit('convert.time', event.duration * 1000, 'ms')
+        self._emit('convert.items', event.items, 'c')
+
+    def on_cache(self, event: CacheEvent) -> None:
+        # pylint: disable=consider-using-f-string
+        self._emit('cache.{}'.format(event.outcome), 1, 'c')
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+def _statsd_name(name: str) -> str:
+    # requests_total{status="200"} -> requests_total.200
+    base, _, labels = name.partition('{')
+    values = [
+        label.split('=', 1)[1].strip('"')
+        for label in labels.rstrip('}').split(',') if label
+    ]
+    return '.'.join([base] + values)
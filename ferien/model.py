@@ -1,13 +1,88 @@
 """Contains data models to convert result json to our business object model"""
 
+import sys
+from array import array
 from datetime import datetime
+from functools import lru_cache
+from typing import (
+    Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar,
+    Union
+)
 
 import attr
 
-from .const import TZ_GERMANY
+from .const import ALL_STATE_CODES
+from .tz import localize
 from .types import StateCode, APIItem
 
 
+def _is_iso_date(candidate: str) -> bool:
+    return (
+        len(candidate) == 10 and candidate[4] == '-' and candidate[7] == '-'
+        and candidate[:4].isdigit() and candidate[5:7].isdigit()
+        and candidate[8:].isdigit()
+    )
+
+
+@lru_cache(maxsize=4096)
+def _localize_date(candidate: str) -> datetime:
+    # Dates repeat heavily in a response, so parsing and localization is
+    # done once per distinct date. strptime is only used as a fallback,
+    # because it is rather slow.
+    if _is_iso_date(candidate):
+        try:
+            dt = datetime(
+                int(candidate[:4]), int(candidate[5:7]), int(candidate[8:])
+            )
+        except ValueError:
+            dt = datetime.strptime(candidate, '%Y-%m-%d')
+    else:
+        dt = datetime.strptime(candidate, '%Y-%m-%d')
+    return localize(dt)
+
+
+@lru_cache(maxsize=4096)
+def _localize_end_date(candidate: str) -> datetime:
+    return _localize_date(candidate).replace(hour=23, minute=59, second=59)
+
+
+@lru_cache(maxsize=4096)
+def _localize_ordinal(ordinal: int) -> datetime:
+    return localize(datetime.fromordinal(ordinal))
+
+
+@lru_cache(maxsize=4096)
+def _localize_end_ordinal(ordinal: int) -> datetime:
+    return _localize_ordinal(ordinal).replace(hour=23, minute=59, second=59)
+
+
+def _is_str(candidate: Any) -> bool:
+    return type(candidate) is str  # pylint: disable=unidiomatic-typecheck
+
+
+def _parse_item(dct: APIItem) -> Tuple[Dict[str, Any], bool]:
+    """Parses the fields of a vacation from the given api item. Returns
+    the fields and whether they already have the expected types."""
+    fields = {
+        'start': _localize_date(dct['start']),
+        'end': _localize_end_date(dct['end']),
+        'year': dct['year'],
+        'state_code': dct['stateCode'],
+        'name': dct.get('name', 'none'),
+        'slug': dct.get('slug', 'none')
+    }
+    trusted = (
+        type(fields['year']) is int  # pylint: disable=unidiomatic-typecheck
+        and _is_str(fields['state_code']) and _is_str(fields['name'])
+        and _is_str(fields['slug'])
+    )
+    if trusted:
+        # State codes and names repeat in every item: Share the strings
+        fields['state_code'] = sys.intern(fields['state_code'])
+        fields['name'] = sys.intern(fields['name'])
+    return fields, trusted
+
+
 # pylint: disable=too-few-public-methods
 @attr.s
 class Vacation:
@@ -53,20 +128,209 @@ class Vacation:
     @staticmethod
     def _parse_date(candidate: str) -> datetime:
         # Parse iso format
-        dt = datetime.strptime(candidate, '%Y-%m-%d')
-        return TZ_GERMANY.localize(dt)
+        return _localize_date(candidate)
+
+    @classmethod
+    def _trusted(cls, **fields: Any) -> 'Vacation':
+        # Skips converters and validators: Only pass values that already
+        # have the correct type.
+        inst = cls.__new__(cls)
+        inst.__dict__.update(fields)
+        return inst
 
     @classmethod
     def from_dict(cls, dct: APIItem) -> 'Vacation':
         """Initializes the Vacation model from a dictionary instance."""
+        fields, trusted = _parse_item(dct)
+        # Fast path: Values already have the expected types
+        if trusted:
+            return cls._trusted(**fields)
+        return cls(**fields)
 
-        return cls(
-            start=cls._parse_date(dct['start']),
-            end=cls._parse_date(
-                dct['end']
-            ).replace(hour=23, minute=59, second=59),
-            year=dct['year'],
-            state_code=dct['stateCode'],
-            name=dct.get('name', 'none'),
-            slug=dct.get('slug', 'none')
+    def freeze(self) -> 'FrozenVacation':
+        """Returns the immutable, hashable and slotted counterpart."""
+        return FrozenVacation._trusted(  # pylint: disable=protected-access
+            **attr.asdict(self, recurse=False)
         )
+
+
+@attr.s(slots=True, frozen=True)
+class FrozenVacation:
+    """
+    Immutable and hashable counterpart of `Vacation`. It uses slots instead
+    of a `__dict__`, so it takes considerably less memory. Instances can be
+    used as dictionary keys or set members.
+    """
+    start = attr.ib(
+        type=datetime,
+        validator=attr.validators.instance_of(datetime)
+    )  # type: datetime
+    end = attr.ib(
+        type=datetime,
+        validator=attr.validators.instance_of(datetime)
+    )  # type: datetime
+    year = attr.ib(
+        type=int,
+        converter=int
+    )  # type: int
+    state_code = attr.ib(
+        type=str,
+        converter=str
+    )  # type: StateCode
+    name = attr.ib(
+        type=str,
+        converter=str
+    )  # type: str
+    slug = attr.ib(
+        type=str,
+        converter=str
+    )  # type: str
+
+    @classmethod
+    def _trusted(cls, **fields: Any) -> 'FrozenVacation':
+        # Skips converters and validators: Only pass values that already
+        # have the correct type.
+        inst = cls.__new__(cls)
+        for key, value in fields.items():
+            object.__setattr__(inst, key, value)
+        return inst
+
+    @classmethod
+    def from_dict(cls, dct: APIItem) -> 'FrozenVacation':
+        """Initializes the FrozenVacation model from a dictionary
+        instance."""
+        fields, trusted = _parse_item(dct)
+        if trusted:
+            return cls._trusted(**fields)
+        return cls(**fields)
+
+    def thaw(self) -> Vacation:
+        """Returns the mutable `Vacation` counterpart."""
+        return Vacation._trusted(  # pylint: disable=protected-access
+            **attr.asdict(self, recurse=False)
+        )
+
+
+AnyVacation = Union[Vacation, FrozenVacation]
+
+VacationT = TypeVar('VacationT', Vacation, FrozenVacation)
+
+StringTable = List[str]
+
+IntColumn = Sequence[int]
+
+
+class VacationTable:
+    """
+    Columnar and compact representation of many vacations.
+
+    Start and end are stored as day ordinals, the year as an unsigned
+    short, state codes and names as small integer codes into string
+    tables. Only vacations starting at midnight and ending at 23:59:59
+    (as created by `Vacation.from_dict`) can be stored. Items are
+    materialized as `Vacation` objects on access.
+
+    Args:
+        vacs: The vacations to store.
+    """
+
+    __slots__ = (
+        'starts', 'ends', 'years', 'state_codes', 'names', 'name_table',
+        'slugs'
+    )
+
+    def __init__(self, vacs: Iterable[AnyVacation] = ()) -> None:
+        starts, ends = array('i'), array('i')
+        years, state_codes, names = array('H'), array('B'), array('H')
+        name_table = []  # type: StringTable
+        slugs = []  # type: StringTable
+        name_codes = {}  # type: Dict[str, int]
+        for vac in vacs:
+            if (vac.start != _localize_ordinal(vac.start.toordinal())
+                    or vac.end != _localize_end_ordinal(vac.end.toordinal())):
+                # pylint: disable=consider-using-f-string
+                raise ValueError(
+                    "Vacation '{}' does not start at midnight or does not "
+                    "end at 23:59:59".format(vac.slug)
+                )
+            if vac.state_code not in ALL_STATE_CODES:
+                # pylint: disable=consider-using-f-string
+                raise ValueError("Vacation '{}' has an unknown state code "
+                                 "'{}'".format(vac.slug, vac.state_code))
+            if vac.name not in name_codes:
+                name_codes[vac.name] = len(name_table)
+                name_table.append(vac.name)
+            starts.append(vac.start.toordinal())
+            ends.append(vac.end.toordinal())
+            years.append(vac.year)
+            state_codes.append(ALL_STATE_CODES.index(vac.state_code))
+            names.append(name_codes[vac.name])
+            slugs.append(vac.slug)
+        self._set_columns(starts, ends, years, state_codes, names,
+                          name_table, slugs)
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def _set_columns(self, starts: IntColumn, ends: IntColumn,
+                     years: IntColumn, state_codes: IntColumn,
+                     names: IntColumn, name_table: StringTable,
+                     slugs: StringTable) -> None:
+        if not (len(starts) == len(ends) == len(years) == len(state_codes)
+                == len(names) == len(slugs)):
+            raise ValueError("All columns are expected to have the same "
+                             "length")
+        self.starts = starts
+        self.ends = ends
+        self.years = years
+        self.state_codes = state_codes
+        self.names = names
+        self.name_table = name_table
+        self.slugs = slugs
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    @classmethod
+    def from_columns(cls, starts: IntColumn, ends: IntColumn,
+                     years: IntColumn, state_codes: IntColumn,
+                     names: IntColumn, name_table: StringTable,
+                     slugs: StringTable) -> 'VacationTable':
+        """Creates a table from already encoded columns (e.g. read from a
+        snapshot, see `ferien.snapshot`). Integer columns can be any
+        sequence of ints, like arrays or memoryviews."""
+        table = cls.__new__(cls)
+        table._set_columns(  # pylint: disable=protected-access
+            starts, ends, years, state_codes, names, name_table, slugs
+        )
+        return table
+
+    def select(self, state_code: Optional[StateCode] = None,
+               year: Optional[int] = None) -> List[Vacation]:
+        """Returns the vacations of the given state and / or year."""
+        state = None if state_code is None else (
+            ALL_STATE_CODES.index(state_code)
+            if state_code in ALL_STATE_CODES else -1
+        )
+        return [
+            self[i] for i in range(len(self))
+            if (state is None or self.state_codes[i] == state)
+            and (year is None or self.years[i] == year)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.slugs)
+
+    def __getitem__(self, i: int) -> Vacation:
+        return Vacation._trusted(  # pylint: disable=protected-access
+            start=_localize_ordinal(self.starts[i]),
+            end=_localize_end_ordinal(self.ends[i]),
+            year=self.years[i],
+            state_code=ALL_STATE_CODES[self.state_codes[i]],
+            name=self.name_table[self.names[i]],
+            slug=self.slugs[i]
+        )
+
+    def __iter__(self) -> Iterator[Vacation]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self) -> str:
+        # pylint: disable=consider-using-f-string
+        return "VacationTable(<{} vacations>)".format(len(self))
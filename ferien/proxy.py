@@ -0,0 +1,254 @@
+"""A caching proxy in front of ferien-api.de.
+
+The proxy answers the url shapes of `const.API_ALL_URL`,
+`const.API_STATE_URL` and `const.API_STATE_YEAR_URL` from memory. All
+vacations are downloaded once per refresh interval (see
+`ferien.refresh.BackgroundRefresher`) and every response body is
+serialized, gzipped and tagged (ETag) right after a refresh that changed
+the data, so requests never wait for upstream. Point any number of
+clients at it:
+
+    python -m ferien serve --port 8080 --interval 3600
+
+    client = FerienClient(base_url='http://proxy:8080/api/v1/holidays')
+
+Requests sending `Accept-Encoding: gzip` get the gzipped body, requests
+sending a matching `If-None-Match` get a '304 Not Modified'. Until the
+first download succeeded every request is answered with
+'503 Service Unavailable'.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import urlparse
+
+from .const import ALL_STATE_CODES, API_ALL_URL, API_PROXY_INTERVAL
+from .dataset import VacationIndex
+from .model import Vacation
+from .refresh import BackgroundRefresher, DatasetDiff
+from .resilience import CircuitBreaker, RetryPolicy
+from .server import API_PATH, ApiRequestHandler, LocalServer
+from .sync_ import FerienClient
+from .types import APIResponse
+
+# Seconds clients should wait while the proxy has no data yet
+_RETRY_AFTER = 5
+
+Headers = Dict[str, str]
+
+ProxyResponse = Tuple[int, Headers, bytes]
+
+Bodies = Dict[str, '_Body']
+
+
+# pylint: disable=too-few-public-methods
+class _Body:
+    # A pre-serialized response body (plain and gzipped) and its ETag
+
+    __slots__ = ('plain', 'gzipped', 'etag')
+
+    def __init__(self, items: APIResponse) -> None:
+        self.plain = json.dumps(items, separators=(',', ':')).encode('utf-8')
+        self.gzipped = gzip.compress(self.plain)
+        # Weak: The plain and the gzipped body share the tag
+        # pylint: disable=consider-using-f-string
+        self.etag = 'W/"{}"'.format(
+            hashlib.sha1(self.plain).hexdigest()[:20]
+        )
+
+
+_EMPTY = _Body([])
+
+
+def to_api_item(vac: Vacation) -> Dict[str, Any]:
+    """Returns the given vacation in the json format of ferien-api.de."""
+    return {
+        'start': vac.start.date().isoformat(),
+        'end': vac.end.date().isoformat(),
+        'year': vac.year,
+        'stateCode': vac.state_code,
+        'name': vac.name,
+        'slug': vac.slug
+    }
+
+
+def _serialize(index: VacationIndex) -> Bodies:
+    """Serializes the responses of all urls."""
+    years = sorted({vac.year for vac in index})
+    bodies = {API_PATH: _Body([to_api_item(vac) for vac in index])}
+    for state_code in ALL_STATE_CODES:
+        state_path = API_PATH + '/' + state_code
+        bodies[state_path] = _Body([
+            to_api_item(vac) for vac in index.select(state_code)
+        ])
+        for year in years:
+            bodies[state_path + '/' + str(year)] = _Body([
+                to_api_item(vac) for vac in index.select(state_code, year)
+            ])
+    return bodies
+
+
+def _is_state_year_path(path: str) -> bool:
+    """Checks if the path has the shape of `const.API_STATE_YEAR_URL`."""
+    parts = path[len(API_PATH):].strip('/').split('/')
+    return (path.startswith(API_PATH + '/') and len(parts) == 2
+            and parts[0] in ALL_STATE_CODES and parts[1].isdigit())
+
+
+def _opaque_tag(etag: str) -> str:
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def _etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """Weak comparison of the ETag with the tags of If-None-Match."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or _opaque_tag(etag) in map(_opaque_tag, tags)
+
+
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    for coding in (accept_encoding or '').split(','):
+        name, _, params = coding.partition(';')
+        if name.strip().lower() in ('gzip', '*'):
+            return params.replace(' ', '') not in ('q=0', 'q=0.0')
+    return False
+
+
+class _Handler(ApiRequestHandler):
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Answers a single api request."""
+        self._answer(with_body=True)
+
+    def do_HEAD(self) -> None:  # pylint: disable=invalid-name
+        """Answers a single api request without the body."""
+        self._answer(with_body=False)
+
+    def _answer(self, with_body: bool) -> None:
+        status, headers, body = self.server.owner.response(
+            self.path, self.headers
+        )
+        self.send_response(status)
+        headers['Content-Length'] = str(len(body))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if with_body and body:
+            self.wfile.write(body)
+
+
+class CachingProxy(LocalServer):
+    """
+    Serves the vacations of ferien-api.de from memory and refreshes them
+    in the background every interval seconds.
+
+    Args:
+        client: The client used to download the vacations. Defaults to a
+            `FerienClient` with retries and a circuit breaker. Pass one
+            with a base_url to use another upstream.
+        interval: Seconds between two downloads.
+        host: The interface to bind.
+        port: The port to bind. 0 picks a free port.
+    """
+
+    def __init__(self, client: Optional[FerienClient] = None,
+                 interval: float = API_PROXY_INTERVAL,
+                 host: str = '127.0.0.1', port: int = 8080) -> None:
+        super().__init__(_Handler, host, port)
+        if client is None:
+            client = FerienClient(retry=RetryPolicy(),
+                                  circuit_breaker=CircuitBreaker())
+        self.client = client
+        self.refresher = BackgroundRefresher(client, interval)
+        self.refresher.subscribe(self._rebuild)
+        self._bodies = {}  # type: Bodies
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until the first download succeeded. Returns False if the
+        timeout expired before."""
+        return self.refresher.wait_ready(timeout)
+
+    def start(self) -> None:
+        """Starts refreshing and serving in background threads."""
+        self.refresher.start()
+        super().start()
+
+    def serve_forever(self) -> None:
+        """Starts refreshing in the background and serves in the current
+        thread until interrupted."""
+        self.refresher.start()
+        try:
+            super().serve_forever()
+        finally:
+            self.refresher.stop()
+            self.client.close()
+
+    def stop(self) -> None:
+        """Stops refreshing and serving and closes the socket."""
+        self.refresher.stop()
+        super().stop()
+        self.client.close()
+
+    def _rebuild(self, index: VacationIndex, _: DatasetDiff) -> None:
+        # Swapped in one go: Requests see either all old or all new bodies
+        self._bodies = _serialize(index)
+
+    def response(self, path: str,
+                 headers: Mapping[str, str]) -> ProxyResponse:
+        """Returns the status, the headers and the body of the response to
+        a request of the given path with the given request headers."""
+        bodies = self._bodies
+        if not bodies:
+            return 503, {'Retry-After': str(_RETRY_AFTER),
+                         'Content-Type': 'text/plain'}, b'Not ready'
+        path = urlparse(path).path.rstrip('/')
+        body = bodies.get(path)
+        if body is None and _is_state_year_path(path):
+            body = _EMPTY
+        if body is None:
+            return 404, {'Content-Type': 'text/plain'}, b'Not found'
+
+        res_headers = {'ETag': body.etag, 'Vary': 'Accept-Encoding'}
+        if _etag_matches(body.etag, headers.get('If-None-Match')):
+            return 304, res_headers, b''
+        res_headers['Content-Type'] = 'application/json'
+        if _accepts_gzip(headers.get('Accept-Encoding')):
+            res_headers['Content-Encoding'] = 'gzip'
+            return 200, res_headers, body.gzipped
+        return 200, res_headers, body.plain
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    """Runs the caching proxy until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    serve(parser.parse_args(args))
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the options of the proxy to the given parser."""
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--interval', type=float,
+                        default=API_PROXY_INTERVAL,
+                        help="Seconds between two downloads")
+    parser.add_argument('--upstream', default=API_ALL_URL,
+                        help="Url of the holidays endpoint to proxy")
+
+
+def serve(opts: argparse.Namespace) -> None:
+    """Runs the caching proxy configured by the parsed options until
+    interrupted."""
+    client = FerienClient(base_url=opts.upstream, retry=RetryPolicy(),
+                          circuit_breaker=CircuitBreaker())
+    proxy = CachingProxy(client, opts.interval, opts.host, opts.port)
+    # pylint: disable=consider-using-f-string
+    print("Proxying {} on {}".format(opts.upstream, proxy.base_url))
+    proxy.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
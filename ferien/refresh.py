@@ -0,0 +1,246 @@
+"""Keeps the local dataset of a client warm in the background.
+
+A refresher downloads all vacations periodically (see `load_dataset` of
+the clients), swaps the dataset of the client in one go and notifies its
+subscribers about the added, removed and changed vacations. The client
+keeps answering all requests from the previous dataset meanwhile, so no
+request has to wait for the network.
+
+    client = FerienClient()
+    with BackgroundRefresher(client, interval=3600) as refresher:
+        refresher.subscribe(lambda index, diff: print(diff))
+        refresher.wait_ready()
+        client.state_vacations('HH')
+"""
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import attr
+
+from .async_ import AsyncFerienClient
+from .dataset import VacationIndex
+from .model import Vacation
+from .sync_ import FerienClient
+
+_LOGGER = logging.getLogger(__name__)
+
+Changes = List[Tuple[Vacation, Vacation]]
+
+VacationsBySlug = Dict[str, Vacation]
+
+Subscriber = Callable[[VacationIndex, 'DatasetDiff'], None]
+
+Subscribers = List[Subscriber]
+
+OptionalTask = Optional['asyncio.Task[Any]']
+
+
+# pylint: disable=too-few-public-methods
+@attr.s(slots=True, frozen=True)
+class DatasetDiff:
+    """The vacations added to and removed from a dataset and the changed
+    ones as (old, new) pairs. Vacations are identified by their slug."""
+    added = attr.ib(default=attr.Factory(list))  # type: List[Vacation]
+    removed = attr.ib(default=attr.Factory(list))  # type: List[Vacation]
+    changed = attr.ib(default=attr.Factory(list))  # type: Changes
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+def diff_datasets(old: Iterable[Vacation],
+                  new: Iterable[Vacation]) -> DatasetDiff:
+    """Returns the differences between the old and the new vacations
+    (keyed by slug)."""
+    old_by_slug = {vac.slug: vac for vac in old}
+    new_by_slug = {}  # type: VacationsBySlug
+    added, changed = [], []  # type: List[Vacation], Changes
+    for vac in new:
+        new_by_slug[vac.slug] = vac
+        previous = old_by_slug.get(vac.slug)
+        if previous is None:
+            added.append(vac)
+        elif previous != vac:
+            changed.append((previous, vac))
+    removed = [
+        vac for slug, vac in old_by_slug.items() if slug not in new_by_slug
+    ]
+    return DatasetDiff(added, removed, changed)
+
+
+class _Refresher:
+    # Subscriber handling shared by the sync and the async refresher
+
+    def __init__(self, client: Any, interval: float) -> None:
+        if interval <= 0:
+            raise ValueError("Argument interval is expected to be > 0")
+        self.client = client
+        self.interval = interval
+        self._subscribers = []  # type: Subscribers
+
+    def subscribe(self, subscriber: Subscriber) -> None:
+        """Registers a function that is called with the new index and the
+        diff after the first successful refresh (even if it is empty or
+        equal to a preloaded dataset) and after every refresh that changed
+        the dataset."""
+        self._subscribers = self._subscribers + [subscriber]
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        """Unregisters a previously registered subscriber."""
+        self._subscribers = [
+            sub for sub in self._subscribers if sub is not subscriber
+        ]
+
+    def _swapped(self, old: Iterable[Vacation], index: VacationIndex,
+                 first: bool) -> DatasetDiff:
+        diff = diff_datasets(old, index)
+        if diff or first:
+            for subscriber in self._subscribers:
+                try:
+                    subscriber(index, diff)
+                except Exception:  # pylint: disable=broad-except
+                    _LOGGER.exception("Dataset subscriber %r failed",
+                                      subscriber)
+        return diff
+
+    @staticmethod
+    def _log_error() -> None:
+        _LOGGER.exception("Refreshing the dataset failed. Serving the "
+                          "previous one")
+
+
+class BackgroundRefresher(_Refresher):
+    """
+    Refreshes the dataset of a `FerienClient` every interval seconds in a
+    daemon thread.
+
+    Args:
+        client: The client to refresh the dataset of.
+        interval: Seconds between two refreshes.
+    """
+
+    def __init__(self, client: FerienClient, interval: float) -> None:
+        super().__init__(client, interval)
+        self.ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None  # type: Optional[threading.Thread]
+
+    def __enter__(self) -> 'BackgroundRefresher':
+        self.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+    def refresh(self) -> DatasetDiff:
+        """Downloads all vacations right away, swaps the dataset of the
+        client and notifies the subscribers."""
+        old = self.client.dataset or ()
+        index = self.client.load_dataset()
+        # Ready once the subscribers saw the first dataset
+        diff = self._swapped(old, index, not self.ready.is_set())
+        self.ready.set()
+        return diff
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until the first refresh succeeded. Returns False if the
+        timeout expired before."""
+        return self.ready.wait(timeout)
+
+    def start(self) -> None:
+        """Starts the refresh thread. The first refresh runs right away."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stops the refresh thread."""
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception:  # pylint: disable=broad-except
+                self._log_error()
+            self._stop.wait(self.interval)
+
+
+class AsyncBackgroundRefresher(_Refresher):
+    """
+    Refreshes the dataset of an `AsyncFerienClient` every interval
+    seconds in an asyncio task.
+
+    Args:
+        client: The client to refresh the dataset of.
+        interval: Seconds between two refreshes.
+    """
+
+    def __init__(self, client: AsyncFerienClient, interval: float) -> None:
+        super().__init__(client, interval)
+        self._ready = None  # type: Optional[asyncio.Event]
+        self._task = None  # type: OptionalTask
+
+    async def __aenter__(self) -> 'AsyncBackgroundRefresher':
+        self.start()
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.stop()
+
+    @property
+    def ready(self) -> asyncio.Event:
+        """Returns the event that is set once the first refresh succeeded.
+        It is created on first use, so it belongs to the running event
+        loop (before python 3.10 an event is bound to the loop that is
+        current when it is created)."""
+        if self._ready is None:
+            self._ready = asyncio.Event()
+        return self._ready
+
+    async def refresh(self) -> DatasetDiff:
+        """Downloads all vacations right away, swaps the dataset of the
+        client and notifies the subscribers."""
+        old = self.client.dataset or ()
+        index = await self.client.load_dataset()
+        # Ready once the subscribers saw the first dataset
+        diff = self._swapped(old, index, not self.ready.is_set())
+        self.ready.set()
+        return diff
+
+    async def wait_ready(self) -> None:
+        """Waits until the first refresh succeeded."""
+        await self.ready.wait()
+
+    def start(self) -> None:
+        """Starts the refresh task on the running event loop. The first
+        refresh runs right away."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """Cancels the refresh task."""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:  # pylint: disable=broad-except
+                self._log_error()
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,169 @@
+"""Contains the retry policy and the circuit breaker of the clients.
+
+    client = FerienClient(retry=RetryPolicy(retries=3),
+                          circuit_breaker=CircuitBreaker())
+
+Rate limited (429) and failed (5xx) requests as well as timeouts are
+retried with exponential backoff and jitter. A `Retry-After` header
+overrides the backoff. After failure_threshold consecutive failures the
+circuit breaker opens: Requests fail fast with a `CircuitOpenError` (or
+are answered from expired cache entries) until reset_timeout passed.
+Then a single trial request is let through, which closes the breaker
+again on success.
+"""
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import attr
+
+from .errors import (
+    ApiError, CircuitOpenError, RateLimitedError, RequestTimeoutError,
+    ServerError
+)
+
+HTTP_TOO_MANY_REQUESTS = 429
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half-open'
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parses the value of a `Retry-After` header (seconds or a http date)
+    to the seconds to wait. Returns None if the value is missing or
+    invalid."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max((date - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Checks if a request failed with the given error is worth
+    retrying."""
+    return isinstance(error, (RateLimitedError, ServerError,
+                              RequestTimeoutError))
+
+
+def is_failure(error: BaseException) -> bool:
+    """Checks if the given error indicates that ferien-api.de is
+    unavailable (as opposed to e.g. an invalid request)."""
+    if isinstance(error, ApiError):
+        return isinstance(error, (RateLimitedError, ServerError))
+    return isinstance(error, Exception)
+
+
+# pylint: disable=too-few-public-methods
+@attr.s(frozen=True)
+class RetryPolicy:
+    """
+    Retries failed requests with exponential backoff and full jitter.
+
+    Args:
+        retries: Maximum number of retries per request.
+        backoff: Delay in seconds before the first retry. It doubles with
+            every retry.
+        max_backoff: Maximum delay in seconds. Requests asking for a longer
+            `Retry-After` are not retried.
+        jitter: Randomize the delay between zero and the backoff, so
+            clients do not retry in lockstep.
+    """
+    retries = attr.ib(default=3)  # type: int
+    backoff = attr.ib(default=0.5)  # type: float
+    max_backoff = attr.ib(default=30.0)  # type: float
+    jitter = attr.ib(default=True)  # type: bool
+
+    def retry_in(self, attempt: int,
+                 error: BaseException) -> Optional[float]:
+        """Returns the seconds to wait before retrying the given (zero
+        based) attempt that failed with error. Returns None if the request
+        should not be retried."""
+        if attempt >= self.retries or not is_retryable(error):
+            return None
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_backoff else None
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return random.uniform(0, delay) if self.jitter else delay
+
+
+class CircuitBreaker:
+    """
+    Fails fast while ferien-api.de is unavailable. A single breaker can be
+    shared by several clients.
+
+    Args:
+        failure_threshold: Number of consecutive failures opening the
+            breaker.
+        reset_timeout: Seconds the breaker stays open before a trial
+            request is let through.
+    """
+
+    def __init__(self, failure_threshold: int = 5,
+                 reset_timeout: float = 30.0) -> None:
+        if failure_threshold < 1:
+            # pylint: disable=consider-using-f-string
+            raise ValueError("Argument failure_threshold is expected to be "
+                             "greater than zero, but is {}".format(
+                                 failure_threshold))
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened = 0.0
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        """Returns the current state: `STATE_CLOSED`, `STATE_OPEN` or
+        `STATE_HALF_OPEN` (reset_timeout passed)."""
+        with self._lock:
+            if self._failures < self.failure_threshold:
+                return STATE_CLOSED
+            if time.monotonic() - self._opened < self.reset_timeout:
+                return STATE_OPEN
+            return STATE_HALF_OPEN
+
+    def before_request(self) -> None:
+        """Raises a `CircuitOpenError` if the request must not be made."""
+        with self._lock:
+            if self._failures < self.failure_threshold:
+                return
+            retry_in = self._opened + self.reset_timeout - time.monotonic()
+            if retry_in > 0 or self._trial:
+                raise CircuitOpenError(max(retry_in, 0.0))
+            # Half open: Let a single trial request through
+            self._trial = True
+
+    def record_success(self) -> None:
+        """Closes the breaker."""
+        with self._lock:
+            self._failures = 0
+            self._trial = False
+
+    def record_abort(self) -> None:
+        """Releases the trial request without a result (e.g. it was
+        cancelled)."""
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self) -> None:
+        """Counts a failure and opens the breaker once the threshold is
+        reached (or the trial request failed)."""
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._opened = time.monotonic()
+            self._trial = False
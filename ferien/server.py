@@ -0,0 +1,100 @@
+"""Contains the base of the local http servers answering the url shapes
+of ferien-api.de (see `ferien.fake_server` and `ferien.proxy`)."""
+import logging
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import Any, Optional, Type, TypeVar
+from urllib.parse import urlparse
+
+from .const import API_ALL_URL
+
+_LOGGER = logging.getLogger(__name__)
+
+API_PATH = urlparse(API_ALL_URL).path
+
+ServerT = TypeVar('ServerT', bound='LocalServer')
+
+OptionalThread = Optional[threading.Thread]
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        # Called from within the except block. Clients disconnecting or
+        # timing out mid-response are expected, everything else is logged
+        # instead of printed to stderr.
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        _LOGGER.exception("Error while answering a request from %s",
+                          client_address)
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    """Base class of the request handlers. The owning `LocalServer` is
+    available as self.server.owner."""
+    server = None  # type: Any
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args: Any) -> None:  # pylint: disable=W0221
+        pass
+
+
+class LocalServer:
+    """
+    Runs an http server with the given request handler either in a
+    background thread (`start` / `stop` or as a context manager) or in the
+    current thread (`serve_forever`).
+
+    Args:
+        handler: The request handler class.
+        host: The interface to bind.
+        port: The port to bind. 0 picks a free port.
+    """
+
+    def __init__(self, handler: Type[ApiRequestHandler], host: str,
+                 port: int) -> None:
+        self._httpd = _ThreadingHTTPServer((host, port), handler)
+        setattr(self._httpd, 'owner', self)
+        self._thread = None  # type: OptionalThread
+
+    def __enter__(self: ServerT) -> ServerT:
+        self.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+    @property
+    def base_url(self) -> str:
+        """Returns the url to pass as base_url to the clients."""
+        host, port = self._httpd.server_address[:2]
+        # pylint: disable=consider-using-f-string
+        return 'http://{}:{}{}'.format(str(host), port, API_PATH)
+
+    def start(self) -> None:
+        """Starts serving in a background thread."""
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, daemon=True
+        )
+        self._thread.start()
+
+    def serve_forever(self) -> None:
+        """Serves in the current thread until interrupted."""
+        try:
+            self._httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._httpd.server_close()
+
+    def stop(self) -> None:
+        """Stops serving and closes the socket."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,90 @@
+"""Request coalescing: Concurrent calls with the same key (e.g. the api
+url) are collapsed into one call and share its result (or error)."""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+Calls = Dict[Hashable, '_Call']
+
+Flights = Dict[Hashable, 'asyncio.Future[Any]']
+
+OptionalError = Optional[BaseException]
+
+
+class _Call:  # pylint: disable=too-few-public-methods
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None  # type: Any
+        self.error = None  # type: OptionalError
+
+
+class SingleFlight:
+    """
+    Thread based single flight: The first thread calling `do` for a key
+    runs the function, all other threads calling `do` for the same key in
+    the meantime block until it is done and get the same result.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls = {}  # type: Calls
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def do(self, key: Hashable, fun: Callable[[], Any]) -> Any:
+        """Runs fun (or waits for the running call of the same key) and
+        returns its result."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fun()
+        except BaseException as ex:
+            call.error = ex
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class AsyncSingleFlight:
+    """
+    Asyncio based single flight: The first coroutine calling `do` for a
+    key starts the call as a task, all other coroutines calling `do` for
+    the same key in the meantime await the same task. Cancelling one of
+    the callers does not cancel the shared task.
+    """
+
+    def __init__(self) -> None:
+        self._flights = {}  # type: Flights
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: Hashable,
+                 fun: Callable[[], Awaitable[Any]]) -> Any:
+        """Runs fun (or awaits the running call of the same key) and
+        returns its result."""
+        # Flights are bound to an event loop
+        key = (id(asyncio.get_event_loop()), key)
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(fun())
+            self._flights[key] = flight
+            flight.add_done_callback(
+                lambda _: self._flights.pop(key, None)
+            )
+        return await asyncio.shield(flight)
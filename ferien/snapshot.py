@@ -0,0 +1,141 @@
+"""Offline snapshots of a vacation dataset.
+
+A snapshot is a compact binary file that stores the columns of a
+`VacationTable` (see `ferien.model`):
+
+    header  magic, version, number of names and vacations, length of the
+            string tables
+    starts  int32 day ordinals
+    ends    int32 day ordinals
+    years   uint16
+    states  uint8 index into `const.ALL_STATE_CODES`
+    names   uint16 index into the name table
+    names   utf-8 name table (NUL separated)
+    slugs   utf-8 slugs (NUL separated)
+
+All numbers are little endian and every section starts at a multiple of
+8 bytes, so the columns can be used straight from a memory mapped file.
+"""
+import mmap
+import struct
+import sys
+from array import array
+from typing import Any, Iterable, List, Tuple
+
+from .model import AnyVacation, VacationTable
+
+SNAPSHOT_MAGIC = b'FRSN'
+
+SNAPSHOT_VERSION = 1
+
+_HEADER = struct.Struct('<4sHHIII')
+
+_ALIGNMENT = 8
+
+# Typecodes of the integer columns in the order of the file
+_COLUMNS = ('i', 'i', 'H', 'B', 'H')
+
+
+def _padding(size: int) -> bytes:
+    return b'\0' * (-size % _ALIGNMENT)
+
+
+def _encode_strings(strings: List[str]) -> bytes:
+    if any('\0' in string for string in strings):
+        raise ValueError("Strings of a snapshot must not contain NUL")
+    return '\0'.join(strings).encode('utf-8')
+
+
+def _decode_strings(data: Any, count: int) -> List[str]:
+    if not count:
+        return []
+    return bytes(data).decode('utf-8').split('\0')
+
+
+def dump_snapshot(vacs: Iterable[AnyVacation], path: str) -> None:
+    """Writes the given vacations (e.g. the result of `all_vacations`) to a
+    snapshot file."""
+    table = vacs if isinstance(vacs, VacationTable) else VacationTable(vacs)
+    names = _encode_strings(table.name_table)
+    slugs = _encode_strings(table.slugs)
+    header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION,
+                          len(table.name_table), len(table), len(names),
+                          len(slugs))
+
+    with open(path, 'wb') as fp:
+        fp.write(header + _padding(len(header)))
+        columns = (table.starts, table.ends, table.years, table.state_codes,
+                   table.names)
+        for typecode, column in zip(_COLUMNS, columns):
+            data = array(typecode, column)
+            if sys.byteorder == 'big':  # pragma: no cover
+                data.byteswap()
+            raw = data.tobytes()
+            fp.write(raw + _padding(len(raw)))
+        fp.write(names + _padding(len(names)))
+        fp.write(slugs)
+
+
+def _read_header(data: Any) -> Tuple[int, int, int, int]:
+    if len(data) < _HEADER.size:
+        raise ValueError("File is not a ferien-api snapshot")
+    magic, version, name_count, count, names_size, slugs_size = \
+        _HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("File is not a ferien-api snapshot")
+    if version != SNAPSHOT_VERSION:
+        # pylint: disable=consider-using-f-string
+        raise ValueError("Unsupported snapshot version {} (expected {})"
+                         .format(version, SNAPSHOT_VERSION))
+    return name_count, count, names_size, slugs_size
+
+
+def _read_column(data: Any, offset: int, count: int, typecode: str,
+                 use_mmap: bool) -> Tuple[Any, int]:
+    # Returns the column and the offset of the next section
+    size = count * array(typecode).itemsize
+    raw = data[offset:offset + size]
+    if len(raw) != size:
+        raise ValueError("Snapshot file is truncated")
+    if use_mmap:
+        column = raw.cast(typecode)
+    else:
+        column = array(typecode)
+        column.frombytes(raw)
+        if sys.byteorder == 'big':  # pragma: no cover
+            column.byteswap()
+    return column, offset + size + len(_padding(size))
+
+
+def _read_table(data: Any, use_mmap: bool) -> VacationTable:
+    name_count, count, names_size, slugs_size = _read_header(data)
+    offset = _HEADER.size + len(_padding(_HEADER.size))
+    starts, offset = _read_column(data, offset, count, 'i', use_mmap)
+    ends, offset = _read_column(data, offset, count, 'i', use_mmap)
+    years, offset = _read_column(data, offset, count, 'H', use_mmap)
+    state_codes, offset = _read_column(data, offset, count, 'B', use_mmap)
+    names, offset = _read_column(data, offset, count, 'H', use_mmap)
+
+    name_table = _decode_strings(data[offset:offset + names_size],
+                                 name_count)
+    offset += names_size + len(_padding(names_size))
+    slugs = _decode_strings(data[offset:offset + slugs_size], count)
+    if len(name_table) != name_count or len(slugs) != count:
+        raise ValueError("Snapshot file is truncated")
+    return VacationTable.from_columns(
+        starts, ends, years, state_codes, names, name_table, slugs
+    )
+
+
+def load_snapshot(path: str, use_mmap: bool = False) -> VacationTable:
+    """Loads a snapshot file as a `VacationTable`. With use_mmap the
+    integer columns are not copied but read from the memory mapped file
+    on access."""
+    with open(path, 'rb') as fp:
+        if use_mmap and sys.byteorder == 'little':
+            data = memoryview(mmap.mmap(fp.fileno(), 0,
+                                        access=mmap.ACCESS_READ))
+        else:
+            use_mmap = False
+            data = memoryview(fp.read())
+    return _read_table(data, use_mmap)
@@ -0,0 +1,107 @@
+"""Incremental decoding of the json arrays returned by ferien-api.de."""
+import codecs
+import json
+import re
+from typing import List
+
+from .types import APIItem
+
+_SPECIAL = re.compile(r'["\[\]{}]')
+
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+class JsonArrayDecoder:
+    """
+    Decodes a json array of objects chunk by chunk. Every item is returned
+    as soon as it is complete, so the whole response never has to be
+    kept in memory.
+
+        decoder = JsonArrayDecoder()
+        for chunk in chunks:
+            for item in decoder.feed(chunk):
+                ...
+        decoder.close()
+    """
+
+    def __init__(self) -> None:
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._item_start = -1
+        self._finished = False
+
+    def feed(self, chunk: bytes) -> List[APIItem]:
+        """Feeds the next chunk of the response body and returns all items
+        completed by it."""
+        self._buffer += self._decoder.decode(chunk)
+        return self._scan()
+
+    def close(self) -> List[APIItem]:
+        """Signals the end of the response body. Returns the remaining
+        items and raises a ValueError if the array is incomplete."""
+        self._buffer += self._decoder.decode(b'', final=True)
+        items = self._scan()
+        if not self._finished:
+            raise ValueError("Response is not a complete json array")
+        return items
+
+    def _scan_string(self) -> bool:
+        # Advances to the end of the current string. Returns False if more
+        # data is needed.
+        match = _STRING_SPECIAL.search(self._buffer, self._pos)
+        if match is None:
+            self._pos = len(self._buffer)
+            return False
+        if match.group() == '\\':
+            if match.end() >= len(self._buffer):
+                self._pos = match.start()
+                return False
+            self._pos = match.end() + 1
+            return True
+        self._in_string = False
+        self._pos = match.end()
+        return True
+
+    def _scan(self) -> List[APIItem]:
+        items = []  # type: List[APIItem]
+        while not self._finished:
+            if self._in_string:
+                if not self._scan_string():
+                    break
+                continue
+            match = _SPECIAL.search(self._buffer, self._pos)
+            if match is None:
+                self._pos = len(self._buffer)
+                break
+            char, self._pos = match.group(), match.end()
+            if self._depth == 0 and char != '[':
+                raise ValueError("Response is expected to be a json array")
+            if char == '"':
+                self._in_string = True
+            elif char in '[{':
+                if self._depth == 1:
+                    self._item_start = match.start()
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 1:
+                    items.append(json.loads(
+                        self._buffer[self._item_start:self._pos]
+                    ))
+                    self._item_start = -1
+                elif self._depth == 0:
+                    self._finished = True
+        self._trim()
+        return items
+
+    def _trim(self) -> None:
+        # Drops everything that was already consumed from the buffer
+        cut = self._pos if self._item_start < 0 else self._item_start
+        if cut:
+            self._buffer = self._buffer[cut:]
+            self._pos -= cut
+            if self._item_start >= 0:
+                self._item_start -= cut
@@ -1,25 +1,331 @@
 """Synchronous implementation using requests."""
-import copy
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
 from datetime import datetime
-from typing import cast, List, Iterable, Optional, Callable
+from typing import (
+    cast, Any, Dict, List, Iterable, Iterator, Mapping, Optional, Callable,
+    Tuple
+)
 
 from .const import (
-    ALL_STATE_CODES, API_ALL_URL, API_STATE_URL, API_STATE_YEAR_URL,
-    API_TIMEOUT
+    API_ALL_URL, API_BULK_CONCURRENCY, API_POOL_SIZE,
+    API_STREAM_CHUNK_SIZE, API_TIMEOUT
+)
+from . import const
+from .base import (
+    BaseClient, BulkResult, api_error, DATASET_KEY, HTTP_OK
 )
+from .cache import Cache, CacheEntry
+from .index import VacationCalendar
+from .dataset import Dataset, VacationIndex
+from .errors import CircuitOpenError
 from .model import Vacation
-from .types import APIResponse, APIUrl, StateCode
-from .util import parse_state_code, parse_year, find_current, find_next
+from .resilience import CircuitBreaker, RetryPolicy
+from .singleflight import SingleFlight
+from .stream import JsonArrayDecoder
+from .transport import (
+    RequestsTransport, StreamedResponse, Timeout, Transport
+)
+from .types import APIResponse, APIUrl, StateCode, StateYear
+from .util import state_url, state_year_pairs, find_current, find_next
+
+
+class FerienClient(BaseClient):
+    """
+    Synchronous ferien-api.de client.
+
+    By default the client uses a `RequestsTransport`, which keeps a single
+    `requests.Session` around, so consecutive calls reuse warm
+    (keep-alive) connections instead of paying DNS, TCP and TLS handshakes
+    over and over again. Concurrent requests of the same url (from
+    several threads) are collapsed into a single download. Stale cache
+    entries are revalidated in a background thread if
+    `stale_while_revalidate` is set.
+
+    The returned lists are copies, but the `Vacation` objects in them are
+    shared with other calls (and threads): They come from the memoized
+    conversion of a cache entry or from the dataset. Do not mutate them;
+    use `Vacation.freeze` or `attr.evolve` to get an independent copy.
+
+    Args:
+        pool_size: Maximum number of pooled connections to keep alive.
+        max_retries: Number of retries on connection errors.
+        timeout: Timeout in seconds. Either a single float or a
+            (connect, read) tuple. Defaults to `const.API_TIMEOUT`.
+        cache: Optional response cache (see `ferien.cache`).
+        stale_while_revalidate: Serve expired cache entries while
+            revalidating them in the background.
+        dataset: Optional local dataset (e.g. a loaded snapshot) to serve
+            all requests from.
+        transport: Optional transport to use instead of a
+            `RequestsTransport` (pool_size, max_retries and timeout are
+            ignored then).
+        base_url: Url of the holidays endpoint to use instead of
+            `const.API_ALL_URL`.
+        dataset_ttl: Download all vacations at once and serve all requests
+            from them. They are downloaded again after that many seconds.
+        retry: Optional retry policy of rate limited (429) and failed
+            (5xx) requests (see `ferien.resilience`).
+        circuit_breaker: Optional circuit breaker failing fast while
+            ferien-api.de is unavailable.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, pool_size: int = API_POOL_SIZE, max_retries: int = 0,
+                 timeout: Timeout = API_TIMEOUT,
+                 cache: Optional[Cache] = None,
+                 stale_while_revalidate: bool = False,
+                 dataset: Optional[Dataset] = None,
+                 transport: Optional[Transport] = None,
+                 base_url: APIUrl = API_ALL_URL,
+                 dataset_ttl: Optional[float] = None,
+                 retry: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None) -> None:
+        super().__init__(cache, stale_while_revalidate, dataset, base_url,
+                         dataset_ttl, retry, circuit_breaker)
+        if transport is None:
+            transport = RequestsTransport(pool_size, max_retries, timeout)
+        self.transport = transport
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+
+    def __enter__(self) -> 'FerienClient':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    @property
+    def session(self) -> Any:
+        """Returns the underlying `requests.Session` of the default
+        transport."""
+        return cast(RequestsTransport, self.transport).session
+
+    def close(self) -> None:
+        """Closes all pooled connections. The client can still be used
+        afterwards, but will open new connections."""
+        self.transport.close()
+
+    def _convert(self, api_url: APIUrl, entry: CacheEntry) -> List[Vacation]:
+        vacs = self._get_converted(api_url, entry)
+        if vacs is None:
+            started = self._clock()
+            vacs = self._set_converted(api_url, entry,
+                                       _convert_json(entry.payload))
+            self._convert_done(api_url, started, vacs)
+        return vacs
+
+    def _make_api_request(
+            self, api_url: APIUrl, headers: Dict[str, str]
+    ) -> Tuple[int, Mapping[str, str], Optional[APIResponse]]:
+        attempt = 0
+        while True:
+            self._before_request()
+            started, resp = self._clock(), None
+            try:
+                resp = self.transport.request(api_url, headers)
+                res = self._unpack_response(resp)
+            except BaseException as ex:
+                self._request_done(api_url, attempt, started, resp, ex)
+                retry_in = self._retry_in(api_url, attempt, ex)
+                if retry_in is None:
+                    raise
+            else:
+                self._request_done(api_url, attempt, started, resp, None)
+                return res
+            attempt += 1
+            time.sleep(retry_in)
+
+    @contextmanager
+    def _open_stream(self, api_url: APIUrl) -> Iterator[StreamedResponse]:
+        # Like _make_api_request: Only establishing the stream is guarded
+        # by the circuit breaker and retried, errors while reading the
+        # body are raised as is.
+        attempt = 0
+        while True:
+            self._before_request()
+            started, resp = self._clock(), None
+            with ExitStack() as stack:
+                try:
+                    resp = stack.enter_context(self.transport.stream(api_url))
+                    if resp.status != HTTP_OK:
+                        raise api_error(resp.status, resp.text)
+                except BaseException as ex:
+                    self._request_done(api_url, attempt, started, resp, ex)
+                    retry_in = self._retry_in(api_url, attempt, ex)
+                    if retry_in is None:
+                        raise
+                else:
+                    self._request_done(api_url, attempt, started, resp, None)
+                    yield resp
+                    return
+            attempt += 1
+            time.sleep(retry_in)
+
+    def _revalidate(self, api_url: APIUrl,
+                    entry: Optional[CacheEntry]) -> CacheEntry:
+        try:
+            res = self._make_api_request(api_url,
+                                         self._request_headers(entry))
+        except CircuitOpenError as ex:
+            return self._fallback(api_url, entry, ex)
+        return self._store(api_url, entry, *res)
+
+    def _revalidate_in_background(self, api_url: APIUrl,
+                                  entry: CacheEntry) -> None:
+        with self._lock:
+            if api_url in self._revalidating:
+                return
+            self._revalidating.add(api_url)
+        threading.Thread(
+            target=self._background_revalidation, args=(api_url, entry),
+            daemon=True
+        ).start()
+
+    def _background_revalidation(self, api_url: APIUrl,
+                                 entry: CacheEntry) -> None:
+        try:
+            self._convert(api_url, self._revalidate(api_url, entry))
+        except Exception:  # pylint: disable=broad-except
+            self._log_revalidation_error(api_url)
+        finally:
+            with self._lock:
+                self._revalidating.discard(api_url)
 
+    def _download(self, api_url: APIUrl,
+                  entry: Optional[CacheEntry]) -> List[Vacation]:
+        return self._convert(api_url, self._revalidate(api_url, entry))
 
-def _make_api_request(api_url: APIUrl) -> APIResponse:
-    import requests  # pylint: disable=import-outside-toplevel
-    resp = requests.get(api_url, timeout=API_TIMEOUT)
-    if resp.status_code != 200:
-        # pylint: disable=consider-using-f-string
-        raise RuntimeError("ferien-api.de failed with http code = '{}'\n"
-                           "Error: {}".format(resp.status_code, resp.text))
-    return cast(APIResponse, resp.json())
+    def _fetch(self, api_url: APIUrl) -> List[Vacation]:
+        entry, usable = self._lookup(api_url)
+        if entry is not None and usable:
+            return self._convert(api_url, entry)
+        # Concurrent threads requesting the same url share one download
+        return list(self._flights.do(
+            api_url, lambda: self._download(api_url, entry)
+        ))
+
+    def load_dataset(self) -> VacationIndex:
+        """Downloads all vacations at once and answers all further requests
+        from them (until dataset_ttl expires)."""
+        return self._set_dataset(self._fetch(self.rebase_url(API_ALL_URL)))
+
+    def _ensure_dataset(self) -> None:
+        if not self._dataset_expired():
+            return
+        try:
+            self._flights.do(DATASET_KEY, self.load_dataset)
+        except Exception:
+            if self.dataset is None:
+                raise
+            self._dataset_failed()
+
+    def all_vacations(self) -> List[Vacation]:
+        """Makes a request to the ferien-api.de retrieving all
+        vacations for all states at once"""
+        self._ensure_dataset()
+        vacs = self._from_dataset()
+        if vacs is None:
+            vacs = self._fetch(self.rebase_url(API_ALL_URL))
+        return vacs
+
+    def state_vacations(self, state_code: StateCode,
+                        year: Optional[int] = None) -> List[Vacation]:
+        """Makes a request to the ferien-api.de using the given
+        state_code and - optionally - the specified year."""
+        self._ensure_dataset()
+        vacs = self._from_dataset(state_code, year)
+        if vacs is None:
+            vacs = self._fetch(self.rebase_url(state_url(state_code, year)))
+        return vacs
+
+    def current_vacation(self, state_code: StateCode,
+                         dt: Optional[datetime] = None) -> Optional[Vacation]:
+        """Returns the current vacation of the given state based on the
+        given dt (default: now). Returns None if no vacation surrounds
+        (start, end) the given dt."""
+        self._ensure_dataset()
+        cal = self._calendar(state_code)
+        if cal is not None:
+            return cal.find_current(dt)
+        return find_current(self.state_vacations(state_code), dt)
+
+    def next_vacation(self, state_code: StateCode,
+                      dt: Optional[datetime] = None) -> Optional[Vacation]:
+        """Returns the next vacation of the given state based on the given
+        dt (default: now). Returns None if no vacation is left."""
+        self._ensure_dataset()
+        cal = self._calendar(state_code)
+        if cal is not None:
+            return cal.find_next(dt)
+        return find_next(self.state_vacations(state_code), dt)
+
+    def iter_all_vacations(
+            self, chunk_size: int = API_STREAM_CHUNK_SIZE
+    ) -> Iterator[Vacation]:
+        """Makes a request to the ferien-api.de retrieving all vacations
+        for all states at once. The response is parsed incrementally and
+        the vacations are yielded as they arrive. The cache is bypassed.
+        The retry policy and the circuit breaker apply to establishing the
+        stream, but not to reading the body."""
+        self._ensure_dataset()
+        if self.dataset is not None:
+            yield from self.dataset
+            return
+        # The stream is released by the ExitStack of _open_stream
+        # pylint: disable=contextmanager-generator-missing-cleanup
+        with self._open_stream(self.rebase_url(API_ALL_URL)) as resp:
+            decoder = JsonArrayDecoder()
+            for chunk in iter(lambda: resp.read(chunk_size), b''):
+                for item in decoder.feed(chunk):
+                    yield Vacation.from_dict(item)
+            for item in decoder.close():
+                yield Vacation.from_dict(item)
+
+    def fetch_states(self, states: Optional[Iterable[StateCode]] = None,
+                     years: Optional[Iterable[int]] = None,
+                     max_workers: int = API_BULK_CONCURRENCY) -> BulkResult:
+        """Fetches the vacations of all combinations of the given states
+        (default: all) and years (default: all years) using a pool of
+        max_workers threads. Identical combinations are only requested
+        once. Failed requests are collected in the result instead of
+        being raised."""
+        pairs = state_year_pairs(states, years)
+        res = BulkResult()
+
+        def _fetch_one(pair: StateYear) -> None:
+            try:
+                res.vacations[pair] = self.state_vacations(*pair)
+            except Exception as ex:  # pylint: disable=broad-except
+                res.errors[pair] = ex
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(_fetch_one, pairs))
+        return res
+
+
+_DEFAULT_CLIENT = None  # type: Optional[FerienClient]
+_DEFAULT_CLIENT_LOCK = threading.Lock()
+
+
+def default_client() -> FerienClient:
+    """Returns the client the module level functions delegate to. It is
+    created on first use."""
+    global _DEFAULT_CLIENT  # pylint: disable=global-statement
+    with _DEFAULT_CLIENT_LOCK:
+        if _DEFAULT_CLIENT is None:
+            _DEFAULT_CLIENT = FerienClient()
+        return _DEFAULT_CLIENT
+
+
+def set_default_client(client: Optional[FerienClient]) -> None:
+    """Replaces the client the module level functions delegate to.
+    Passing None will lazily create a fresh default client on next use."""
+    global _DEFAULT_CLIENT  # pylint: disable=global-statement
+    with _DEFAULT_CLIENT_LOCK:
+        _DEFAULT_CLIENT = client
 
 
 def _convert_json(resp: APIResponse) -> List[Vacation]:
@@ -28,32 +334,36 @@ def _convert_json(resp: APIResponse) -> List[Vacation]:
 
 def state_codes() -> List[StateCode]:
     """Returns all known and valid state codes."""
-    return copy.copy(ALL_STATE_CODES)
+    return const.state_codes()
 
 
 def all_vacations() -> List[Vacation]:
     """Makes a request to the ferien-api.de retrieving all
     vacations for all states at once"""
-    return _convert_json(_make_api_request(API_ALL_URL))
+    return default_client().all_vacations()
 
 
 def state_vacations(state_code: StateCode,
                     year: Optional[int] = None) -> List[Vacation]:
     """Makes a request to the ferien-api.de using the given
     state_code and - optionally - the specified year."""
-    state_code = parse_state_code(state_code)
-    year = year and parse_year(year)
+    return default_client().state_vacations(state_code, year)
+
 
-    if year is None:
-        resp = _make_api_request(
-            API_STATE_URL.format(state_code=state_code)
-        )
-    else:
-        resp = _make_api_request(
-            API_STATE_YEAR_URL.format(state_code=state_code, year=str(year))
-        )
+def iter_all_vacations() -> Iterator[Vacation]:
+    """Makes a request to the ferien-api.de retrieving all vacations for
+    all states at once and yields them while the response is parsed
+    incrementally."""
+    return default_client().iter_all_vacations()
 
-    return _convert_json(resp)
+
+def fetch_states(states: Optional[Iterable[StateCode]] = None,
+                 years: Optional[Iterable[int]] = None,
+                 max_workers: int = API_BULK_CONCURRENCY) -> BulkResult:
+    """Fetches the vacations of all combinations of the given states
+    (default: all) and years (default: all years) concurrently. See
+    `FerienClient.fetch_states`."""
+    return default_client().fetch_states(states, years, max_workers)
 
 
 def current_vacation(state_code: Optional[StateCode] = None,
@@ -61,23 +371,33 @@ def current_vacation(state_code: Optional[StateCode] = None,
                      dt: Optional[datetime] = None) -> Optional[Vacation]:
     """Returns the current vacation based on the given dt.
     Returns None if no vacation surrounds (start, end) the
-    given dt."""
-    return _apply_fun(find_current, state_code, vacs, dt)
+    given dt. Argument vacs might be a prebuilt `VacationCalendar`."""
+    if isinstance(vacs, VacationCalendar):
+        return vacs.find_current(dt)
+    return _apply_fun(find_current, FerienClient.current_vacation,
+                      state_code, vacs, dt)
 
 
 def next_vacation(state_code: Optional[StateCode] = None,
                   vacs: Optional[Iterable[Vacation]] = None,
                   dt: Optional[datetime] = None) -> Optional[Vacation]:
     """Returns the next vacation based on the given dt.
-    Returns None if no vacation is left."""
-    return _apply_fun(find_next, state_code, vacs, dt)
+    Returns None if no vacation is left. Argument vacs might be a prebuilt
+    `VacationCalendar`."""
+    if isinstance(vacs, VacationCalendar):
+        return vacs.find_next(dt)
+    return _apply_fun(find_next, FerienClient.next_vacation, state_code,
+                      vacs, dt)
 
 
 ApplyFun = Callable[[Iterable[Vacation], Optional[datetime]],
                     Optional[Vacation]]
 
+ClientFun = Callable[[FerienClient, StateCode, Optional[datetime]],
+                     Optional[Vacation]]
+
 
-def _apply_fun(fun: ApplyFun,
+def _apply_fun(fun: ApplyFun, client_fun: ClientFun,
                state_code: Optional[StateCode] = None,
                vacs: Optional[Iterable[Vacation]] = None,
                dt: Optional[datetime] = None) -> Optional[Vacation]:
@@ -86,7 +406,7 @@ def _apply_fun(fun: ApplyFun,
     if vacs:
         return fun(vacs, dt)
     if state_code:
-        return fun(state_vacations(state_code), dt)
+        return client_fun(default_client(), state_code, dt)
 
     raise ValueError("You have to either specify argument 'state_code' "
                      "or argument 'vacs'")
@@ -0,0 +1,335 @@
+"""Contains the http transports used by the sync and async clients.
+
+A transport only moves bytes: It performs a GET request and returns the
+status code, the headers and either the decoded json payload (status 200)
+or the response text. Everything else (caching, conversion, error
+handling) is done by the clients, so a transport can be replaced by any
+other http library (or an in-memory fake) by implementing `Transport` or
+`AsyncTransport`.
+"""
+import asyncio
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import (
+    Any, Callable, Dict, Iterator, Mapping, Optional, Tuple, Union, cast
+)
+
+import attr
+
+from .base import HTTP_OK
+from .const import (
+    API_CONNECT_TIMEOUT, API_POOL_SIZE, API_TIMEOUT, API_TOTAL_TIMEOUT
+)
+from .errors import RequestTimeoutError
+from .types import APIResponse, APIUrl
+
+Timeout = Union[float, Tuple[float, float]]
+
+Headers = Mapping[str, str]
+
+ChunkReader = Callable[[int], Any]
+
+Chunks = Optional[Iterator[bytes]]
+
+_SSL_CONTEXT = None  # type: Any
+
+
+def _ssl_context() -> Any:
+    """Returns the ssl context trusting the certifi ca bundle. The bundle
+    is only read from disk once per process."""
+    global _SSL_CONTEXT  # pylint: disable=global-statement
+    if _SSL_CONTEXT is None:
+        # pylint: disable=import-outside-toplevel
+        import certifi  # type: ignore
+        import ssl  # type: ignore
+        _SSL_CONTEXT = ssl.create_default_context(cafile=certifi.where())
+    return _SSL_CONTEXT
+
+
+# pylint: disable=too-few-public-methods
+@attr.s(slots=True)
+class Response:
+    """A complete response. The payload is only set for status 200, the
+    text only for any other status. Size (bytes received) and decode_time
+    (seconds spent decoding the json) are optional and only used for
+    instrumentation (see `ferien.instrument`)."""
+    status = attr.ib(type=int)  # type: int
+    headers = attr.ib(default=attr.Factory(dict))  # type: Headers
+    payload = attr.ib(default=None)  # type: Optional[APIResponse]
+    text = attr.ib(default='')  # type: str
+    size = attr.ib(default=0)  # type: int
+    decode_time = attr.ib(default=0.0)  # type: float
+
+
+@attr.s(slots=True)
+class StreamedResponse:
+    """A streamed response. For status 200 the body is read by calling
+    `read(size)` until it returns an empty chunk (a coroutine function for
+    async transports), for any other status the text is set."""
+    status = attr.ib(type=int)  # type: int
+    read = attr.ib()  # type: ChunkReader
+    text = attr.ib(default='')  # type: str
+
+
+class Transport(ABC):
+    """Interface of the transports used by `FerienClient`."""
+
+    @abstractmethod
+    def request(self, api_url: APIUrl, headers: Dict[str, str]) -> Response:
+        """Performs a GET request of the given url."""
+        raise NotImplementedError()  # pragma: no cover
+
+    @abstractmethod
+    def stream(self, api_url: APIUrl) -> Any:
+        """Returns a context manager performing a GET request of the given
+        url and yielding a `StreamedResponse`."""
+        raise NotImplementedError()  # pragma: no cover
+
+    def close(self) -> None:
+        """Releases all resources (e.g. pooled connections). The transport
+        can still be used afterwards."""
+
+
+class AsyncTransport(ABC):
+    """Interface of the transports used by `AsyncFerienClient`."""
+
+    @abstractmethod
+    async def request(self, api_url: APIUrl,
+                      headers: Dict[str, str]) -> Response:
+        """Performs a GET request of the given url."""
+        raise NotImplementedError()  # pragma: no cover
+
+    @abstractmethod
+    def stream(self, api_url: APIUrl) -> Any:
+        """Returns an async context manager performing a GET request of the
+        given url and yielding a `StreamedResponse`."""
+        raise NotImplementedError()  # pragma: no cover
+
+    async def close(self) -> None:
+        """Releases all resources (e.g. pooled connections). The transport
+        can still be used afterwards."""
+
+
+class RequestsTransport(Transport):
+    """
+    Transport using a single pooled `requests.Session`, so consecutive
+    requests reuse warm (keep-alive) connections.
+
+    Args:
+        pool_size: Maximum number of pooled connections to keep alive.
+        max_retries: Number of retries on connection errors.
+        timeout: Timeout in seconds. Either a single float or a
+            (connect, read) tuple.
+    """
+
+    def __init__(self, pool_size: int = API_POOL_SIZE, max_retries: int = 0,
+                 timeout: Timeout = API_TIMEOUT) -> None:
+        if pool_size < 1:
+            # pylint: disable=consider-using-f-string
+            raise ValueError("Argument pool_size is expected to be greater "
+                             "than zero, but is {}".format(pool_size))
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._session = None  # type: Any
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> Any:
+        """Returns the underlying `requests.Session`. The session is created
+        on first access."""
+        with self._lock:
+            if self._session is None:
+                self._session = self._make_session()
+            return self._session
+
+    def _make_session(self) -> Any:
+        # pylint: disable=import-outside-toplevel
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            max_retries=self.max_retries
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def request(self, api_url: APIUrl, headers: Dict[str, str]) -> Response:
+        import requests  # pylint: disable=import-outside-toplevel
+        try:
+            resp = self.session.get(api_url, headers=headers,
+                                    timeout=self.timeout)
+        except requests.Timeout as ex:
+            raise _timeout_error(api_url, ex) from ex
+        if resp.status_code != HTTP_OK:
+            return Response(resp.status_code, resp.headers, text=resp.text)
+        started = time.perf_counter()
+        payload = cast(APIResponse, resp.json())
+        return Response(resp.status_code, resp.headers, payload=payload,
+                        size=len(resp.content),
+                        decode_time=time.perf_counter() - started)
+
+    @contextmanager
+    def stream(self, api_url: APIUrl) -> Iterator[StreamedResponse]:
+        import requests  # pylint: disable=import-outside-toplevel
+        try:
+            streamed = self.session.get(api_url, timeout=self.timeout,
+                                        stream=True)
+        except requests.Timeout as ex:
+            raise _timeout_error(api_url, ex) from ex
+        with streamed as resp:
+            if resp.status_code != HTTP_OK:
+                yield StreamedResponse(resp.status_code, _no_chunk,
+                                       text=resp.text)
+                return
+            chunks = None  # type: Chunks
+
+            def _read(size: int) -> bytes:
+                nonlocal chunks
+                if chunks is None:
+                    chunks = resp.iter_content(size)
+                try:
+                    return next(chunks, b'')
+                except requests.ConnectionError as ex:
+                    # requests reports read timeouts while streaming the
+                    # body as connection errors
+                    if _is_read_timeout(ex):
+                        raise _timeout_error(api_url, ex) from ex
+                    raise
+
+            yield StreamedResponse(resp.status_code, _read)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+class AiohttpTransport(AsyncTransport):
+    """
+    Transport using one long-lived `aiohttp.ClientSession`, so all requests
+    share the connection pool and the ssl context.
+
+    Args:
+        limit: Maximum number of simultaneous connections.
+        timeout: Total timeout of a request in seconds (including reading
+            the body). None disables it.
+        connect_timeout: Timeout of establishing a connection (including
+            waiting for a free pooled connection) in seconds.
+    """
+
+    def __init__(self, limit: int = API_POOL_SIZE,
+                 timeout: Optional[float] = API_TOTAL_TIMEOUT,
+                 connect_timeout: Optional[float] = API_CONNECT_TIMEOUT
+                 ) -> None:
+        if limit < 1:
+            # pylint: disable=consider-using-f-string
+            raise ValueError("Argument limit is expected to be greater "
+                             "than zero, but is {}".format(limit))
+        self.limit = limit
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._session = None  # type: Any
+
+    @property
+    def session(self) -> Any:
+        """Returns the underlying `aiohttp.ClientSession`. The session is
+        created on first access and has to be accessed from within a
+        running event loop."""
+        if self._session is None or self._session.closed:
+            import aiohttp  # pylint: disable=import-outside-toplevel
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.limit, ssl=_ssl_context()
+                ),
+                timeout=aiohttp.ClientTimeout(
+                    total=self.timeout, connect=self.connect_timeout
+                )
+            )
+        return self._session
+
+    async def request(self, api_url: APIUrl,
+                      headers: Dict[str, str]) -> Response:
+        try:
+            return await self._request(api_url, headers)
+        except asyncio.TimeoutError as ex:
+            raise _timeout_error(api_url, ex) from ex
+
+    async def _request(self, api_url: APIUrl,
+                       headers: Dict[str, str]) -> Response:
+        async with self.session.get(api_url, headers=headers) as resp:
+            if resp.status != HTTP_OK:
+                return Response(resp.status, resp.headers,
+                                text=await resp.text())
+            body = await resp.read()
+            started = time.perf_counter()
+            payload = cast(APIResponse, await resp.json())
+            return Response(resp.status, resp.headers, payload=payload,
+                            size=len(body),
+                            decode_time=time.perf_counter() - started)
+
+    def stream(self, api_url: APIUrl) -> Any:
+        return _AiohttpStream(self.session, api_url)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class _AiohttpStream:
+    # Async context manager of AiohttpTransport.stream
+
+    def __init__(self, session: Any, api_url: APIUrl) -> None:
+        self._session = session
+        self._api_url = api_url
+        self._resp = None  # type: Any
+
+    async def __aenter__(self) -> StreamedResponse:
+        try:
+            self._resp = await self._session.get(self._api_url)
+            if self._resp.status != HTTP_OK:
+                return StreamedResponse(self._resp.status, _no_chunk_async,
+                                        text=await self._resp.text())
+        except asyncio.TimeoutError as ex:
+            raise _timeout_error(self._api_url, ex) from ex
+        return StreamedResponse(self._resp.status, self._read)
+
+    async def _read(self, size: int) -> bytes:
+        try:
+            return cast(bytes, await self._resp.content.read(size))
+        except asyncio.TimeoutError as ex:
+            raise _timeout_error(self._api_url, ex) from ex
+
+    async def __aexit__(self, *args: Any) -> None:
+        if self._resp is not None:
+            self._resp.release()
+            self._resp = None
+
+
+def _timeout_error(api_url: APIUrl, ex: Exception) -> RequestTimeoutError:
+    # pylint: disable=consider-using-f-string
+    return RequestTimeoutError("Request of '{}' timed out: {}".format(
+        api_url, ex or type(ex).__name__
+    ))
+
+
+def _is_read_timeout(ex: Exception) -> bool:
+    # pylint: disable=import-outside-toplevel
+    from urllib3.exceptions import ReadTimeoutError
+    return any(isinstance(arg, ReadTimeoutError) for arg in ex.args)
+
+
+def _no_chunk(_: int) -> bytes:
+    return b''
+
+
+async def _no_chunk_async(_: int) -> bytes:
+    return b''
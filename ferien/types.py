@@ -1,5 +1,5 @@
 """Contains common typing types."""
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 
 APIUrl = str
 
@@ -8,3 +8,5 @@ APIItem = Dict[str, Any]
 APIResponse = List[APIItem]
 
 StateCode = str
+
+StateYear = Tuple[StateCode, Optional[int]]
@@ -0,0 +1,59 @@
+"""Contains the german timezone all vacations are localized to.
+
+The timezone is created on first use, so neither pytz nor zoneinfo is
+imported along with the package. By default pytz is used (just like
+`const.TZ_GERMANY`); set the environment variable `FERIEN_TZ_BACKEND` to
+`zoneinfo` to use the standard library (python 3.9+) instead.
+
+Note: pytz attaches the utc offset of midnight to the end of a vacation
+(23:59:59) even if the daylight saving time changes during that day,
+zoneinfo uses the offset that is actually in effect at 23:59:59.
+"""
+import os
+from datetime import datetime, tzinfo
+from functools import lru_cache
+from typing import Any, cast
+
+TZ_NAME = 'Europe/Berlin'
+
+TZ_BACKEND_ENV = 'FERIEN_TZ_BACKEND'
+
+BACKEND_PYTZ = 'pytz'
+BACKEND_ZONEINFO = 'zoneinfo'
+
+
+def backend() -> str:
+    """Returns the configured timezone backend."""
+    name = os.environ.get(TZ_BACKEND_ENV, BACKEND_PYTZ).strip().lower()
+    if name not in (BACKEND_PYTZ, BACKEND_ZONEINFO):
+        # pylint: disable=consider-using-f-string
+        raise ValueError("Environment variable {} is expected to be one of "
+                         "'{}' or '{}', but is '{}'".format(
+                             TZ_BACKEND_ENV, BACKEND_PYTZ, BACKEND_ZONEINFO,
+                             name))
+    return name
+
+
+@lru_cache(maxsize=None)
+def germany() -> tzinfo:
+    """Returns the german timezone of the configured backend. It is
+    created on first use."""
+    # pylint: disable=import-outside-toplevel
+    if backend() == BACKEND_ZONEINFO:
+        from zoneinfo import ZoneInfo  # type: ignore
+        return cast(tzinfo, ZoneInfo(TZ_NAME))
+    import pytz
+    return pytz.timezone(TZ_NAME)
+
+
+def localize(dt: datetime) -> datetime:
+    """Attaches the german timezone to the given naive datetime."""
+    tz = germany()
+    if not hasattr(tz, 'localize'):
+        return dt.replace(tzinfo=tz)
+    return cast(datetime, cast(Any, tz).localize(dt))
+
+
+def now() -> datetime:
+    """Returns the current time in the german timezone."""
+    return datetime.now(tz=germany())
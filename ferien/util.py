@@ -1,9 +1,11 @@
 """Contains utility functions used by sync and async code"""
 from datetime import datetime
-from typing import Iterable, Any, Optional, cast
+from typing import Iterable, Any, List, Optional, cast
 
-from .const import ALL_STATE_CODES, TZ_GERMANY
-from .model import Vacation
+from .const import ALL_STATE_CODES, API_STATE_URL, API_STATE_YEAR_URL
+from .model import AnyVacation, FrozenVacation, Vacation, VacationT
+from .tz import localize, now
+from .types import StateYear
 
 
 def is_tz_aware_timestamp(dt: datetime) -> bool:
@@ -16,9 +18,9 @@ def make_tz_aware_timestamp(dt: Optional[datetime]) -> datetime:
     1. dt is None: datetime.now() in german timezone
     2. dt has timezone: Return as is
     3. dt has no timezone: Assume that is german tz and set it."""
-    dt = dt or datetime.now(tz=TZ_GERMANY)
+    dt = dt or now()
     if not is_tz_aware_timestamp(dt):
-        dt = TZ_GERMANY.localize(dt)
+        dt = localize(dt)
     return dt
 
 
@@ -43,6 +45,32 @@ def parse_year(candidate: Any) -> int:
     return cast(int, candidate)
 
 
+def state_url(state_code: Any, year: Any = None) -> str:
+    """Builds the api url to retrieve the vacations of the given state
+    and - optionally - the specified year. Both arguments are validated
+    beforehand."""
+    state_code = parse_state_code(state_code)
+    year = year and parse_year(year)
+    if year is None:
+        return API_STATE_URL.format(state_code=state_code)
+    return API_STATE_YEAR_URL.format(state_code=state_code, year=str(year))
+
+
+def state_year_pairs(state_codes: Optional[Iterable[Any]] = None,
+                     years: Optional[Iterable[Any]] = None) -> List[StateYear]:
+    """Returns the validated and deduplicated combinations of the given
+    state codes (default: all states) and years (default: no specific
+    year) preserving their order."""
+    codes = [parse_state_code(code) for code in state_codes or ALL_STATE_CODES]
+    parsed_years = [parse_year(year) for year in years or [None]]
+    res = []  # type: List[StateYear]
+    for code in codes:
+        for year in parsed_years:
+            if (code, year) not in res:
+                res.append((code, year))
+    return res
+
+
 def is_iterable_but_no_str(candidate: Any) -> bool:
     """Tests if the given candidate is an iterable (list, tuple, ...)
     but not a string."""
@@ -52,17 +80,29 @@ def is_iterable_but_no_str(candidate: Any) -> bool:
     )
 
 
-def check_vac_list(vacs: Iterable[Vacation]) -> None:
-    """Checks if the given list is an actual list of vacations."""
+_VACATION_TYPES = (Vacation, FrozenVacation)
+
+
+def check_vac_list(vacs: Iterable[AnyVacation]) -> None:
+    """Checks if the given list is an actual list of vacations (either
+    `Vacation` or `FrozenVacation` objects)."""
+    _check_iterable(vacs)
+    for i, val in enumerate(vacs):
+        if not isinstance(val, _VACATION_TYPES):
+            raise _item_type_error(i, val)
+
+
+def _check_iterable(vacs: Any) -> None:
     if not is_iterable_but_no_str(vacs):
         # pylint: disable=consider-using-f-string
         raise TypeError("Argument 'vacs' is expected to an iterable, "
                         "but is {}".format(type(vacs)))
-    for i, val in enumerate(vacs):
-        if not isinstance(val, Vacation):
-            # pylint: disable=consider-using-f-string
-            raise TypeError("Item {} of argument 'vacs' is expected to be of "
-                            "type 'Vacation', but is {}".format(i, type(val)))
+
+
+def _item_type_error(i: int, val: Any) -> TypeError:
+    # pylint: disable=consider-using-f-string
+    return TypeError("Item {} of argument 'vacs' is expected to be of "
+                     "type 'Vacation', but is {}".format(i, type(val)))
 
 
 def check_datetime(dt: Any) -> None:
@@ -73,31 +113,56 @@ def check_datetime(dt: Any) -> None:
                         "but is {}".format(type(dt)))
 
 
-def find_current(vacs: Iterable[Vacation],
-                 dt: Optional[datetime] = None) -> Optional[Vacation]:
+def find_current(vacs: Iterable[VacationT],
+                 dt: Optional[datetime] = None,
+                 sorted_by_start: bool = False) -> Optional[VacationT]:
     """Returns the current vacation based on the given dt.
     Returns None if no vacation surrounds (start, end) the
-    given dt."""
-    check_vac_list(vacs)
+    given dt. If several vacations surround dt, the last one wins.
+
+    The vacations (`Vacation` or `FrozenVacation` objects) are scanned
+    once and their types are checked on the way, so vacs may be any
+    iterable (e.g. a generator like `iter_all_vacations`). Set
+    sorted_by_start if the vacations are sorted by their start to stop at
+    the first vacation starting after dt."""
+    _check_iterable(vacs)
     check_datetime(dt)
 
     dt = make_tz_aware_timestamp(dt)
-    res = [i for i in vacs if i.start <= dt <= i.end][-1:]
-    if not res:
-        return None
-    return res[0]
-
-
-def find_next(vacs: Iterable[Vacation],
-              dt: Optional[datetime] = None) -> Optional[Vacation]:
+    res = None
+    for i, vac in enumerate(vacs):
+        if not isinstance(vac, _VACATION_TYPES):
+            raise _item_type_error(i, vac)
+        if vac.start > dt:
+            if sorted_by_start:
+                break
+        elif dt <= vac.end:
+            res = vac
+    return res
+
+
+def find_next(vacs: Iterable[VacationT],
+              dt: Optional[datetime] = None,
+              sorted_by_start: bool = False) -> Optional[VacationT]:
     """Returns the next vacation based on the given dt.
-    Returns None if no vacation is left."""
-    check_vac_list(vacs)
+    Returns None if no vacation is left. If several vacations start at
+    the same time, the first one wins.
+
+    The vacations (`Vacation` or `FrozenVacation` objects) are scanned
+    once and their types are checked on the way, so vacs may be any
+    iterable (e.g. a generator like `iter_all_vacations`). Set
+    sorted_by_start if the vacations are sorted by their start to stop at
+    the first vacation starting at or after dt."""
+    _check_iterable(vacs)
     check_datetime(dt)
 
     dt = make_tz_aware_timestamp(dt)
-
-    res = sorted([i for i in vacs if i.start >= dt], key=lambda i: i.start)
-    if not res:
-        return None
-    return res[0]
+    res = None  # type: Optional[VacationT]
+    for i, vac in enumerate(vacs):
+        if not isinstance(vac, _VACATION_TYPES):
+            raise _item_type_error(i, vac)
+        if vac.start >= dt and (res is None or vac.start < res.start):
+            res = vac
+            if sorted_by_start:
+                break
+    return res
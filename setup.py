@@ -49,10 +49,13 @@ setup(
     packages=find_packages(exclude=["*.tests", "*.tests.*", "tests.*", "tests"]),
     install_requires=[
         'aiohttp>=3.5.0',
-        'attrs>=18.0.0',
+        'attrs>=19.2.0',
         'pytz>=2015.2',
         'requests>=2.0.0'
     ],
+    extras_require={
+        'numpy': ['numpy']
+    },
     python_requires='>=3.5',
     include_package_data=True
 )
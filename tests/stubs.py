@@ -0,0 +1,150 @@
+import io
+import json
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from ferien.const import ALL_STATE_CODES
+from ferien.model import Vacation
+from ferien.transport import (
+    AsyncTransport, Response, StreamedResponse, Transport
+)
+
+
+def random_vacations(count, seed=42):
+    rnd = random.Random(seed)
+    res = []
+    for i in range(count):
+        start = datetime(2017, 1, 1) + timedelta(days=rnd.randint(0, 3 * 365))
+        end = start + timedelta(days=rnd.randint(0, 20))
+        state_code = rnd.choice(ALL_STATE_CODES)
+        res.append(Vacation.from_dict({
+            "start": start.strftime('%Y-%m-%d'),
+            "end": end.strftime('%Y-%m-%d'),
+            "year": start.year,
+            "stateCode": state_code,
+            "name": "ferien{}".format(i),
+            "slug": "ferien{}-{}-{}".format(i, start.year, state_code)
+        }))
+    return res
+
+
+VACS = random_vacations(300)
+
+
+class SequenceTransport(Transport):
+    """Answers with the given responses in order (repeating the last one).
+    Exceptions are raised instead."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def request(self, api_url, headers):
+        self.calls += 1
+        resp = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        if isinstance(resp, BaseException):
+            raise resp
+        return resp
+
+    @contextmanager
+    def stream(self, api_url):
+        resp = self.request(api_url, {})
+        body = io.BytesIO(json.dumps(resp.payload).encode())
+        yield StreamedResponse(resp.status, body.read, text=resp.text)
+
+
+class AsyncSequenceTransport(AsyncTransport):
+    def __init__(self, *responses):
+        self.sync = SequenceTransport(*responses)
+
+    async def request(self, api_url, headers):
+        return self.sync.request(api_url, headers)
+
+    def stream(self, api_url):
+        return _AsyncStream(self.sync.stream(api_url))
+
+
+class _AsyncStream:
+    def __init__(self, stream):
+        self.stream = stream
+
+    async def __aenter__(self):
+        resp = self.stream.__enter__()
+
+        async def read(size):
+            return resp.read(size)
+        return StreamedResponse(resp.status, read, text=resp.text)
+
+    async def __aexit__(self, *args):
+        self.stream.__exit__(*args)
+
+
+class PayloadTransport(Transport):
+    """Answers every request with the current payload (or raises a
+    ConnectionError if it is None)."""
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.calls = 0
+
+    def request(self, api_url, headers):
+        self.calls += 1
+        if self.payload is None:
+            raise ConnectionError('Boom')
+        return Response(200, payload=self.payload)
+
+    def stream(self, api_url):
+        raise NotImplementedError()
+
+
+class AsyncPayloadTransport(AsyncTransport):
+    def __init__(self, payload):
+        self.sync = PayloadTransport(payload)
+
+    @property
+    def payload(self):
+        return self.sync.payload
+
+    @payload.setter
+    def payload(self, payload):
+        self.sync.payload = payload
+
+    async def request(self, api_url, headers):
+        return self.sync.request(api_url, headers)
+
+    def stream(self, api_url):
+        raise NotImplementedError()
+
+
+class DictTransport(Transport):
+    """Answers with the response of the requested url."""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.requested = []
+
+    def request(self, api_url, headers):
+        self.requested.append(api_url)
+        return self.responses[api_url]
+
+    def stream(self, api_url):
+        raise NotImplementedError()
+
+
+class StaticTransport(Transport):
+    """Answers with the payload, except for the states BY (connection
+    error) and SH (server error)."""
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def request(self, api_url, headers):
+        if api_url.endswith('/BY'):
+            raise ConnectionError('Boom')
+        if api_url.endswith('/SH'):
+            return Response(500, text='Boom')
+        return Response(200, payload=self.payload, size=1234, decode_time=0.5)
+
+    def stream(self, api_url):
+        raise NotImplementedError()
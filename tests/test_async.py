@@ -1,8 +1,14 @@
+import asyncio
+from datetime import datetime
+from unittest.mock import patch
+
 import pytest
 from aioresponses import aioresponses
 
 import ferien.async_ as dut
+from ferien.fake_server import FakeFerienServer
 from ferien.model import Vacation
+from ferien.transport import _ssl_context
 
 DUMMY_RESP = [
     {
@@ -61,3 +67,98 @@ async def test_get_state_vacations_by_state_year():
 
         res = await dut.state_vacations_async('HB', 2017)
         assert res == EXPECTED
+
+
+@pytest.mark.asyncio
+async def test_client_shares_session():
+    with aioresponses() as m:
+        m.get('https://ferien-api.de/api/v1/holidays/HB', payload=DUMMY_RESP)
+        m.get('https://ferien-api.de/api/v1/holidays/HB/2017', payload=DUMMY_RESP)
+
+        async with dut.AsyncFerienClient(limit=4) as client:
+            session = client.session
+            assert session.connector.limit == 4
+            assert await dut.state_vacations_async('HB', client=client) == EXPECTED
+            assert await client.state_vacations('HB', 2017) == EXPECTED
+            assert client.session is session
+        assert session.closed
+
+
+def test_ssl_context_is_cached():
+    assert _ssl_context() is _ssl_context()
+
+
+@pytest.mark.asyncio
+async def test_fetch_states_async():
+    with aioresponses() as m:
+        m.get('https://ferien-api.de/api/v1/holidays/HB', payload=DUMMY_RESP)
+        m.get('https://ferien-api.de/api/v1/holidays/SH', status=500)
+
+        res = await dut.fetch_states_async(['HB', 'SH', 'HB'], concurrency=1)
+        assert res.vacations == {('HB', None): EXPECTED}
+        assert list(res.errors) == [('SH', None)]
+        assert isinstance(res.errors[('SH', None)], RuntimeError)
+
+
+@pytest.mark.asyncio
+async def test_convert_json_yields_per_chunk():
+    resp = DUMMY_RESP * 5
+    with patch('ferien.async_.asyncio.sleep', wraps=asyncio.sleep) as mock_sleep:
+        res = await dut._convert_json(resp, chunk_size=4)
+    assert res == EXPECTED * 5
+    assert mock_sleep.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_convert_json_in_executor():
+    resp = DUMMY_RESP * 5
+    with patch('ferien.async_.asyncio.sleep') as mock_sleep:
+        res = await dut._convert_json(resp, chunk_size=1, executor_threshold=10)
+    assert res == EXPECTED * 5
+    assert mock_sleep.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_aiter_all_vacations():
+    with aioresponses() as m:
+        m.get('https://ferien-api.de/api/v1/holidays', payload=DUMMY_RESP)
+
+        res = [vac async for vac in dut.aiter_all_vacations()]
+        assert res == EXPECTED
+
+
+@pytest.mark.asyncio
+async def test_aiter_all_vacations_bad_status_code():
+    with aioresponses() as m:
+        m.get('https://ferien-api.de/api/v1/holidays', status=500)
+
+        async with dut.AsyncFerienClient() as client:
+            with pytest.raises(RuntimeError, match="ferien-api.de failed with http code = '500'"):
+                async for _ in client.iter_all_vacations(chunk_size=3):
+                    pass
+
+
+@pytest.mark.asyncio
+async def test_current_and_next_vacation_async():
+    with aioresponses() as m:
+        m.get('https://ferien-api.de/api/v1/holidays/HB', payload=DUMMY_RESP, repeat=True)
+
+        dt = datetime(2017, 1, 30)
+        assert await dut.current_vacation_async('HB', dt=dt) == EXPECTED[0]
+        assert await dut.next_vacation_async('HB', dt=dt) == EXPECTED[1]
+        assert await dut.current_vacation_async('HB', dt=datetime(2017, 3, 1)) is None
+
+
+@pytest.mark.asyncio
+async def test_current_and_next_vacations_async():
+    with FakeFerienServer() as server:
+        async with dut.AsyncFerienClient(base_url=server.base_url) as client:
+            dt = datetime(2019, 7, 20)
+            current = await dut.current_vacations_async(['HH', 'SH', 'HH'], dt=dt, client=client)
+            assert list(current) == ['HH', 'SH']
+            assert current['HH'] == await dut.current_vacation_async('HH', dt, client=client)
+            assert current['HH'].name == 'sommerferien'
+
+            upcoming = await dut.next_vacations_async(dt=dt, client=client)
+            assert len(upcoming) == 16
+            assert upcoming['HH'] == await client.next_vacation('HH', dt)
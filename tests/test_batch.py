@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from ferien.batch import BatchLookup, to_epoch_micros
+from ferien.const import TZ_GERMANY
+from ferien.util import find_current, find_next
+
+from stubs import VACS
+
+
+def _probe_dates():
+    start = datetime(2016, 12, 1)
+    return [start + timedelta(hours=7 * i) for i in range(1500)]
+
+
+def _index(vac):
+    return -1 if vac is None else VACS.index(vac)
+
+
+def test_batch_find_current_and_next():
+    lookup = BatchLookup(VACS)
+    dts = _probe_dates()
+    assert lookup.find_current(dts).tolist() == [_index(find_current(VACS, dt)) for dt in dts]
+    assert lookup.find_next(dts).tolist() == [_index(find_next(VACS, dt)) for dt in dts]
+
+
+def test_batch_accepts_frozen_vacations():
+    dts = _probe_dates()
+    frozen = BatchLookup([vac.freeze() for vac in VACS])
+    assert frozen.find_current(dts).tolist() == BatchLookup(VACS).find_current(dts).tolist()
+
+
+def test_batch_per_state():
+    lookup = BatchLookup(VACS)
+    dts = _probe_dates()
+    states = [('HH', 'BY', 'SL')[i % 3] for i in range(len(dts))]
+    by_state = {
+        code: [vac for vac in VACS if vac.state_code == code] for code in set(states)
+    }
+
+    current = lookup.find_current(dts, states)
+    assert current.tolist() == [
+        _index(find_current(by_state[code], dt)) for dt, code in zip(dts, states)
+    ]
+    assert lookup.is_vacation(dts, states).tolist() == [i >= 0 for i in current.tolist()]
+    assert lookup.find_next(dts, states).tolist() == [
+        _index(find_next(by_state[code], dt)) for dt, code in zip(dts, states)
+    ]
+    assert lookup.find_current(dts, 'HH').tolist() == [
+        _index(find_current(by_state['HH'], dt)) for dt in dts
+    ]
+
+
+def test_batch_input_types():
+    dts = [TZ_GERMANY.localize(datetime(2018, 3, 1, 12))]
+    expected = to_epoch_micros(dts)
+    epoch = int(dts[0].timestamp())
+    assert to_epoch_micros(np.array([epoch])).tolist() == expected.tolist()
+    assert to_epoch_micros(np.array([epoch], dtype='datetime64[s]')).tolist() == expected.tolist()
+    assert to_epoch_micros([float(epoch)]).tolist() == expected.tolist()
+
+
+def test_batch_empty_and_bad_state():
+    lookup = BatchLookup([])
+    assert lookup.find_current([datetime(2018, 1, 1)]).tolist() == [-1]
+    assert lookup.find_next([datetime(2018, 1, 1)]).tolist() == [-1]
+    with pytest.raises(ValueError):
+        BatchLookup(VACS).find_current([datetime(2018, 1, 1)], ['UKW'])
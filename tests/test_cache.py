@@ -0,0 +1,207 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from aioresponses import aioresponses
+
+import ferien.async_ as async_dut
+import ferien.cache as dut
+import ferien.sync_ as sync_dut
+from ferien.model import Vacation
+
+DUMMY_RESP = [
+    {
+      "start": "2017-01-29",
+      "end": "2017-01-31",
+      "year": 2017,
+      "stateCode": "HB",
+      "name": "winterferien",
+      "slug": "winterferien-2017-HB"
+    }
+]
+
+
+EXPECTED = [Vacation.from_dict(entry) for entry in DUMMY_RESP]
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_cache(request, tmp_path):
+    def _make(**kwargs):
+        if request.param == 'memory':
+            return dut.MemoryCache(**kwargs)
+        return dut.SQLiteCache(str(tmp_path / 'cache.db'), **kwargs)
+    return _make
+
+
+def test_cache_hit_and_miss(make_cache):
+    cache = make_cache()
+    assert cache.get('a') is None
+    cache.set('a', DUMMY_RESP)
+    assert cache.get('a') == DUMMY_RESP
+    assert cache.stats == dut.CacheStats(hits=1, misses=1, evictions=0)
+    assert cache.stats.hit_ratio == 0.5
+
+
+def test_cache_ttl(make_cache):
+    cache = make_cache(ttl=10)
+    with patch('ferien.cache._now', return_value=100.0):
+        cache.set('a', DUMMY_RESP)
+    with patch('ferien.cache._now', return_value=109.0):
+        assert cache.get('a') == DUMMY_RESP
+    with patch('ferien.cache._now', return_value=110.0):
+        assert cache.get('a') is None
+        # Expired entries are kept for revalidation
+        assert not cache.lookup('a').is_fresh()
+    assert len(cache) == 1
+
+
+def test_cache_validators(make_cache):
+    cache = make_cache(ttl=10)
+    with patch('ferien.cache._now', return_value=100.0):
+        entry = cache.set('a', DUMMY_RESP, etag='"abc"', last_modified='Sun, 01 Jan 2017')
+    assert cache.lookup('a') == entry
+    assert entry.conditional_headers() == {
+        'If-None-Match': '"abc"', 'If-Modified-Since': 'Sun, 01 Jan 2017'
+    }
+    with patch('ferien.cache._now', return_value=200.0):
+        refreshed = cache.refresh('a', entry)
+        assert refreshed.is_fresh()
+        assert refreshed.fetched == entry.fetched
+        assert cache.get('a') == DUMMY_RESP
+
+
+def test_cache_lru_eviction(make_cache):
+    cache = make_cache(max_size=2)
+    with patch('ferien.cache._now', return_value=1.0):
+        cache.set('a', [])
+    with patch('ferien.cache._now', return_value=2.0):
+        cache.set('b', [])
+    with patch('ferien.cache._now', return_value=3.0):
+        assert cache.get('a') == []
+    with patch('ferien.cache._now', return_value=4.0):
+        cache.set('c', [])
+        assert cache.get('b') is None
+        assert cache.get('a') == []
+        assert cache.get('c') == []
+    assert cache.stats.evictions == 1
+
+
+def test_cache_bad_arguments():
+    with pytest.raises(ValueError, match="Argument ttl is expected to be greater than zero"):
+        dut.MemoryCache(ttl=0)
+    with pytest.raises(ValueError, match="Argument max_size is expected to be greater than zero"):
+        dut.MemoryCache(max_size=0)
+
+
+def test_sqlite_cache_is_shared(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    dut.SQLiteCache(path).set('a', DUMMY_RESP)
+    assert dut.SQLiteCache(path).get('a') == DUMMY_RESP
+
+
+def test_sqlite_cache_throttles_access_writes(tmp_path):
+    cache = dut.SQLiteCache(str(tmp_path / 'cache.db'), access_resolution=60)
+    with patch('ferien.cache._now', return_value=100.0):
+        cache.set('a', DUMMY_RESP)
+    changes = cache._conn.total_changes
+    with patch('ferien.cache._now', return_value=130.0):
+        assert cache.get('a') == DUMMY_RESP
+        assert cache.get('a') == DUMMY_RESP
+    assert cache._conn.total_changes == changes
+    with patch('ferien.cache._now', return_value=160.0):
+        assert cache.get('a') == DUMMY_RESP
+    assert cache._conn.total_changes == changes + 1
+
+
+@patch('requests.Session.get')
+def test_sync_client_decodes_sqlite_payload_once(mock_requests, tmp_path):
+    mock_requests.return_value.status_code = 200
+    mock_requests.return_value.headers = {}
+    mock_requests.return_value.json.return_value = DUMMY_RESP
+
+    client = sync_dut.FerienClient(cache=dut.SQLiteCache(str(tmp_path / 'cache.db')))
+    assert client.state_vacations('HB') == EXPECTED
+    with patch('ferien.cache.json.loads') as mock_loads:
+        assert client.state_vacations('HB') == EXPECTED
+        assert client.state_vacations('HB') == EXPECTED
+    assert mock_loads.call_count == 0
+    assert mock_requests.call_count == 1
+
+
+@patch('requests.Session.get')
+def test_sync_client_uses_cache(mock_requests):
+    mock_requests.return_value.status_code = 200
+    mock_requests.return_value.json.return_value = DUMMY_RESP
+
+    client = sync_dut.FerienClient(cache=dut.MemoryCache())
+    assert client.state_vacations('HB') == EXPECTED
+    assert client.state_vacations('HB') == EXPECTED
+    assert mock_requests.call_count == 1
+    assert client.cache.stats == dut.CacheStats(hits=1, misses=1)
+
+
+@patch('requests.Session.get')
+def test_sync_client_revalidates(mock_requests):
+    mock_requests.return_value.status_code = 200
+    mock_requests.return_value.headers = {'ETag': '"v1"'}
+    mock_requests.return_value.json.return_value = DUMMY_RESP
+
+    client = sync_dut.FerienClient(cache=dut.MemoryCache(ttl=10))
+    with patch('ferien.cache._now', return_value=100.0):
+        first = client.state_vacations('HB')
+    mock_requests.return_value.status_code = 304
+    with patch('ferien.cache._now', return_value=200.0):
+        second = client.state_vacations('HB')
+        assert client.cache.get('https://ferien-api.de/api/v1/holidays/HB') == DUMMY_RESP
+
+    assert second == EXPECTED
+    assert second[0] is first[0]
+    assert mock_requests.call_args[1]['headers'] == {'If-None-Match': '"v1"'}
+
+
+@patch('requests.Session.get')
+def test_sync_client_stale_while_revalidate(mock_requests):
+    mock_requests.return_value.status_code = 200
+    mock_requests.return_value.headers = {}
+    mock_requests.return_value.json.return_value = DUMMY_RESP
+
+    client = sync_dut.FerienClient(cache=dut.MemoryCache(ttl=10), stale_while_revalidate=True)
+    with patch('ferien.cache._now', return_value=100.0):
+        client.state_vacations('HB')
+    with patch('ferien.sync_.threading.Thread') as mock_thread:
+        assert client.state_vacations('HB') == EXPECTED
+        mock_thread.return_value.start.assert_called_once_with()
+    assert mock_requests.call_count == 1
+
+
+def test_stale_while_revalidate_requires_cache():
+    with pytest.raises(ValueError, match="Argument stale_while_revalidate requires argument cache"):
+        sync_dut.FerienClient(stale_while_revalidate=True)
+
+
+@pytest.mark.asyncio
+async def test_async_client_stale_while_revalidate():
+    url = 'https://ferien-api.de/api/v1/holidays/HB'
+    with aioresponses() as m:
+        m.get(url, payload=DUMMY_RESP, headers={'ETag': '"v1"'})
+        m.get(url, status=304)
+
+        cache = dut.MemoryCache(ttl=10)
+        async with async_dut.AsyncFerienClient(cache=cache, stale_while_revalidate=True) as client:
+            with patch('ferien.cache._now', return_value=100.0):
+                await client.state_vacations('HB')
+            assert not cache.lookup(url).is_fresh()
+            assert await client.state_vacations('HB') == EXPECTED
+            await asyncio.gather(*client._tasks)
+            assert cache.lookup(url).is_fresh()
+
+
+@pytest.mark.asyncio
+async def test_async_client_uses_cache():
+    with aioresponses() as m:
+        m.get('https://ferien-api.de/api/v1/holidays/HB', payload=DUMMY_RESP)
+
+        async with async_dut.AsyncFerienClient(cache=dut.MemoryCache()) as client:
+            assert await client.state_vacations('HB') == EXPECTED
+            assert await client.state_vacations('HB') == EXPECTED
+            assert client.cache.stats == dut.CacheStats(hits=1, misses=1)
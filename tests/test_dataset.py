@@ -0,0 +1,128 @@
+import time
+from datetime import datetime
+
+import pytest
+
+import ferien.sync_ as sync_dut
+from ferien.const import API_DATASET_RETRY_INTERVAL
+from ferien.async_ import AsyncFerienClient
+from ferien.dataset import VacationIndex
+from ferien.fake_server import FakeFerienServer, synthetic_payload
+from ferien.model import Vacation
+from ferien.sync_ import FerienClient
+from ferien.transport import Response
+from ferien.util import find_current, find_next
+
+from stubs import SequenceTransport
+
+VACS = [Vacation.from_dict(item) for item in synthetic_payload(years=[2019, 2020])]
+
+
+def test_index_select():
+    index = VacationIndex(VACS)
+    assert len(index) == len(VACS)
+    assert index.select() == VACS
+    assert index.select('HH') == [vac for vac in VACS if vac.state_code == 'HH']
+    assert index.select(year=2020) == [vac for vac in VACS if vac.year == 2020]
+    assert index.select('BY', 2019) == [
+        vac for vac in VACS if vac.state_code == 'BY' and vac.year == 2019
+    ]
+    assert index.select('BY', 1999) == []
+    index.select('HH').clear()
+    assert len(index.select('HH')) == 12
+
+
+def test_index_calendar():
+    index = VacationIndex(VACS)
+    hh = [vac for vac in VACS if vac.state_code == 'HH']
+    for dt in (datetime(2019, 4, 10), datetime(2019, 9, 1), datetime(2020, 12, 30)):
+        assert index.calendar('HH').find_current(dt) == find_current(hh, dt)
+        assert index.calendar('HH').find_next(dt) == find_next(hh, dt)
+    assert len(index.calendar()) == len(VACS)
+    assert index.bitmap() is index.bitmap()
+    assert sorted(index.bitmap().states_on(datetime(2019, 7, 20))) == sorted(
+        vac.state_code for vac in index.calendar().overlapping(
+            datetime(2019, 7, 20), datetime(2019, 7, 20))
+    )
+
+
+def test_client_serves_from_one_download():
+    with FakeFerienServer() as server:
+        with FerienClient(base_url=server.base_url, dataset_ttl=60) as client:
+            res = client.fetch_states(years=[2019, 2020])
+            assert res.ok
+            assert res.vacations[('HH', 2019)] == client.dataset.select('HH', 2019)
+            assert len(client.all_vacations()) == len(server.payload)
+            dt = datetime(2019, 4, 10)
+            assert client.current_vacation('HH', dt) == find_current(
+                client.state_vacations('HH'), dt
+            )
+            assert client.next_vacation('HH', dt) == find_next(
+                client.state_vacations('HH'), dt
+            )
+            assert server.request_count == 1
+
+            client._dataset_expires = 0.0
+            client.state_vacations('HH')
+            assert server.request_count == 2
+
+
+def test_client_keeps_dataset_on_failed_refresh():
+    transport = SequenceTransport(
+        Response(200, payload=synthetic_payload(years=[2019])), ConnectionError('Boom')
+    )
+    client = FerienClient(transport=transport, dataset_ttl=60)
+    vacs = client.state_vacations('HH', 2019)
+    assert len(vacs) == 6
+
+    client._dataset_expires = 0.0
+    assert client.state_vacations('HH', 2019) == vacs
+    assert transport.calls == 2
+
+
+def test_client_backs_off_during_outage():
+    transport = SequenceTransport(
+        Response(200, payload=synthetic_payload(years=[2019])), ConnectionError('Boom')
+    )
+    client = FerienClient(transport=transport, dataset_ttl=3600)
+    vacs = client.state_vacations('HH', 2019)
+
+    client._dataset_expires = 0.0
+    for _ in range(5):
+        assert client.state_vacations('HH', 2019) == vacs
+    assert transport.calls == 2
+
+    # The delay doubles with every consecutive failure
+    client._dataset_expires = 0.0
+    before = time.time()
+    client.state_vacations('HH', 2019)
+    assert transport.calls == 3
+    assert client._dataset_expires - before >= 2 * API_DATASET_RETRY_INTERVAL
+
+
+def test_client_fails_without_dataset():
+    transport = SequenceTransport(ConnectionError('Boom'))
+    client = FerienClient(transport=transport, dataset_ttl=60)
+    with pytest.raises(ConnectionError):
+        client.state_vacations('HH')
+
+
+def test_module_functions_use_dataset():
+    client = FerienClient(dataset=VacationIndex(VACS))
+    sync_dut.set_default_client(client)
+    try:
+        dt = datetime(2019, 7, 20)
+        assert sync_dut.current_vacation('HH', dt=dt).name == 'sommerferien'
+        assert sync_dut.next_vacation('HH', dt=dt).name == 'herbstferien'
+    finally:
+        sync_dut.set_default_client(None)
+
+
+@pytest.mark.asyncio
+async def test_async_client_serves_from_one_download():
+    with FakeFerienServer() as server:
+        async with AsyncFerienClient(base_url=server.base_url, dataset_ttl=60) as client:
+            res = await client.fetch_states(years=[2019, 2020])
+            assert res.ok and len(res.vacations) == 32
+            assert len([vac async for vac in client.iter_all_vacations()]) == len(server.payload)
+            assert server.request_count == 1
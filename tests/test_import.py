@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import ferien
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = ('aiohttp', 'asyncio', 'attr', 'pytz', 'requests', 'sqlite3', 'zoneinfo')
+
+
+def _run(code, **env):
+    res = subprocess.run(
+        [sys.executable, '-c', code], cwd=ROOT, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        env=dict(os.environ, PYTHONPATH=ROOT, **env), universal_newlines=True
+    )
+    return res.stdout.strip()
+
+
+def _loaded(statement):
+    code = (
+        "import sys\n{}\n"
+        "print(','.join(sorted(m for m in {!r} if m in sys.modules)))"
+    ).format(statement, HEAVY)
+    return _run(code)
+
+
+def test_import_is_lazy():
+    assert _loaded('import ferien') == ''
+
+
+def test_state_codes_is_lazy():
+    assert _loaded('import ferien; ferien.state_codes()') == ''
+
+
+def test_tz_is_created_on_first_use():
+    assert _loaded('import ferien.const') == ''
+    assert _loaded('import ferien.const; ferien.const.TZ_GERMANY') == 'pytz'
+
+
+def test_members():
+    for name in ferien.__all__:
+        assert getattr(ferien, name) is not None
+    assert set(ferien.__all__) <= set(dir(ferien))
+    with pytest.raises(AttributeError):
+        ferien.unknown_member
+
+
+def test_zoneinfo_backend():
+    pytest.importorskip('zoneinfo')
+    code = (
+        "from ferien.model import Vacation\n"
+        "vac = Vacation.from_dict({'start': '2019-03-25', 'end': '2019-03-31', 'year': 2019,"
+        " 'stateCode': 'HH', 'name': 'osterferien', 'slug': 'osterferien-2019-HH'})\n"
+        "print(type(vac.start.tzinfo).__name__, vac.start.isoformat(), vac.end.isoformat())"
+    )
+    assert _run(code, FERIEN_TZ_BACKEND='zoneinfo') == (
+        'ZoneInfo 2019-03-25T00:00:00+01:00 2019-03-31T23:59:59+02:00'
+    )
+
+
+def test_bad_tz_backend():
+    with pytest.raises(subprocess.CalledProcessError):
+        _run("from ferien.tz import germany; germany()", FERIEN_TZ_BACKEND='dateutil')
@@ -0,0 +1,201 @@
+import random
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+import ferien.sync_ as sync_dut
+from ferien.const import ALL_STATE_CODES
+from ferien.index import HolidayBitmap, VacationCalendar
+from ferien.model import FrozenVacation, Vacation
+from ferien.util import find_current, find_next, make_tz_aware_timestamp
+
+from stubs import VACS
+
+
+def _probe_dates():
+    start = datetime(2016, 12, 1)
+    return [start + timedelta(hours=13 * i) for i in range(2600)]
+
+
+def test_calendar_find_current_equals_linear_scan():
+    cal = VacationCalendar(VACS)
+    for dt in _probe_dates():
+        assert cal.find_current(dt) is find_current(VACS, dt)
+
+
+def test_calendar_find_next_equals_linear_scan():
+    cal = VacationCalendar(VACS)
+    for dt in _probe_dates():
+        assert cal.find_next(dt) is find_next(VACS, dt)
+
+
+def test_calendar_for_state():
+    cal = VacationCalendar(VACS)
+    hh = [vac for vac in VACS if vac.state_code == 'HH']
+    assert list(cal.for_state('HH')) == hh
+    assert cal.for_state('HH') is cal.for_state('HH')
+    assert cal.states == sorted({vac.state_code for vac in VACS})
+    for dt in _probe_dates()[::10]:
+        assert cal.for_state('HH').find_current(dt) is find_current(hh, dt)
+        assert cal.for_state('HH').find_next(dt) is find_next(hh, dt)
+
+    with pytest.raises(ValueError):
+        cal.for_state('UKW')
+
+
+def test_calendar_empty():
+    cal = VacationCalendar([])
+    assert len(cal) == 0
+    assert cal.find_current() is None
+    assert cal.find_next() is None
+
+
+def test_calendar_accepts_frozen_vacations():
+    frozen = [vac.freeze() for vac in VACS]
+    cal = VacationCalendar(frozen)
+    bitmap, expected = HolidayBitmap(frozen), HolidayBitmap(VACS)
+    for dt in _probe_dates()[::10]:
+        current = find_current(frozen, dt)
+        assert (current and current.thaw()) == find_current(VACS, dt)
+        assert cal.find_current(dt) is current
+        assert cal.find_next(dt) is find_next(frozen, dt)
+        assert bitmap.states_on(dt) == expected.states_on(dt)
+    assert all(isinstance(vac, FrozenVacation) for vac in cal.for_state('HH'))
+
+
+def test_calendar_bad_arguments():
+    with pytest.raises(TypeError, match="Item 0 of argument 'vacs' is expected to be of type 'Vacation'"):
+        VacationCalendar(["abc"])
+    with pytest.raises(TypeError, match="Argument 'dt' is expected to be of type 'datetime'"):
+        VacationCalendar(VACS).find_current("abc")
+
+
+def test_current_and_next_vacation_accept_calendar():
+    cal = VacationCalendar(VACS)
+    dt = datetime(2018, 3, 1)
+    assert sync_dut.current_vacation(vacs=cal, dt=dt) is find_current(VACS, dt)
+    assert sync_dut.next_vacation(vacs=cal, dt=dt) is find_next(VACS, dt)
+
+
+def _probe_ranges(count=400, seed=7):
+    rnd = random.Random(seed)
+    res = []
+    for _ in range(count):
+        start = datetime(2016, 12, 1) + timedelta(hours=rnd.randint(0, 3 * 365 * 24))
+        res.append((start, start + timedelta(hours=rnd.randint(0, 30 * 24))))
+    return res
+
+
+def _linear(start, end, matches, states=None):
+    start, end = make_tz_aware_timestamp(start), make_tz_aware_timestamp(end)
+    return sorted(
+        (vac for vac in VACS
+         if matches(vac, start, end) and (states is None or vac.state_code in states)),
+        key=lambda vac: vac.start
+    )
+
+
+def test_calendar_range_queries_equal_linear_scan():
+    cal = VacationCalendar(VACS)
+    for start, end in _probe_ranges():
+        assert cal.overlapping(start, end) == _linear(
+            start, end, lambda vac, s, e: vac.start <= e and vac.end >= s)
+        assert cal.covering(start, end) == _linear(
+            start, end, lambda vac, s, e: vac.start <= s and vac.end >= e)
+        assert cal.within(start, end) == _linear(
+            start, end, lambda vac, s, e: vac.start >= s and vac.end <= e)
+        assert cal.overlapping(start, end, states=['HH', 'BY']) == _linear(
+            start, end, lambda vac, s, e: vac.start <= e and vac.end >= s, {'HH', 'BY'})
+
+
+def test_calendar_overlapping_many_and_states_on_holiday():
+    cal = VacationCalendar(VACS)
+    ranges = _probe_ranges(50)
+    assert cal.overlapping_many(ranges, states=('SH',)) == [
+        cal.overlapping(start, end, ['SH']) for start, end in ranges
+    ]
+    for start, end in ranges:
+        assert cal.states_on_holiday(start, end) == sorted(
+            {vac.state_code for vac in cal.overlapping(start, end)}
+        )
+        assert cal.states_on_holiday(start) == sorted(
+            {vac.state_code for vac in cal.overlapping(start, start)}
+        )
+
+
+def test_calendar_range_bad_arguments():
+    cal = VacationCalendar(VACS)
+    with pytest.raises(ValueError, match="Argument start is expected to be before"):
+        cal.overlapping(datetime(2019, 2, 1), datetime(2019, 1, 1))
+    with pytest.raises(ValueError):
+        cal.within(datetime(2019, 1, 1), datetime(2019, 2, 1), states=['UKW'])
+    assert VacationCalendar([]).overlapping(datetime(2019, 1, 1), datetime(2019, 2, 1)) == []
+
+
+def test_bitmap_equals_linear_scan():
+    bitmap = HolidayBitmap(VACS)
+    assert bitmap.first_day == min(vac.start for vac in VACS).date()
+    assert bitmap.last_day == max(vac.end for vac in VACS).date()
+    assert len(bitmap.masks) == len(bitmap) == (bitmap.last_day - bitmap.first_day).days + 1
+    assert bitmap.masks.readonly
+    assert bitmap.masks[0] == bitmap.mask(bitmap.first_day)
+    for dt in _probe_dates()[::3]:
+        states = [code for code in ALL_STATE_CODES
+                  if any(vac.start.date() <= dt.date() <= vac.end.date()
+                         for vac in VACS if vac.state_code == code)]
+        assert bitmap.states_on(dt) == states
+        assert bitmap.states_on(dt.date()) == states
+        assert bitmap.is_holiday(dt, 'HH') == ('HH' in states)
+
+
+def test_bitmap_counts():
+    bitmap = HolidayBitmap(VACS)
+    start, end = date(2016, 12, 25), date(2020, 1, 5)
+    counts = bitmap.counts(start, end)
+    assert len(counts) == (end - start).days + 1
+    assert counts == [len(bitmap.states_on(start + timedelta(days=i))) for i in range(len(counts))]
+    assert counts[:7] == [0] * 7
+    with pytest.raises(ValueError):
+        bitmap.counts(end, start)
+
+
+def test_bitmap_days_and_arguments():
+    vac = Vacation.from_dict({"start": "2019-07-01", "end": "2019-07-02", "year": 2019,
+                              "stateCode": "SH", "name": "sommerferien",
+                              "slug": "sommerferien-2019-SH"})
+    bitmap = HolidayBitmap([vac])
+    assert bitmap.mask(date(2019, 7, 1)) == 1 << ALL_STATE_CODES.index('SH')
+    # 2019-07-02 22:30 UTC is already the 3rd in germany
+    assert bitmap.is_holiday(datetime(2019, 7, 2, 21, 30, tzinfo=timezone.utc), 'SH')
+    assert not bitmap.is_holiday(datetime(2019, 7, 2, 22, 30, tzinfo=timezone.utc), 'SH')
+    assert not bitmap.is_holiday(date(2030, 1, 1), 'SH')
+    with pytest.raises(ValueError):
+        bitmap.is_holiday(date(2019, 7, 1), 'UKW')
+    with pytest.raises(TypeError):
+        bitmap.mask('2019-07-01')
+
+    empty = HolidayBitmap([])
+    assert len(empty) == 0 and empty.first_day is None and empty.last_day is None
+    assert empty.states_on(date(2019, 7, 1)) == []
+
+
+def test_find_accepts_generators_and_sorted_input():
+    ordered = sorted(VACS, key=lambda vac: vac.start)
+    for dt in _probe_dates()[::7]:
+        current, upcoming = find_current(VACS, dt), find_next(VACS, dt)
+        assert find_current((vac for vac in VACS), dt) is current
+        assert find_next((vac for vac in VACS), dt) is upcoming
+        assert find_current(ordered, dt, sorted_by_start=True) is find_current(ordered, dt)
+        assert find_next(iter(ordered), dt, sorted_by_start=True) is find_next(ordered, dt)
+
+
+def test_find_stops_early_on_sorted_input():
+    ordered = sorted(VACS, key=lambda vac: vac.start)
+    dt = datetime(2018, 1, 1)
+    with_garbage = ordered + ["abc"]
+    assert find_next(with_garbage, dt, sorted_by_start=True) is find_next(VACS, dt)
+    assert find_current(with_garbage, dt, sorted_by_start=True) is find_current(ordered, dt)
+    with pytest.raises(TypeError, match="Item {} of argument 'vacs'".format(len(ordered))):
+        find_next(with_garbage, dt)
+    with pytest.raises(TypeError, match="Argument 'vacs' is expected to an iterable"):
+        find_current(42, dt)
@@ -0,0 +1,139 @@
+from unittest.mock import patch
+
+import pytest
+
+from ferien.async_ import AsyncFerienClient
+from ferien.cache import MemoryCache
+from ferien.fake_server import FakeFerienServer, synthetic_payload
+from ferien.instrument import MetricsCollector, Observer, StatsdObserver
+from ferien.resilience import RetryPolicy
+from ferien.sync_ import FerienClient
+from ferien.transport import Response
+
+from stubs import SequenceTransport, StaticTransport
+
+PAYLOAD = synthetic_payload(states=['HH'], years=[2019])
+
+
+class Recorder(Observer):
+    def __init__(self):
+        self.events = []
+
+    def on_request(self, event):
+        self.events.append(event)
+
+    def on_convert(self, event):
+        self.events.append(event)
+
+    def on_cache(self, event):
+        self.events.append(event)
+
+
+def test_request_and_convert_events():
+    client = FerienClient(transport=StaticTransport(PAYLOAD))
+    recorder = Recorder()
+    client.add_observer(recorder)
+    client.state_vacations('HH', 2019)
+
+    request, convert = recorder.events
+    assert request.url == 'https://ferien-api.de/api/v1/holidays/HH/2019'
+    assert (request.status, request.size, request.decode_time) == (200, 1234, 0.5)
+    assert request.error is None
+    assert request.network_time == 0.0
+    assert convert.items == 6
+    assert convert.duration >= 0.0
+
+
+def test_error_events():
+    client = FerienClient(transport=StaticTransport(PAYLOAD))
+    recorder = Recorder()
+    client.add_observer(recorder)
+    with pytest.raises(ConnectionError):
+        client.state_vacations('BY')
+    with pytest.raises(RuntimeError):
+        client.state_vacations('SH')
+
+    failed, bad_status = recorder.events
+    assert failed.status == 0 and isinstance(failed.error, ConnectionError)
+    assert bad_status.status == 500 and bad_status.error is None
+
+
+def test_cache_events():
+    client = FerienClient(transport=StaticTransport(PAYLOAD), cache=MemoryCache())
+    metrics = MetricsCollector()
+    client.add_observer(metrics)
+    client.state_vacations('HH')
+    client.state_vacations('HH')
+
+    res = metrics.snapshot()
+    assert res['cache_lookups_total{outcome="miss"}'] == 1
+    assert res['cache_lookups_total{outcome="hit"}'] == 1
+    assert res['requests_total{status="200"}'] == 1
+    assert res['converted_items_total'] == 6
+    assert 'ferien_requests_total{status="200"} 1\n' in metrics.to_prometheus()
+    assert 'ferien.requests_total.200:1|g' in metrics.to_statsd()
+
+    metrics.reset()
+    assert metrics.snapshot() == {}
+
+
+def test_remove_observer():
+    client = FerienClient(transport=StaticTransport(PAYLOAD))
+    recorder = Recorder()
+    client.add_observer(recorder)
+    client.remove_observer(recorder)
+    client.state_vacations('HH')
+    assert recorder.events == []
+
+
+def test_no_measurement_without_observers():
+    client = FerienClient(transport=StaticTransport(PAYLOAD))
+    with patch('ferien.base.time.perf_counter') as mock_clock:
+        client.state_vacations('HH')
+    mock_clock.assert_not_called()
+
+
+def test_statsd_observer():
+    lines = []
+    client = FerienClient(transport=StaticTransport(PAYLOAD))
+    client.add_observer(StatsdObserver(lines.append, prefix='app'))
+    client.state_vacations('HH')
+    assert 'app.requests.200:1|c' in lines
+    assert 'app.request.bytes:1234|c' in lines
+    assert 'app.convert.items:6|c' in lines
+
+
+def test_metrics_count_retries():
+    transport = SequenceTransport(
+        Response(500, text='Boom'), Response(500, text='Boom'),
+        Response(500, text='Boom'), Response(200, payload=PAYLOAD)
+    )
+    client = FerienClient(
+        transport=transport, retry=RetryPolicy(retries=3, backoff=0, jitter=False)
+    )
+    metrics = MetricsCollector()
+    lines = []
+    client.add_observer(metrics)
+    client.add_observer(StatsdObserver(lines.append))
+    client.state_vacations('HH')
+
+    counters = metrics.snapshot()
+    assert counters['requests_total{status="500"}'] == 3
+    assert counters['requests_total{status="200"}'] == 1
+    assert counters['request_retries_total'] == 3
+    assert lines.count('ferien.request.retries:1|c') == 3
+
+
+@pytest.mark.asyncio
+async def test_async_events():
+    with FakeFerienServer() as server:
+        async with AsyncFerienClient(base_url=server.base_url) as client:
+            recorder = Recorder()
+            client.add_observer(recorder)
+            await client.state_vacations('HH', 2019)
+
+    request, convert = recorder.events
+    assert request.status == 200
+    assert request.size > 0
+    assert request.duration >= request.decode_time > 0.0
+    assert convert.items == 6
@@ -0,0 +1,93 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from ferien.const import TZ_GERMANY
+from ferien.model import FrozenVacation, Vacation, VacationTable
+
+
+def _reference_from_dict(dct):
+    # The former (slow) implementation using strptime and validators
+    def _parse_date(candidate):
+        return TZ_GERMANY.localize(datetime.strptime(candidate, '%Y-%m-%d'))
+
+    return Vacation(
+        start=_parse_date(dct['start']),
+        end=_parse_date(dct['end']).replace(hour=23, minute=59, second=59),
+        year=dct['year'],
+        state_code=dct['stateCode'],
+        name=dct.get('name', 'none'),
+        slug=dct.get('slug', 'none')
+    )
+
+
+def _items():
+    day = date(2016, 1, 1)
+    for i in range(4 * 366):
+        start = day + timedelta(days=i)
+        yield {
+            "start": start.isoformat(),
+            "end": (start + timedelta(days=i % 17)).isoformat(),
+            "year": start.year,
+            "stateCode": "HH",
+            "name": "ferien",
+            "slug": "ferien-{}-HH".format(start.year)
+        }
+
+
+def test_from_dict_equals_reference():
+    for item in _items():
+        fast, ref = Vacation.from_dict(item), _reference_from_dict(item)
+        assert fast == ref
+        assert fast.start.utcoffset() == ref.start.utcoffset()
+        assert fast.end.utcoffset() == ref.end.utcoffset()
+
+
+def test_from_dict_converts_untrusted_values():
+    item = {
+        "start": "2017-01-29", "end": "2017-01-31", "year": "2017",
+        "stateCode": "HB"
+    }
+    res = Vacation.from_dict(item)
+    assert res == _reference_from_dict(item)
+    assert res.year == 2017
+    assert res.name == 'none'
+
+
+@pytest.mark.parametrize('candidate', ['2017-13-01', '2017-1-011', '29.01.2017', ''])
+def test_from_dict_bad_date(candidate):
+    item = {"start": candidate, "end": "2017-01-31", "year": 2017, "stateCode": "HB"}
+    with pytest.raises(ValueError):
+        Vacation.from_dict(item)
+
+
+def test_frozen_vacation():
+    items = list(_items())
+    vacs = [Vacation.from_dict(item) for item in items]
+    frozen = [FrozenVacation.from_dict(item) for item in items]
+
+    assert [vac.freeze() for vac in vacs] == frozen
+    assert [vac.thaw() for vac in frozen] == vacs
+    assert len(set(frozen)) == len(frozen)
+    assert not hasattr(frozen[0], '__dict__')
+    assert frozen[0].state_code is frozen[1].state_code
+    with pytest.raises(AttributeError):
+        frozen[0].year = 2020
+
+
+def test_vacation_table():
+    vacs = [Vacation.from_dict(item) for item in _items()]
+    table = VacationTable(vacs)
+    assert len(table) == len(vacs)
+    assert list(table) == vacs
+    assert table[3] == vacs[3]
+    assert table.name_table == ['ferien']
+    assert VacationTable(vac.freeze() for vac in vacs)[5] == vacs[5]
+
+
+def test_vacation_table_rejects_unsupported_vacations():
+    vac = Vacation.from_dict(next(_items()))
+    with pytest.raises(ValueError, match="does not start at midnight"):
+        VacationTable([Vacation(vac.start.replace(hour=1), vac.end, vac.year, vac.state_code, vac.name, vac.slug)])
+    with pytest.raises(ValueError, match="has an unknown state code 'XX'"):
+        VacationTable([Vacation(vac.start, vac.end, vac.year, 'XX', vac.name, vac.slug)])
@@ -0,0 +1,129 @@
+import gzip
+import json
+
+import pytest
+import requests
+
+from ferien.__main__ import main
+from ferien.async_ import AsyncFerienClient
+from ferien.fake_server import FakeFerienServer, synthetic_payload
+from ferien.model import Vacation
+from ferien.proxy import CachingProxy, to_api_item
+from ferien.sync_ import FerienClient
+
+from stubs import PayloadTransport
+
+PAYLOAD = synthetic_payload(years=[2019, 2020])
+
+
+@pytest.fixture
+def upstream():
+    with FakeFerienServer(payload=PAYLOAD) as server:
+        yield server
+
+
+@pytest.fixture
+def proxy(upstream):
+    with CachingProxy(FerienClient(base_url=upstream.base_url), port=0) as proxy:
+        assert proxy.wait_ready(5)
+        yield proxy
+
+
+def test_to_api_item():
+    assert [to_api_item(Vacation.from_dict(item)) for item in PAYLOAD] == PAYLOAD
+
+
+def test_clients_against_proxy(upstream, proxy):
+    with FerienClient(base_url=proxy.base_url) as client:
+        assert client.all_vacations() == [Vacation.from_dict(item) for item in PAYLOAD]
+        res = client.fetch_states(years=[2019, 2020])
+        assert res.ok and len(res.vacations) == 32
+        assert len(client.state_vacations('HH')) == 12
+        assert client.state_vacations('HH', 2031) == []
+    assert upstream.request_count == 1
+
+
+@pytest.mark.asyncio
+async def test_async_client_against_proxy(upstream, proxy):
+    async with AsyncFerienClient(base_url=proxy.base_url) as client:
+        assert len(await client.state_vacations('BY', 2019)) == 6
+    assert upstream.request_count == 1
+
+
+def test_gzip_and_etag(proxy):
+    url = proxy.base_url + '/HH/2019'
+    plain = requests.get(url, headers={'Accept-Encoding': 'identity'})
+    assert plain.status_code == 200 and 'Content-Encoding' not in plain.headers
+    assert len(plain.json()) == 6
+
+    zipped = requests.get(url, headers={'Accept-Encoding': 'gzip'}, stream=True)
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(zipped.raw.read())) == plain.json()
+    etag = zipped.headers['ETag']
+    assert etag == plain.headers['ETag'] and etag.startswith('W/"')
+
+    for tag in (etag, etag[2:], '"other", ' + etag, '*'):
+        res = requests.get(url, headers={'If-None-Match': tag})
+        assert res.status_code == 304 and res.content == b''
+    assert requests.get(url, headers={'If-None-Match': '"other"'}).status_code == 200
+    head = requests.head(url, headers={'Accept-Encoding': 'identity'})
+    assert head.headers['Content-Length'] == plain.headers['Content-Length']
+
+
+def test_unknown_paths(proxy):
+    for path in ('/XX', '/HH/abc', '/HH/2019/1', '/../../foo'):
+        assert requests.get(proxy.base_url + path).status_code == 404
+    assert requests.get(proxy.base_url + '/HH/').status_code == 200
+
+
+def test_refresh_swaps_bodies():
+    transport = PayloadTransport(None)
+    with CachingProxy(FerienClient(transport=transport), port=0) as proxy:
+        res = requests.get(proxy.base_url)
+        assert res.status_code == 503 and res.headers['Retry-After'] == '5'
+
+        transport.payload = PAYLOAD
+        proxy.refresher.refresh()
+        first = requests.get(proxy.base_url)
+        assert len(first.json()) == len(PAYLOAD)
+
+        # Unchanged data keeps the ETag
+        proxy.refresher.refresh()
+        assert requests.get(proxy.base_url).headers['ETag'] == first.headers['ETag']
+
+        transport.payload = PAYLOAD[1:]
+        proxy.refresher.refresh()
+        second = requests.get(proxy.base_url)
+        assert len(second.json()) == len(PAYLOAD) - 1
+        assert second.headers['ETag'] != first.headers['ETag']
+        # Upstream failures keep serving the last data
+        transport.payload = None
+        with pytest.raises(ConnectionError):
+            proxy.refresher.refresh()
+        assert requests.get(proxy.base_url).status_code == 200
+
+
+def test_empty_first_download():
+    transport = PayloadTransport([])
+    with CachingProxy(FerienClient(transport=transport), port=0) as proxy:
+        assert proxy.wait_ready(5)
+        res = requests.get(proxy.base_url)
+        assert res.status_code == 200 and res.json() == []
+        assert requests.get(proxy.base_url + '/HH/2019').json() == []
+
+
+def test_cli_help(capsys):
+    with pytest.raises(SystemExit):
+        main(['serve', '--help'])
+    assert '--upstream' in capsys.readouterr().out
+
+
+def test_server_errors_are_logged(proxy, caplog, capsys):
+    httpd = proxy._httpd
+    for error in (BrokenPipeError(), ConnectionResetError(), ValueError('Boom')):
+        try:
+            raise error
+        except Exception:
+            httpd.handle_error(None, ('127.0.0.1', 1234))
+    assert [record.exc_info[0] for record in caplog.records] == [ValueError]
+    assert capsys.readouterr().err == ''
@@ -0,0 +1,136 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from ferien.async_ import AsyncFerienClient
+from ferien.fake_server import FakeFerienServer, synthetic_payload
+from ferien.model import Vacation
+from ferien.refresh import (
+    AsyncBackgroundRefresher, BackgroundRefresher, diff_datasets
+)
+from ferien.sync_ import FerienClient
+
+from stubs import AsyncPayloadTransport, PayloadTransport
+
+PAYLOAD = synthetic_payload(years=[2019])
+
+VACS = [Vacation.from_dict(item) for item in PAYLOAD]
+
+
+def test_diff_datasets():
+    moved = Vacation(VACS[1].start, datetime(2019, 12, 31, 23, 59, 59),
+                     VACS[1].year, VACS[1].state_code, VACS[1].name,
+                     VACS[1].slug)
+    new = [VACS[0], moved] + VACS[3:]
+    diff = diff_datasets(VACS[:-1], new)
+    assert diff.added == [VACS[-1]]
+    assert diff.removed == [VACS[2]]
+    assert diff.changed == [(VACS[1], moved)]
+    assert diff
+
+    assert not diff_datasets(VACS, list(reversed(VACS)))
+
+
+def test_refresher_swaps_and_notifies():
+    with FakeFerienServer(payload=PAYLOAD) as server:
+        client = FerienClient(base_url=server.base_url)
+        diffs = []
+        with BackgroundRefresher(client, interval=60) as refresher:
+            refresher.subscribe(lambda index, diff: diffs.append(diff))
+            assert refresher.wait_ready(5)
+            assert len(client.state_vacations('HH', 2019)) == 6
+            assert len(client.all_vacations()) == len(PAYLOAD)
+            assert server.request_count == 1
+    assert len(diffs) == 1 and len(diffs[0].added) == len(VACS)
+
+
+def test_refresher_diff():
+    transport = PayloadTransport(PAYLOAD)
+    client = FerienClient(transport=transport)
+    refresher = BackgroundRefresher(client, interval=60)
+    diffs = []
+    refresher.subscribe(lambda index, diff: diffs.append((index, diff)))
+    refresher.refresh()
+
+    transport.payload = PAYLOAD[:-1]
+    diff = refresher.refresh()
+    assert diff.removed == [VACS[-1]] and not diff.added
+    assert len(client.all_vacations()) == len(VACS) - 1
+    assert diffs[-1] == (client.dataset, diff)
+
+    # Nothing changed: Subscribers are not notified
+    assert not refresher.refresh()
+    assert len(diffs) == 2
+
+
+def test_refresher_notifies_on_first_refresh():
+    transport = PayloadTransport(PAYLOAD)
+    client = FerienClient(transport=transport)
+    client.load_dataset()
+    refresher = BackgroundRefresher(client, interval=60)
+    diffs = []
+    refresher.subscribe(lambda index, diff: diffs.append(diff))
+    # Unchanged, but the subscribers have not seen a dataset yet
+    assert not refresher.refresh()
+    assert not refresher.refresh()
+    assert len(diffs) == 1 and not diffs[0]
+
+
+def test_refresher_keeps_dataset_on_error():
+    transport = PayloadTransport(PAYLOAD)
+    client = FerienClient(transport=transport)
+    index = client.load_dataset()
+    transport.payload = None
+    refresher = BackgroundRefresher(client, interval=60)
+    refresher.subscribe(lambda index, diff: 1 / 0)
+    refresher.start()
+    try:
+        assert not refresher.wait_ready(0.2)
+        assert transport.calls == 2
+        assert client.dataset is index
+    finally:
+        refresher.stop()
+
+    # Failing subscribers do not break the refresh
+    transport.payload = PAYLOAD[1:]
+    assert refresher.refresh().removed == [VACS[0]]
+
+
+def test_refresher_invalid_interval():
+    with pytest.raises(ValueError):
+        BackgroundRefresher(FerienClient(), interval=0)
+
+
+@pytest.mark.asyncio
+async def test_async_refresher():
+    transport = AsyncPayloadTransport(PAYLOAD)
+    client = AsyncFerienClient(transport=transport)
+    diffs = []
+    async with AsyncBackgroundRefresher(client, interval=60) as refresher:
+        refresher.subscribe(lambda index, diff: diffs.append(diff))
+        await asyncio.wait_for(refresher.wait_ready(), 5)
+        assert len(await client.state_vacations('HH', 2019)) == 6
+        transport.payload = PAYLOAD[1:]
+        diff = await refresher.refresh()
+        assert diff.removed == [VACS[0]]
+    assert refresher._task is None
+    assert len(diffs[0].added) == len(VACS)
+    assert diffs[-1] is diff
+
+
+def test_async_refresher_created_outside_the_loop():
+    refresher = AsyncBackgroundRefresher(
+        AsyncFerienClient(transport=AsyncPayloadTransport(PAYLOAD)), interval=60
+    )
+
+    async def _run():
+        async with refresher:
+            await asyncio.wait_for(refresher.wait_ready(), 5)
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(_run())
+    finally:
+        loop.close()
+    assert refresher.ready.is_set()
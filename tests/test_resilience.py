@@ -0,0 +1,247 @@
+import time
+from email.utils import formatdate
+
+import pytest
+
+from ferien.async_ import AsyncFerienClient
+from ferien.base import api_error
+from ferien.cache import MemoryCache
+from ferien.errors import (
+    ApiError, CircuitOpenError, RateLimitedError, RequestTimeoutError,
+    ServerError
+)
+from ferien.fake_server import FakeFerienServer, synthetic_payload
+from ferien.instrument import Observer
+from ferien.resilience import (
+    STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, CircuitBreaker, RetryPolicy,
+    parse_retry_after
+)
+from ferien.sync_ import FerienClient
+from ferien.transport import AiohttpTransport, RequestsTransport, Response
+
+from stubs import AsyncSequenceTransport, SequenceTransport
+
+PAYLOAD = synthetic_payload(states=['HH'], years=[2019])
+
+NO_WAIT = RetryPolicy(retries=2, backoff=0, jitter=False)
+
+
+class Recorder(Observer):
+    def __init__(self):
+        self.events = []
+
+    def on_request(self, event):
+        self.events.append(event)
+
+
+OK = Response(200, payload=PAYLOAD)
+FAILED = Response(503, text='Down')
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('120') == 120.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    assert 50 < parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+    assert parse_retry_after(formatdate(time.time() - 60, usegmt=True)) == 0.0
+
+
+def test_api_error_types():
+    rate_limited = api_error(429, 'Slow down', {'Retry-After': '3'})
+    assert isinstance(rate_limited, RateLimitedError)
+    assert rate_limited.retry_after == 3.0
+    assert isinstance(api_error(502, 'Bad gateway'), ServerError)
+    not_found = api_error(404, 'Not found')
+    assert type(not_found) is ApiError
+    assert isinstance(not_found, RuntimeError)
+    assert (not_found.status, not_found.text) == (404, 'Not found')
+
+
+def test_retry_policy():
+    policy = RetryPolicy(retries=3, backoff=1, max_backoff=3, jitter=False)
+    error = ServerError(503, 'Down')
+    assert [policy.retry_in(attempt, error) for attempt in range(4)] == [1, 2, 3, None]
+    assert policy.retry_in(0, ApiError(404, 'Not found')) is None
+    assert policy.retry_in(0, ConnectionError()) is None
+    assert policy.retry_in(0, RequestTimeoutError()) == 1
+    assert policy.retry_in(0, RateLimitedError(429, '', retry_after=2.5)) == 2.5
+    assert policy.retry_in(0, RateLimitedError(429, '', retry_after=60)) is None
+
+    jittered = RetryPolicy(backoff=1)
+    assert all(0 <= jittered.retry_in(2, error) <= 4 for _ in range(20))
+
+
+def test_retries():
+    transport = SequenceTransport(
+        FAILED, Response(429, {'Retry-After': '0'}, text='Slow down'), OK
+    )
+    client = FerienClient(transport=transport, retry=NO_WAIT)
+    recorder = Recorder()
+    client.add_observer(recorder)
+    assert len(client.state_vacations('HH')) == 6
+    assert transport.calls == 3
+    assert [(event.status, event.attempt, event.retries) for event in recorder.events] == [
+        (503, 0, 0), (429, 1, 1), (200, 2, 1)
+    ]
+
+
+def test_retries_exhausted():
+    transport = SequenceTransport(FAILED)
+    client = FerienClient(transport=transport, retry=NO_WAIT)
+    with pytest.raises(ServerError, match="http code = '503'"):
+        client.state_vacations('HH')
+    assert transport.calls == 3
+
+    # Client errors are not retried
+    transport = SequenceTransport(Response(404, text='Not found'))
+    client = FerienClient(transport=transport, retry=NO_WAIT)
+    with pytest.raises(ApiError):
+        client.state_vacations('HH')
+    assert transport.calls == 1
+
+
+def test_circuit_breaker_states():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == STATE_CLOSED
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    time.sleep(0.06)
+    assert breaker.state == STATE_HALF_OPEN
+    breaker.before_request()
+    with pytest.raises(CircuitOpenError):
+        # Only a single trial request
+        breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+
+    time.sleep(0.06)
+    breaker.before_request()
+    breaker.record_success()
+    assert breaker.state == STATE_CLOSED
+
+    with pytest.raises(ValueError):
+        CircuitBreaker(failure_threshold=0)
+
+
+def test_circuit_breaker_fails_fast():
+    transport = SequenceTransport(FAILED, FAILED, OK)
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    client = FerienClient(transport=transport, circuit_breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(ServerError):
+            client.state_vacations('HH')
+    with pytest.raises(CircuitOpenError):
+        client.state_vacations('HH')
+    assert transport.calls == 2
+
+    time.sleep(0.06)
+    assert len(client.state_vacations('HH')) == 6
+    assert breaker.state == STATE_CLOSED
+
+
+def test_interrupted_trial_request_is_released():
+    transport = SequenceTransport(FAILED, KeyboardInterrupt(), OK)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    client = FerienClient(transport=transport, circuit_breaker=breaker)
+    with pytest.raises(ServerError):
+        client.state_vacations('HH')
+    time.sleep(0.02)
+    # Neither retried nor counted as a failure, but the trial is released
+    with pytest.raises(KeyboardInterrupt):
+        client.state_vacations('HH')
+    assert breaker.state == STATE_HALF_OPEN
+    assert len(client.state_vacations('HH')) == 6
+    assert transport.calls == 3
+
+
+def test_circuit_breaker_falls_back_to_cache():
+    transport = SequenceTransport(OK, FAILED)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    client = FerienClient(transport=transport, circuit_breaker=breaker,
+                          cache=MemoryCache(ttl=0.01))
+    vacs = client.state_vacations('HH')
+    time.sleep(0.02)
+    with pytest.raises(ServerError):
+        client.state_vacations('HH')
+    assert breaker.state == STATE_OPEN
+    assert client.state_vacations('HH') == vacs
+    assert transport.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_async_retries_and_breaker():
+    transport = AsyncSequenceTransport(FAILED, FAILED, FAILED, OK)
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    client = AsyncFerienClient(transport=transport, retry=NO_WAIT,
+                               circuit_breaker=breaker)
+    with pytest.raises(ServerError):
+        await client.state_vacations('HH')
+    with pytest.raises(CircuitOpenError):
+        await client.state_vacations('HH')
+    assert transport.sync.calls == 3
+
+
+def test_stream_retries_and_breaker():
+    transport = SequenceTransport(FAILED, OK)
+    client = FerienClient(transport=transport, retry=NO_WAIT)
+    recorder = Recorder()
+    client.add_observer(recorder)
+    assert len(list(client.iter_all_vacations())) == 6
+    assert [(event.status, event.attempt) for event in recorder.events] == [
+        (503, 0), (200, 1)
+    ]
+
+    transport = SequenceTransport(FAILED)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    client = FerienClient(transport=transport, circuit_breaker=breaker)
+    with pytest.raises(ServerError):
+        list(client.iter_all_vacations())
+    with pytest.raises(CircuitOpenError):
+        list(client.iter_all_vacations())
+    assert transport.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_async_stream_retries_and_breaker():
+    transport = AsyncSequenceTransport(FAILED, OK)
+    client = AsyncFerienClient(transport=transport, retry=NO_WAIT)
+    assert len([vac async for vac in client.iter_all_vacations()]) == 6
+    assert transport.sync.calls == 2
+
+    transport = AsyncSequenceTransport(FAILED)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    client = AsyncFerienClient(transport=transport, circuit_breaker=breaker)
+    with pytest.raises(ServerError):
+        [vac async for vac in client.iter_all_vacations()]
+    with pytest.raises(CircuitOpenError):
+        [vac async for vac in client.iter_all_vacations()]
+    assert transport.sync.calls == 1
+
+
+def test_requests_timeout():
+    with FakeFerienServer(latency=0.5) as server:
+        transport = RequestsTransport(timeout=0.1)
+        with pytest.raises(RequestTimeoutError):
+            transport.request(server.base_url, {})
+        with pytest.raises(RequestTimeoutError):
+            with transport.stream(server.base_url):
+                pass
+        transport.close()
+
+
+@pytest.mark.asyncio
+async def test_aiohttp_timeout():
+    with FakeFerienServer(latency=0.5) as server:
+        transport = AiohttpTransport(timeout=0.1)
+        with pytest.raises(RequestTimeoutError):
+            await transport.request(server.base_url, {})
+        with pytest.raises(RequestTimeoutError):
+            async with transport.stream(server.base_url):
+                pass
+        await transport.close()
+        assert AsyncFerienClient().transport.connect_timeout == 5
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from aioresponses import aioresponses
+
+import ferien.async_ as async_dut
+from ferien.async_ import AsyncFerienClient
+from ferien.fake_server import FakeFerienServer
+from ferien.singleflight import AsyncSingleFlight, SingleFlight
+from ferien.sync_ import FerienClient
+
+DUMMY_RESP = [
+    {
+      "start": "2017-01-29",
+      "end": "2017-01-31",
+      "year": 2017,
+      "stateCode": "BY",
+      "name": "winterferien",
+      "slug": "winterferien-2017-BY"
+    }
+]
+
+
+def test_single_flight_shares_result():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def _slow():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return 42
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        leader = executor.submit(flights.do, 'key', _slow)
+        started.wait()
+        followers = [executor.submit(flights.do, 'key', _slow) for _ in range(3)]
+        time.sleep(0.1)  # let the followers block on the running call
+        release.set()
+        assert [f.result() for f in [leader] + followers] == [42] * 4
+    assert len(calls) == 1
+    assert len(flights) == 0
+
+
+def test_single_flight_shares_error():
+    flights = SingleFlight()
+
+    def _fail():
+        raise ValueError('Boom')
+
+    with pytest.raises(ValueError):
+        flights.do('key', _fail)
+    assert flights.do('key', lambda: 1) == 1
+
+
+def test_sync_client_coalesces_requests():
+    with FakeFerienServer(latency=0.2) as server:
+        with FerienClient(base_url=server.base_url) as client:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                res = list(executor.map(lambda _: client.state_vacations('BY', 2019), range(8)))
+        assert server.request_count == 1
+    assert all(vacs == res[0] for vacs in res)
+    assert len({id(vacs) for vacs in res}) == 8
+
+
+@pytest.mark.asyncio
+async def test_async_single_flight_survives_cancelled_caller():
+    flights = AsyncSingleFlight()
+    calls = []
+
+    async def _slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 42
+
+    first = asyncio.ensure_future(flights.do('key', _slow))
+    second = asyncio.ensure_future(flights.do('key', _slow))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == 42
+    assert len(calls) == 1
+    assert len(flights) == 0
+
+
+@pytest.mark.asyncio
+async def test_async_client_coalesces_requests():
+    with FakeFerienServer(latency=0.1) as server:
+        async with AsyncFerienClient(base_url=server.base_url) as client:
+            res = await asyncio.gather(*(client.state_vacations('BY', 2019) for _ in range(20)))
+        assert server.request_count == 1
+    assert all(vacs == res[0] for vacs in res)
+
+
+@pytest.mark.asyncio
+async def test_module_functions_coalesce_requests():
+    url = 'https://ferien-api.de/api/v1/holidays/BY'
+    with aioresponses() as m:
+        m.get(url, payload=DUMMY_RESP, repeat=True)
+        res = await asyncio.gather(*(async_dut.state_vacations_async('BY') for _ in range(20)))
+        assert sum(len(calls) for calls in m.requests.values()) == 1
+    assert all(len(vacs) == 1 for vacs in res)
+
+
+@pytest.mark.asyncio
+async def test_module_functions_share_errors():
+    url = 'https://ferien-api.de/api/v1/holidays/BY'
+    with aioresponses() as m:
+        m.get(url, status=500, repeat=True)
+        res = await asyncio.gather(
+            *(async_dut.state_vacations_async('BY') for _ in range(5)), return_exceptions=True
+        )
+        assert sum(len(calls) for calls in m.requests.values()) == 1
+    assert all(isinstance(ex, RuntimeError) for ex in res)
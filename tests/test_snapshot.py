@@ -0,0 +1,107 @@
+from unittest.mock import patch
+
+import pytest
+
+import ferien.async_ as async_dut
+import ferien.sync_ as sync_dut
+from ferien.model import Vacation
+from ferien.snapshot import dump_snapshot, load_snapshot
+
+DUMMY_RESP = [
+    {
+      "start": "2017-01-29",
+      "end": "2017-01-31",
+      "year": 2017,
+      "stateCode": "HB",
+      "name": "winterferien",
+      "slug": "winterferien-2017-HB"
+    },
+    {
+      "start": "2017-04-09",
+      "end": "2017-04-22",
+      "year": 2017,
+      "stateCode": "HB",
+      "name": "osterferien",
+      "slug": "osterferien-2017-HB"
+    },
+    {
+      "start": "2018-03-01",
+      "end": "2018-03-16",
+      "year": 2018,
+      "stateCode": "HH",
+      "name": "osterferien",
+      "slug": "osterferien-2018-HH"
+    }
+]
+
+
+VACS = [Vacation.from_dict(entry) for entry in DUMMY_RESP]
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = str(tmp_path / 'vacations.snap')
+    dump_snapshot(VACS, path)
+    return path
+
+
+@pytest.mark.parametrize('use_mmap', [False, True])
+def test_roundtrip(snapshot, use_mmap):
+    table = load_snapshot(snapshot, use_mmap=use_mmap)
+    assert len(table) == 3
+    assert list(table) == VACS
+    assert table.select('HB', 2017) == VACS[:2]
+    assert table.select(year=2018) == VACS[2:]
+
+
+def test_roundtrip_empty(tmp_path):
+    path = str(tmp_path / 'empty.snap')
+    dump_snapshot([], path)
+    assert list(load_snapshot(path)) == []
+
+
+def test_load_bad_magic(tmp_path):
+    path = tmp_path / 'bad.snap'
+    path.write_bytes(b'NOPE' + b'\0' * 32)
+    with pytest.raises(ValueError, match="not a ferien-api snapshot"):
+        load_snapshot(str(path))
+
+
+def test_load_bad_version(snapshot):
+    with open(snapshot, 'r+b') as fp:
+        fp.seek(4)
+        fp.write(b'\xff\x00')
+    with pytest.raises(ValueError, match="Unsupported snapshot version"):
+        load_snapshot(snapshot)
+
+
+def test_load_truncated(snapshot):
+    with open(snapshot, 'r+b') as fp:
+        fp.truncate(40)
+    with pytest.raises(ValueError, match="truncated"):
+        load_snapshot(snapshot)
+
+
+def test_dump_rejects_nul(tmp_path):
+    vac = Vacation.from_dict(dict(DUMMY_RESP[0], name='winter\0ferien'))
+    with pytest.raises(ValueError, match="NUL"):
+        dump_snapshot([vac], str(tmp_path / 'nul.snap'))
+
+
+@patch('requests.Session.get')
+def test_sync_client_serves_dataset(mock_requests, snapshot):
+    client = sync_dut.FerienClient(dataset=load_snapshot(snapshot))
+    assert client.state_vacations('HB', 2017) == VACS[:2]
+    assert client.all_vacations() == VACS
+    assert list(client.iter_all_vacations()) == VACS
+    mock_requests.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_async_client_serves_dataset(snapshot):
+    client = async_dut.AsyncFerienClient(dataset=load_snapshot(snapshot))
+    try:
+        assert await client.state_vacations('HH') == VACS[2:]
+        assert [vac async for vac in client.iter_all_vacations()] == VACS
+    finally:
+        await client.close()
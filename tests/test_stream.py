@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from ferien.stream import JsonArrayDecoder
+
+ITEMS = [
+    {"name": "winter{ferien}", "slug": "a\"]b", "nested": {"list": [1, {"x": "]"}]}},
+    {"name": "hörbst\\", "slug": "€"},
+    {}
+]
+
+
+def _decode(chunks):
+    decoder = JsonArrayDecoder()
+    res = []
+    for chunk in chunks:
+        res.extend(decoder.feed(chunk))
+    res.extend(decoder.close())
+    return res
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 1024])
+def test_decoder_chunked(chunk_size):
+    payload = json.dumps(ITEMS, ensure_ascii=False).encode('utf-8')
+    chunks = [payload[i:i + chunk_size] for i in range(0, len(payload), chunk_size)]
+    assert _decode(chunks) == ITEMS
+
+
+def test_decoder_yields_items_early():
+    decoder = JsonArrayDecoder()
+    assert decoder.feed(b' [ {"a": 1}, {"b"') == [{"a": 1}]
+    assert decoder.feed(b': 2} ]') == [{"b": 2}]
+    assert decoder.close() == []
+
+
+def test_decoder_empty_array():
+    assert _decode([b'[]']) == []
+
+
+def test_decoder_errors():
+    with pytest.raises(ValueError, match="Response is expected to be a json array"):
+        _decode([b'{"error": 1}'])
+    with pytest.raises(ValueError, match="Response is not a complete json array"):
+        _decode([b'[{"a": 1}'])
@@ -1,5 +1,6 @@
+import json
 from datetime import datetime
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 import pytest
 
@@ -41,7 +42,7 @@ def test_state_codes():
     assert dut.state_codes() == ALL_STATE_CODES
 
 
-@patch('requests.get')
+@patch('requests.Session.get')
 def test_get_all_vacations(mock_requests):
     _configure_mock(mock_requests)
 
@@ -49,7 +50,7 @@ def test_get_all_vacations(mock_requests):
     assert res == EXPECTED
 
 
-@patch('requests.get')
+@patch('requests.Session.get')
 def test_get_all_vacations_bad_status_code(mock_requests):
     _configure_mock(mock_requests, 500, response="Not a teapot")
 
@@ -57,7 +58,7 @@ def test_get_all_vacations_bad_status_code(mock_requests):
         dut.all_vacations()
 
 
-@patch('requests.get')
+@patch('requests.Session.get')
 def test_get_state_vacations_by_state(mock_requests):
     _configure_mock(mock_requests)
 
@@ -65,7 +66,7 @@ def test_get_state_vacations_by_state(mock_requests):
     assert res == EXPECTED
 
 
-@patch('requests.get')
+@patch('requests.Session.get')
 def test_get_state_vacations_by_state_year(mock_requests):
     _configure_mock(mock_requests)
 
@@ -83,7 +84,7 @@ def test_get_state_vacations_with_bad_year():
         dut.state_vacations('HH', 'abc')
 
 
-@patch('requests.get')
+@patch('requests.Session.get')
 def test_current_vacation(mock_requests):
     _configure_mock(mock_requests)
 
@@ -107,7 +108,7 @@ def test_current_vacation_arguments_fail():
         dut.current_vacation()
 
 
-@patch('requests.get')
+@patch('requests.Session.get')
 def test_next_vacation(mock_requests):
     _configure_mock(mock_requests)
 
@@ -138,3 +139,75 @@ def test_next_vacation_arguments_fail():
 
     with pytest.raises(TypeError, match="Argument 'dt' is expected to be of type 'datetime', but is <class 'str'>") as e:
         dut.next_vacation(vacs=EXPECTED, dt="abc")
+
+
+def test_default_client_reuses_session():
+    client = dut.default_client()
+    assert client is dut.default_client()
+    assert client.session is client.session
+
+
+@patch('requests.Session.get')
+def test_client_passes_timeout(mock_requests):
+    _configure_mock(mock_requests)
+
+    with dut.FerienClient(pool_size=2, max_retries=3, timeout=(1, 2)) as client:
+        res = client.state_vacations('HB', 2017)
+        assert res == EXPECTED
+        adapter = client.session.get_adapter('https://ferien-api.de')
+        assert adapter.max_retries.total == 3
+
+    mock_requests.assert_called_once_with(
+        'https://ferien-api.de/api/v1/holidays/HB/2017', headers={}, timeout=(1, 2)
+    )
+
+
+def test_client_bad_pool_size():
+    with pytest.raises(ValueError, match="Argument pool_size is expected to be greater than zero"):
+        dut.FerienClient(pool_size=0)
+
+
+@patch('requests.Session.get')
+def test_fetch_states(mock_requests):
+    def _get(url, **kwargs):
+        resp = MagicMock()
+        resp.status_code = 500 if url.endswith('/SH/2017') else 200
+        resp.text = 'Boom'
+        resp.json.return_value = DUMMY_RESP
+        return resp
+    mock_requests.side_effect = _get
+
+    res = dut.fetch_states(['HB', 'SH', 'HB'], [2017], max_workers=2)
+    assert res.vacations == {('HB', 2017): EXPECTED}
+    assert list(res.errors) == [('SH', 2017)]
+    assert not res.ok
+    assert mock_requests.call_count == 2
+
+
+def test_fetch_states_bad_arguments():
+    with pytest.raises(ValueError):
+        dut.fetch_states(['UKW'])
+    with pytest.raises(TypeError):
+        dut.fetch_states(['HH'], ['abc'])
+
+
+@patch('requests.Session.get')
+def test_iter_all_vacations(mock_requests):
+    payload = json.dumps(DUMMY_RESP).encode('utf-8')
+    resp = mock_requests.return_value.__enter__.return_value
+    resp.status_code = 200
+    resp.iter_content.side_effect = lambda size: (payload[i:i + size] for i in range(0, len(payload), size))
+
+    res = dut.iter_all_vacations()
+    assert next(res) == EXPECTED[0]
+    assert list(res) == EXPECTED[1:]
+
+
+@patch('requests.Session.get')
+def test_iter_all_vacations_bad_status_code(mock_requests):
+    resp = mock_requests.return_value.__enter__.return_value
+    resp.status_code = 500
+    resp.text = 'Boom'
+
+    with pytest.raises(RuntimeError, match="ferien-api.de failed with http code = '500'"):
+        list(dut.iter_all_vacations())
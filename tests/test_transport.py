@@ -0,0 +1,77 @@
+import urllib.request
+
+import pytest
+
+from ferien.async_ import AsyncFerienClient
+from ferien.fake_server import FakeFerienServer, synthetic_payload
+from ferien.model import Vacation
+from ferien.sync_ import FerienClient
+from ferien.transport import Response
+
+from stubs import DictTransport
+
+
+@pytest.fixture(scope='module')
+def server():
+    with FakeFerienServer(scale=2) as srv:
+        yield srv
+
+
+def test_synthetic_payload():
+    payload = synthetic_payload(states=['HH', 'BY'], years=[2019], scale=3)
+    assert len(payload) == 2 * 6 * 3
+    assert len({item['slug'] for item in payload}) == len(payload)
+    vacs = [Vacation.from_dict(item) for item in payload]
+    assert all(vac.start < vac.end for vac in vacs)
+
+
+def test_custom_transport():
+    payload = synthetic_payload(states=['HH'], years=[2019])
+    transport = DictTransport({
+        'https://ferien-api.de/api/v1/holidays/HH/2019': Response(200, payload=payload),
+        'https://ferien-api.de/api/v1/holidays/BY': Response(500, text='Boom')
+    })
+    client = FerienClient(transport=transport)
+    assert client.state_vacations('HH', 2019) == [Vacation.from_dict(item) for item in payload]
+    with pytest.raises(RuntimeError, match="http code = '500'\nError: Boom"):
+        client.state_vacations('BY')
+    assert len(transport.requested) == 2
+
+
+def test_base_url():
+    transport = DictTransport({'http://localhost/holidays/HH': Response(200, payload=[])})
+    client = FerienClient(transport=transport, base_url='http://localhost/holidays/')
+    assert client.state_vacations('HH') == []
+    assert transport.requested == ['http://localhost/holidays/HH']
+
+
+def test_fake_server_routes(server):
+    assert len(server.payload) == 16 * 5 * 6 * 2
+    assert len(server.body('/api/v1/holidays/HH/2019')) > 0
+    assert server.body('/api/v2/holidays') is None
+    assert server.body('/api/v1/holidays/XX') is None
+    assert server.body('/api/v1/holidays/HH/abc') is None
+    with pytest.raises(urllib.error.HTTPError):
+        urllib.request.urlopen(server.base_url + '/XX')
+
+
+def test_sync_client_against_fake_server(server):
+    expected = [
+        Vacation.from_dict(item) for item in server.payload
+        if item['stateCode'] == 'HH' and item['year'] == 2019
+    ]
+    with FerienClient(base_url=server.base_url) as client:
+        assert client.state_vacations('HH', 2019) == expected
+        assert len(client.all_vacations()) == len(server.payload)
+        assert len(list(client.iter_all_vacations(chunk_size=512))) == len(server.payload)
+
+
+@pytest.mark.asyncio
+async def test_async_client_against_fake_server(server):
+    async with AsyncFerienClient(base_url=server.base_url) as client:
+        res = await client.fetch_states(['HH', 'BY'], [2019, 2020])
+        assert res.ok
+        assert {len(vacs) for vacs in res.vacations.values()} == {12}
+        stream = client.iter_all_vacations(chunk_size=512)
+        assert len([vac async for vac in stream]) == len(server.payload)
+        assert await client.state_vacations('HH', 1900) == []